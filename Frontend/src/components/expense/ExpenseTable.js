@@ -4,23 +4,29 @@ import { ChevronUp, ChevronDown, ChevronsUpDown } from 'lucide-react';
 
 const ExpenseTable = () => {
     const [expenses, setExpenses] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [filters, setFilters] = useState({
-        category: '', business_name: '', start_date: '', end_date: ''
+        category: '', business_name: '', start_date: '', end_date: '', min_amount: '', max_amount: ''
     });
+    // Only the filters that are set; the server validates dates and amounts, so empty fields must not be sent
+    const activeFilters = () => Object.fromEntries(Object.entries(filters).filter(([, value]) => value !== ''));
     // Default sort to date descending
     const [sortConfig, setSortConfig] = useState({ key: 'transaction_date', direction: 'desc' });
 
-    const fetchExpenses = async () => {
+    // Pass a cursor to append the next page, or nothing to reload from the first page
+    const fetchExpenses = async (cursor = null) => {
         try {
             // Send everything to the backend
             const res = await api.get('/api/expenses', {
                 params: {
-                    ...filters,
+                    ...activeFilters(),
                     sort_by: sortConfig.key,
-                    direction: sortConfig.direction
+                    direction: sortConfig.direction,
+                    ...(cursor ? { cursor } : {})
                 }
             });
-            setExpenses(res.data);
+            setExpenses(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+            setNextCursor(res.data.next_cursor);
         } catch (err) { console.error(err); }
     };
 
@@ -29,6 +35,22 @@ const ExpenseTable = () => {
         fetchExpenses();
     }, [filters, sortConfig]);
 
+    // Download the whole filtered list as a file (streamed by the server, not paginated)
+    const exportExpenses = async (format) => {
+        try {
+            const res = await api.get('/api/expenses/export', {
+                params: { ...activeFilters(), format, sort_by: sortConfig.key, direction: sortConfig.direction },
+                responseType: 'blob'
+            });
+            const url = window.URL.createObjectURL(res.data);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = `expenses.${format}`;
+            link.click();
+            window.URL.revokeObjectURL(url);
+        } catch (err) { console.error(err); }
+    };
+
     const handleSort = (key) => {
         setSortConfig(prev => ({
             key,
@@ -45,7 +67,7 @@ const ExpenseTable = () => {
 
     return (
         <div className="animate-in fade-in duration-500 p-6">
-            <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-10 bg-slate-50/50 p-6 rounded-2xl border border-slate-100">
+            <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-5 gap-6 mb-10 bg-slate-50/50 p-6 rounded-2xl border border-slate-100">
                 <div className="space-y-2">
                     <label className="text-xs font-bold text-slate-400 uppercase tracking-widest">Search</label>
                     <input type="text" placeholder="Vendor name..." className="w-full bg-white border border-slate-200 rounded-xl px-4 py-2.5 text-sm focus:ring-2 focus:ring-indigo-500 outline-none transition-all"
@@ -65,6 +87,40 @@ const ExpenseTable = () => {
                         <option value="אחר">Other</option>
                     </select>
                 </div>
+
+                <div className="space-y-2">
+                    <label className="text-xs font-bold text-slate-400 uppercase tracking-widest">Dates</label>
+                    <div className="flex gap-2">
+                        <input type="date" className="w-full bg-white border border-slate-200 rounded-xl px-3 py-2.5 text-sm focus:ring-2 focus:ring-indigo-500 outline-none transition-all"
+                            onChange={(e) => setFilters({...filters, start_date: e.target.value})} />
+                        <input type="date" className="w-full bg-white border border-slate-200 rounded-xl px-3 py-2.5 text-sm focus:ring-2 focus:ring-indigo-500 outline-none transition-all"
+                            onChange={(e) => setFilters({...filters, end_date: e.target.value})} />
+                    </div>
+                </div>
+
+                <div className="space-y-2">
+                    <label className="text-xs font-bold text-slate-400 uppercase tracking-widest">Total Amount</label>
+                    <div className="flex gap-2">
+                        <input type="number" min="0" placeholder="Min" className="w-full bg-white border border-slate-200 rounded-xl px-3 py-2.5 text-sm focus:ring-2 focus:ring-indigo-500 outline-none transition-all"
+                            onChange={(e) => setFilters({...filters, min_amount: e.target.value})} />
+                        <input type="number" min="0" placeholder="Max" className="w-full bg-white border border-slate-200 rounded-xl px-3 py-2.5 text-sm focus:ring-2 focus:ring-indigo-500 outline-none transition-all"
+                            onChange={(e) => setFilters({...filters, max_amount: e.target.value})} />
+                    </div>
+                </div>
+
+                <div className="space-y-2">
+                    <label className="text-xs font-bold text-slate-400 uppercase tracking-widest">Export</label>
+                    <div className="flex gap-2">
+                        <button onClick={() => exportExpenses('csv')}
+                            className="flex-1 bg-white border border-slate-200 rounded-xl px-4 py-2.5 text-xs font-bold text-slate-500 uppercase tracking-widest hover:bg-slate-50 transition-all">
+                            CSV
+                        </button>
+                        <button onClick={() => exportExpenses('xlsx')}
+                            className="flex-1 bg-white border border-slate-200 rounded-xl px-4 py-2.5 text-xs font-bold text-slate-500 uppercase tracking-widest hover:bg-slate-50 transition-all">
+                            Excel
+                        </button>
+                    </div>
+                </div>
             </div>
 
             <div className="overflow-hidden rounded-2xl border border-slate-100 shadow-sm">
@@ -101,6 +157,15 @@ const ExpenseTable = () => {
                     </tbody>
                 </table>
             </div>
+
+            {nextCursor && (
+                <div className="flex justify-center mt-6">
+                    <button onClick={() => fetchExpenses(nextCursor)}
+                        className="px-8 py-2.5 rounded-xl bg-white border border-slate-200 text-xs font-bold text-slate-500 uppercase tracking-widest hover:bg-slate-50 transition-all">
+                        Load more
+                    </button>
+                </div>
+            )}
         </div>
     );
 };
@@ -1,4 +1,5 @@
 import React, { createContext, useState, useContext } from 'react';
+import api from '../services/api';
 
 const AuthContext = createContext(null);
 
@@ -12,6 +13,10 @@ export const AuthProvider = ({ children }) => {
     };
 
     const logout = () => {
+        // Revoke the token on the server too (best effort, the local logout happens anyway)
+        if (token) {
+            api.post('/api/auth/logout', null, { headers: { Authorization: `Bearer ${token}` } }).catch(() => {});
+        }
         localStorage.removeItem('token');
         setToken(null);
         setUser(null);
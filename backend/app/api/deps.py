@@ -1,30 +1,99 @@
-
-from fastapi import Depends, HTTPException, status
+from datetime import date
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from ..database import get_db
+from jose import JWTError
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ..database import get_async_db
 from ..core import security
+from ..core.principal_cache import Principal, principal_cache, AUTH_TRUST_TOKEN_CLAIMS
 from ..models.user import User
+from ..models.revoked_token import RevokedToken
+from ..schemas.expense_schemas import ExpenseFilter, ExpenseCategory
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """Signed, unexpired and not revoked (as far as this process knows) token claims."""
     try:
-        payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        claims = security.decode_access_token(token)
+        claims["sub"] = int(claims["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _credentials_exception()
+    if principal_cache.is_revoked(claims.get("jti")):
+        raise _credentials_exception()
+    return claims
+
+
+async def get_current_user(claims: dict = Depends(get_token_claims),
+                           db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """
+    The authenticated user. Verified principals are cached for a short TTL, so the DB
+    (user exists, token not revoked) is only checked once per token per TTL.
+    """
+    user_id, jti = claims["sub"], claims.get("jti")
+    key = principal_cache.key_for(user_id, jti)
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+
+    # One round trip: the user and, if the token was revoked, its revocation row
+    row = (await db.execute(
+        select(User.id, User.email, RevokedToken.jti.label("revoked_jti"))
+        .outerjoin(RevokedToken, and_(RevokedToken.jti == jti, RevokedToken.user_id == User.id))
+        .where(User.id == user_id)
+    )).first()
+    if row is None:
+        raise _credentials_exception()
+    if row.revoked_jti:
+        principal_cache.revoke(jti, claims["exp"])
+        raise _credentials_exception()
+
+    principal = Principal(id=row.id, email=row.email)
+    principal_cache.put(key, principal)
+    return principal
+
+
+async def get_read_principal(claims: dict = Depends(get_token_claims),
+                             db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """
+    The user for read-only endpoints. With AUTH_TRUST_TOKEN_CLAIMS the signed claims are
+    accepted as they are (no DB check at all); otherwise this is get_current_user.
+    """
+    if AUTH_TRUST_TOKEN_CLAIMS and claims.get("email"):
+        principal_cache.record_trusted()
+        return Principal(id=claims["sub"], email=claims["email"])
+    return await get_current_user(claims, db)
+
+
+def expense_filters(
+        start_date: Optional[date] = Query(None),
+        end_date: Optional[date] = Query(None),
+        min_amount: Optional[float] = Query(None, ge=0),
+        max_amount: Optional[float] = Query(None, ge=0),
+        category: Optional[ExpenseCategory] = Query(None),
+        business_name: Optional[str] = Query(None)
+) -> ExpenseFilter:
+    """ExpenseFilter read from the query string (expense list, reports and exports)."""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise HTTPException(status_code=400, detail="min_amount must not exceed max_amount")
+    return ExpenseFilter(
+        start_date=start_date,
+        end_date=end_date,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        category=category,
+        business_name=business_name or None
+    )
@@ -1,98 +1,429 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import io
+import os
+import asyncio
+import json
+import zipfile
+from datetime import date
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Tuple
 from fastapi import Query
 from typing import Optional
-from ..database import get_db
-from .deps import get_current_user
-from ..services.ocr_service import OCRService
-from ..repositories.expense_repo import ExpenseRepository
-from ..schemas.expense_schemas import ExpenseResponse, ExpenseFilter, ExpenseCategory
-from ..models.user import User
-from ..models.invoice import Invoice as InvoiceModel
-from ..models.expense import Expense as ExpenseModel
+from ..database import SessionLocal, get_async_db
+from .deps import get_current_user, get_read_principal, expense_filters
+from ..services.ocr_service import OCRService, OCRQueueFullError, OCR_RETRY_AFTER_SECONDS
+from ..services.ingestion_service import IngestionPipeline, IngestionQueueFullError
+from ..services.ocr_cache import hash_content
+from ..services.export_service import ExpenseExporter, ExportUnavailableError
+from ..services.pdf_pages import PDFUnavailableError, ensure_pdf_support
+from ..services.upload_service import (
+    IMAGE_KINDS, BudgetLease, InspectedUpload, UploadBudgetExhaustedError, UploadKind, UploadTooLargeError,
+    UnsupportedUploadError, inspect_upload, sniff_kind, upload_memory_budget
+)
+from ..repositories.data_version_repo import AsyncDataVersionRepository
+from ..repositories.expense_repo import AsyncExpenseRepository, InvalidCursorError
+from ..repositories.invoice_repo import InvoiceRepository
+from ..schemas.expense_schemas import ExpensePage, ExpenseFilter, ExpenseCategory, ExportFormat, expense_page_json
+from ..schemas.invoice_schemas import InvoiceOCRResponse, UploadResult, UploadJobResponse, BatchUploadItem, BatchUploadResponse
+from ..core.principal_cache import Principal
+from ..core.response_cache import RESPONSE_CACHE_ENABLED, expense_list_cache, etag_matches, make_etag
 from fastapi import Form
 
 router = APIRouter(prefix="/api", tags=["Invoices & Expenses"])
 
-# Initialize Services
+# Batch upload limits (after zip archives are expanded)
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(200 * 1024 * 1024)))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# Formats accepted by the single-file endpoints
+SINGLE_UPLOAD_KINDS = IMAGE_KINDS | {UploadKind.PDF}
+
+# Expense list page size (keyset pagination)
+EXPENSES_PAGE_SIZE = int(os.getenv("EXPENSES_PAGE_SIZE", "50"))
+EXPENSES_MAX_PAGE_SIZE = int(os.getenv("EXPENSES_MAX_PAGE_SIZE", "200"))
+# Build list pages from plain column rows instead of ORM objects + Pydantic validation
+EXPENSES_FAST_READ = os.getenv("EXPENSES_FAST_READ", "true").lower() == "true"
+
+# Initialize Services (cheap: the OCR client itself is built per worker by the app lifespan, see main.py)
 ocr_service = OCRService()
-@router.post("/invoice/upload")
+ingestion_pipeline = IngestionPipeline(ocr_service)
+expense_exporter = ExpenseExporter()
+
+@router.post("/invoice/upload", response_model=UploadResult)
 async def upload_invoice(
         file: UploadFile = File(...),
         category: ExpenseCategory = Form(ExpenseCategory.OTHER),
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        flag_duplicates: bool = Form(False),
+        current_user: Principal = Depends(get_current_user)
 ):
-    if file.content_type not in ["image/jpeg", "image/png"]:
-        raise HTTPException(status_code=400, detail="Invalid file type")
+    upload = await _inspect_single_upload(file)
+    content_hash = upload.content_hash
+
+    # Same image uploaded before: report the existing invoice instead of creating another one
+    if flag_duplicates:
+        duplicate = (await _find_duplicates(current_user.id, [content_hash])).get(content_hash)
+        if duplicate:
+            return duplicate
 
-    contents = await file.read()
-    ocr_data = await ocr_service.process_invoice(contents)
     try:
-        # 1. Create the Invoice record
-        new_invoice = InvoiceModel(
-            user_id=current_user.id,
-            document_type=ocr_data.document_type,
-            business_name=ocr_data.business_name,
-            company_id=ocr_data.business_vat_number,
-            amount_before_vat=ocr_data.amount_before_vat,
-            amount_after_vat=ocr_data.amount_after_vat,
-            transaction_date=ocr_data.transaction_date
+        # The file is read into memory only once there is budget for it
+        async with upload_memory_budget.hold(upload.size):
+            contents = await file.read()
+            ocr_data = await ocr_service.process_upload(contents, content_hash, upload.kind)
+            del contents
+    except OCRQueueFullError as e:
+        # Backpressure: the OCR pool is saturated, ask the client to retry later
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except UploadBudgetExhaustedError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many uploads in progress, please retry later",
+            headers={"Retry-After": str(OCR_RETRY_AFTER_SECONDS)}
         )
-        db.add(new_invoice)
-        db.flush() # This generates new_invoice.id
-
-        # 2. Create the Expense record using the category from the Form
-        new_expense = ExpenseModel(
-            invoice_id=new_invoice.id,
-            user_id=current_user.id,
-            category=category, # Now 'category' is resolved
-            notes="Automatically processed"
+    try:
+        return await asyncio.to_thread(_save_invoice, current_user.id, ocr_data, category, content_hash)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
         )
 
-        db.add(new_expense)
+async def _find_duplicates(user_id: int, hashes: List[str]) -> Dict[str, UploadResult]:
+    """
+    Looks up already-stored images on a short-lived session in a worker thread, so no
+    connection is held (idle in transaction) while the upload goes through OCR.
+    """
+    def lookup():
+        db = SessionLocal()
+        try:
+            return {
+                content_hash: UploadResult.from_records(*records, status="duplicate")
+                for content_hash, records in InvoiceRepository(db).find_duplicates(user_id, hashes).items()
+            }
+        finally:
+            db.close()
+    return await asyncio.to_thread(lookup)
+
+def _save_invoice(user_id: int, ocr_data: InvoiceOCRResponse, category: ExpenseCategory,
+                  content_hash: str) -> UploadResult:
+    """Stores the invoice and its expense on its own session (run in a worker thread, off the event loop)."""
+    db = SessionLocal()
+    try:
+        new_invoice, new_expense = InvoiceRepository(db).create_with_expense(
+            user_id=user_id,
+            ocr_data=ocr_data,
+            category=category,
+            content_hash=content_hash
+        )
         db.commit()
-        db.refresh(new_expense)
+        return UploadResult.from_records(new_invoice, new_expense)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
-        return {
-            "status": "success",
-            "expense_id": new_expense.id,
-            "business_name": new_invoice.business_name,
-            "amount": new_invoice.amount_after_vat,
-            "date": new_invoice.transaction_date
-        }
+async def _inspect_single_upload(file: UploadFile) -> InspectedUpload:
+    """Sniffs, size-checks and hashes an image/PDF upload, mapping failures to 400/413/501."""
+    try:
+        upload = await inspect_upload(file, SINGLE_UPLOAD_KINDS)
+        if upload.kind == UploadKind.PDF:
+            ensure_pdf_support()
+    except UnsupportedUploadError:
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except PDFUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    return upload
+
+@router.post("/invoice/upload/batch", response_model=BatchUploadResponse)
+async def upload_invoice_batch(
+        files: List[UploadFile] = File(...),
+        category: ExpenseCategory = Form(ExpenseCategory.OTHER),
+        flag_duplicates: bool = Form(False),
+        current_user: Principal = Depends(get_current_user)
+):
+    """
+    Uploads many invoices at once (images and/or zip archives of images).
+    OCR runs through backend batch requests and all rows are inserted in one transaction.
+    Files that fail OCR are reported individually and do not block the rest.
+    """
+    try:
+        # Budget is reserved for each image as it is read in (zip members before they are decompressed)
+        async with upload_memory_budget.lease() as lease:
+            return await _upload_batch(files, category, flag_duplicates, current_user, lease)
+    except UploadBudgetExhaustedError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many uploads in progress, please retry later",
+            headers={"Retry-After": str(OCR_RETRY_AFTER_SECONDS)}
+        )
+
+async def _upload_batch(files: List[UploadFile], category: ExpenseCategory, flag_duplicates: bool,
+                        current_user: Principal, lease: BudgetLease) -> BatchUploadResponse:
+    named_files = await _expand_batch_files(files, lease)
+    hashes = [hash_content(contents) for _, contents in named_files]
+    items = [BatchUploadItem(filename=name, status="failed") for name, _ in named_files]
 
+    # 1. Optionally drop images that were already uploaded (before or earlier in this batch)
+    pending = list(range(len(named_files)))
+    if flag_duplicates:
+        existing = await _find_duplicates(current_user.id, hashes)
+        first_seen = {}
+        pending = []
+        for index, content_hash in enumerate(hashes):
+            if content_hash in existing:
+                items[index].status = "duplicate"
+                items[index].result = existing[content_hash]
+            elif content_hash in first_seen:
+                items[index].status = "duplicate"
+                items[index].error = f"Same image as {items[first_seen[content_hash]].filename}"
+            else:
+                first_seen[content_hash] = index
+                pending.append(index)
+
+    # 2. OCR everything else
+    ocr_results = await ocr_service.process_batch(
+        [named_files[index][1] for index in pending],
+        [hashes[index] for index in pending]
+    )
+    parsed = []  # (index in items, ocr_data)
+    for index, ocr_result in zip(pending, ocr_results):
+        if isinstance(ocr_result, Exception):
+            items[index].error = str(ocr_result)
+        else:
+            parsed.append((index, ocr_result))
+
+    # 3. Insert all rows in a single transaction
+    try:
+        ids = await asyncio.to_thread(
+            _save_batch, current_user.id, [(ocr_data, category, hashes[index]) for index, ocr_data in parsed]
+        )
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(e)}"
         )
 
-@router.get("/expenses", response_model=List[ExpenseResponse])
+    for (index, ocr_data), (_, expense_id) in zip(parsed, ids):
+        items[index].status = "success"
+        items[index].result = UploadResult(
+            expense_id=expense_id,
+            business_name=ocr_data.business_name,
+            amount=ocr_data.amount_after_vat,
+            date=ocr_data.transaction_date
+        )
+
+    duplicates = sum(1 for item in items if item.status == "duplicate")
+    return BatchUploadResponse(
+        succeeded=len(parsed),
+        duplicates=duplicates,
+        failed=len(items) - len(parsed) - duplicates,
+        items=items
+    )
+
+def _save_batch(user_id: int, items: List[Tuple[InvoiceOCRResponse, ExpenseCategory, str]]) -> List[Tuple[int, int]]:
+    """Inserts the batch in one transaction on its own session (run in a worker thread, off the event loop)."""
+    db = SessionLocal()
+    try:
+        ids = InvoiceRepository(db).bulk_create_with_expenses(user_id=user_id, items=items)
+        db.commit()
+        return ids
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def _expand_batch_files(files: List[UploadFile], lease: BudgetLease) -> List[Tuple[str, bytes]]:
+    """
+    Reads the uploaded images into memory, unpacking zip archives, and enforces the batch
+    limits. Every image is reserved on the lease before it is read.
+    """
+    named_files = []
+    total_bytes = 0
+    for file in files:
+        filename = file.filename or "upload"
+        # The format is sniffed from the first bytes, not taken from the client's content type
+        kind = sniff_kind(await file.read(16))
+        await file.seek(0)
+        if kind not in IMAGE_KINDS and kind != UploadKind.ZIP:
+            detail = "PDF invoices must be uploaded one at a time" if kind == UploadKind.PDF else "Invalid file type"
+            raise HTTPException(status_code=400, detail=f"{detail}: {filename}")
+        if (file.size or 0) > BATCH_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Batch is too large")
+
+        if kind == UploadKind.ZIP:
+            # Read straight from the spooled upload: only the extracted images are held in memory
+            try:
+                with zipfile.ZipFile(file.file) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                            continue
+                        # Check the declared size before decompressing to avoid zip bombs
+                        # (a member never inflates past its declared size, zipfile stops there)
+                        total_bytes += info.file_size
+                        if total_bytes > BATCH_MAX_BYTES:
+                            raise HTTPException(status_code=413, detail="Batch is too large")
+                        with archive.open(info) as member_file:
+                            if sniff_kind(member_file.read(16)) not in IMAGE_KINDS:
+                                continue
+                        _check_file_count(named_files)
+                        await lease.add(info.file_size)
+                        named_files.append((f"{filename}/{info.filename}", archive.read(info)))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Invalid zip archive: {filename}")
+        else:
+            size = _spooled_size(file)
+            total_bytes += size
+            if total_bytes > BATCH_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Batch is too large")
+            _check_file_count(named_files)
+            await lease.add(size)
+            named_files.append((filename, await file.read()))
+
+    if not named_files:
+        raise HTTPException(status_code=400, detail="No invoice images found in the upload")
+    return named_files
+
+def _check_file_count(named_files: list):
+    # Checked before each image is read, so an oversized archive is not expanded first
+    if len(named_files) >= BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_FILES} files")
+
+def _spooled_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    size = file.file.seek(0, io.SEEK_END)
+    file.file.seek(position)
+    return size
+
+@router.post("/invoice/jobs", response_model=UploadJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_upload_job(
+        file: UploadFile = File(...),
+        category: ExpenseCategory = Form(ExpenseCategory.OTHER),
+        flag_duplicates: bool = Form(False),
+        current_user: Principal = Depends(get_current_user)
+):
+    """Queues an invoice for background OCR and returns a job ID to poll."""
+    upload = await _inspect_single_upload(file)
+    try:
+        job = await ingestion_pipeline.submit_upload(upload, current_user.id, category, flag_duplicates)
+    except IngestionQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(OCR_RETRY_AFTER_SECONDS)}
+        )
+    return job.to_response()
+
+@router.get("/invoice/jobs", response_model=List[UploadJobResponse])
+async def get_upload_jobs(
+        ids: List[str] = Query(..., max_length=100),
+        current_user: Principal = Depends(get_read_principal)
+):
+    """Batch status poll. Unknown or foreign job IDs are omitted from the result."""
+    return [job.to_response() for job in ingestion_pipeline.get_jobs(ids, current_user.id)]
+
+@router.get("/invoice/jobs/{job_id}", response_model=UploadJobResponse)
+async def get_upload_job(job_id: str, current_user: Principal = Depends(get_read_principal)):
+    job = ingestion_pipeline.get_job(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_response()
+
+@router.get("/ocr/metrics")
+async def get_ocr_metrics(current_user: Principal = Depends(get_read_principal)):
+    """Returns OCR pool queue depth, latency, backend routing, preprocessing, cache and upload memory statistics."""
+    metrics = ocr_service.metrics.snapshot()
+    metrics["backend"] = ocr_service.backend.stats()
+    if ocr_service.preprocessor:
+        metrics["preprocess"] = ocr_service.preprocessor.stats()
+    if ocr_service.cache:
+        metrics["cache"] = ocr_service.cache.stats()
+    metrics["upload_memory"] = upload_memory_budget.stats()
+    return metrics
+
+@router.get("/expenses", response_model=ExpensePage)
 async def get_expenses(
-        category: Optional[ExpenseCategory] = Query(None),
-        business_name: Optional[str] = Query(None),
+        request: Request,
+        filters: ExpenseFilter = Depends(expense_filters),
         sort_by: str = Query("transaction_date"),
         direction: str = Query("desc"),
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        limit: int = Query(EXPENSES_PAGE_SIZE, ge=1, le=EXPENSES_MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Principal = Depends(get_read_principal)
 ):
-    # Handle empty strings from frontend
-    category_val = category if category != "" else None
-    business_val = business_name if business_name != "" else None
-
-    repo = ExpenseRepository(db)
-    filters = ExpenseFilter(
-        category=category_val,
-        business_name=business_val
-    )
+    repo = AsyncExpenseRepository(db)
+
+    # 1. The user's data version decides the ETag: an unchanged list costs one primary key lookup
+    data_version = await AsyncDataVersionRepository(db).get(current_user.id) or 0
+    cache_key = json.dumps([filters.model_dump(mode="json"), sort_by, direction, limit, cursor or None])
+    headers = {"ETag": make_etag(current_user.id, data_version, cache_key), "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        expense_list_cache.record_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # 2. Serve the page serialized earlier from the same data version, if this worker has it
+    body = expense_list_cache.get(current_user.id, cache_key, data_version) if RESPONSE_CACHE_ENABLED else None
+    if body is None:
+        try:
+            if EXPENSES_FAST_READ:
+                rows, next_cursor = await repo.get_user_expense_rows_page(
+                    current_user.id, filters, sort_by, direction, limit, cursor or None
+                )
+                body = expense_page_json(rows, next_cursor)
+            else:
+                expenses, next_cursor = await repo.get_user_expenses_page(
+                    user_id=current_user.id,
+                    filters=filters,
+                    sort_by=sort_by,
+                    direction=direction,
+                    limit=limit,
+                    cursor=cursor or None
+                )
+                body = ExpensePage(items=expenses, next_cursor=next_cursor).model_dump_json().encode()
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if RESPONSE_CACHE_ENABLED:
+            expense_list_cache.put(current_user.id, cache_key, data_version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@router.get("/expenses/export")
+def export_expenses(
+        format: ExportFormat = Query(ExportFormat.CSV),
+        sort_by: str = Query("transaction_date"),
+        direction: str = Query("desc"),
+        filters: ExpenseFilter = Depends(expense_filters),
+        current_user: Principal = Depends(get_read_principal)
+):
+    # Rows are streamed straight from a server-side cursor, never collected in memory
+    try:
+        if format == ExportFormat.XLSX:
+            body = expense_exporter.xlsx_stream(current_user.id, filters, sort_by, direction)
+        else:
+            body = expense_exporter.csv_stream(current_user.id, filters, sort_by, direction)
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
 
-    expenses = repo.get_user_expenses_with_filters(
-        user_id=current_user.id,
-        filters=filters,
-        sort_by=sort_by,
-        direction=direction
+    filename = f"expenses-{date.today().isoformat()}.{format.value}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
-    return expenses
\ No newline at end of file
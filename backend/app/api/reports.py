@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+from ..database import get_db
+from .deps import get_read_principal, expense_filters
+from ..repositories.report_repo import ReportRepository, VENDOR_REPORT_LIMIT
+from ..schemas.expense_schemas import ExpenseFilter
+from ..schemas.report_schemas import (
+    ReportPeriod, ReportTotals, ReportSummary, CategoryBreakdown, VendorBreakdown, TimeSeries
+)
+from ..core.principal_cache import Principal
+
+router = APIRouter(prefix="/api/reports", tags=["Reports"])
+
+
+@router.get("/summary", response_model=ReportSummary)
+def get_summary(
+        filters: ExpenseFilter = Depends(expense_filters),
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_read_principal)
+):
+    repo = ReportRepository(db)
+    return ReportSummary(
+        totals=repo.get_totals(current_user.id, filters),
+        by_category=repo.get_by_category(current_user.id, filters)
+    )
+
+
+@router.get("/totals", response_model=ReportTotals)
+def get_totals(
+        filters: ExpenseFilter = Depends(expense_filters),
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_read_principal)
+):
+    return ReportRepository(db).get_totals(current_user.id, filters)
+
+
+@router.get("/by-category", response_model=List[CategoryBreakdown])
+def get_by_category(
+        filters: ExpenseFilter = Depends(expense_filters),
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_read_principal)
+):
+    return ReportRepository(db).get_by_category(current_user.id, filters)
+
+
+@router.get("/by-vendor", response_model=List[VendorBreakdown])
+def get_by_vendor(
+        limit: int = Query(VENDOR_REPORT_LIMIT, ge=1, le=200),
+        filters: ExpenseFilter = Depends(expense_filters),
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_read_principal)
+):
+    return ReportRepository(db).get_by_vendor(current_user.id, filters, limit)
+
+
+@router.get("/timeseries", response_model=TimeSeries)
+def get_time_series(
+        period: ReportPeriod = Query(ReportPeriod.MONTH),
+        filters: ExpenseFilter = Depends(expense_filters),
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_read_principal)
+):
+    points = ReportRepository(db).get_time_series(current_user.id, filters, period)
+    return TimeSeries(period=period, points=points)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
+from .deps import get_read_principal
+from ..repositories.search_repo import AsyncSearchRepository
+from ..schemas.search_schemas import SearchHit, SearchResults
+from ..core.principal_cache import Principal
+
+router = APIRouter(prefix="/api/search", tags=["Search"])
+
+
+@router.get("", response_model=SearchResults)
+async def search_invoices(
+        q: str = Query(..., min_length=1, max_length=200, description="Words to find in vendor, number, notes or invoice text"),
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0, le=1000),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Principal = Depends(get_read_principal)
+):
+    rows, next_offset = await AsyncSearchRepository(db).search_page(current_user.id, q, limit, offset)
+    return SearchResults(
+        query=q,
+        items=[SearchHit(**row._mapping) for row in rows],
+        next_offset=next_offset
+    )
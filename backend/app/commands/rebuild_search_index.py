@@ -0,0 +1,47 @@
+"""
+Rebuilds the invoice search documents from the invoices, their expense notes and the
+stored raw OCR texts. Run it after the 0006 migration (which indexes vendor, number and
+notes only) or after changing SEARCH_TS_CONFIG:
+
+    python -m app.commands.rebuild_search_index
+    python -m app.commands.rebuild_search_index --user-id 7
+
+Each chunk is upserted and committed on its own, so the command can be resumed with --after-id.
+"""
+import sys
+import time
+import argparse
+from ..database import SessionLocal
+from ..repositories.search_repo import SearchRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user's documents")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Invoices per upsert")
+    parser.add_argument("--after-id", type=int, default=0, help="Resume after this invoice id")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    repo = SearchRepository(db)
+    done = 0
+    try:
+        for invoice_ids in repo.iter_invoice_ids(args.user_id, args.chunk_size, args.after_id):
+            done += repo.refresh(invoice_ids)
+            db.commit()
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            sys.stdout.write(f"\r{done} indexed, last invoice id {invoice_ids[-1]} ({rate:.0f}/s)")
+            sys.stdout.flush()
+        print()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Indexed {done} invoices in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
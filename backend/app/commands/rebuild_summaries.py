@@ -0,0 +1,37 @@
+"""
+Recomputes expense_monthly_summaries from invoices/expenses.
+
+Uploads keep the rollup up to date on their own; run this after backfills,
+manual SQL fixes or restores:
+
+    python -m app.commands.rebuild_summaries            # every user
+    python -m app.commands.rebuild_summaries --user-id 7
+"""
+import time
+import argparse
+from ..database import SessionLocal
+from ..repositories.summary_repo import ExpenseSummaryRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user's rows")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rows = ExpenseSummaryRepository(db).rebuild(args.user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+    print(f"Rebuilt {rows} summary rows for {scope} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Re-runs the invoice parser over the stored raw OCR texts and writes back the fields
+that changed, without calling the OCR backend again. Run it after improving
+invoice_parser:
+
+    python -m app.commands.reparse_invoices                  # every invoice
+    python -m app.commands.reparse_invoices --user-id 7 --dry-run
+    python -m app.commands.reparse_invoices --backfill       # first copy texts from the OCR cache
+
+Texts are parsed on a process pool; changes are written in one bulk UPDATE per chunk
+(search documents of invoices whose vendor or number changed are re-indexed with them).
+Monthly rollups of the users whose invoices changed are rebuilt at the end.
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+from ..database import SessionLocal
+from ..repositories.data_version_repo import DataVersionRepository
+from ..repositories.invoice_repo import InvoiceRepository
+from ..repositories.ocr_text_repo import OCRTextRepository, PARSED_COLUMNS, decompress_text
+from ..repositories.search_repo import SearchRepository
+from ..repositories.summary_repo import ExpenseSummaryRepository
+from ..services.invoice_parser import find_transaction_date, parse_invoice_text
+
+COLUMN_NAMES = [column.key for column in PARSED_COLUMNS]
+# Parsed fields that are part of the search document
+SEARCHED_COLUMNS = {"business_name", "invoice_number"}
+
+
+def reparse_rows(rows: List[tuple]) -> Tuple[List[Tuple[int, dict]], int]:
+    """
+    Runs in a worker process. Returns ((user_id, change) for every invoice whose parsed
+    fields differ from the stored ones, number of texts the parser failed on).
+    A change holds the invoice `id` and the new values of the differing columns only.
+    """
+    changes = []
+    failed = 0
+    for invoice_id, user_id, compressed_text, *current in rows:
+        try:
+            text = decompress_text(compressed_text)
+            parsed = parse_invoice_text(text)
+            has_date = find_transaction_date(text) is not None
+        except Exception:
+            failed += 1
+            continue
+        values = InvoiceRepository._invoice_values(user_id, parsed)
+        change = {
+            name: values[name] for name, stored in zip(COLUMN_NAMES, current)
+            if values[name] != stored
+        }
+        if not has_date:
+            # The parser fell back to today: never write that over the stored date
+            change.pop("transaction_date", None)
+        if change:
+            changes.append((user_id, {"id": invoice_id, **change}))
+    return changes, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, default=None, help="Only re-parse this user's invoices")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Invoices per parse task and per UPDATE")
+    parser.add_argument("--after-id", type=int, default=0, help="Resume after this invoice id")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    parser.add_argument("--backfill", action="store_true",
+                        help="First store texts of older invoices from the OCR cache")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    repo = OCRTextRepository(db)
+    try:
+        if args.backfill:
+            stored = repo.backfill_from_cache()
+            db.commit()
+            print(f"Backfilled {stored} texts from the OCR cache")
+
+        total = repo.count(args.user_id)
+        done = changed = failed = 0
+        changed_users = set()
+
+        def apply(batch_size: int, result: Tuple[list, int]):
+            nonlocal done, changed, failed
+            changes, batch_failed = result
+            if changes and not args.dry_run:
+                repo.apply_reparsed([change for _, change in changes])
+                SearchRepository(db).refresh([change["id"] for _, change in changes if SEARCHED_COLUMNS & change.keys()])
+                DataVersionRepository(db).bump(user_id for user_id, _ in changes)
+                db.commit()
+            changed_users.update(user_id for user_id, _ in changes)
+            done += batch_size
+            changed += len(changes)
+            failed += batch_failed
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            sys.stdout.write(f"\r{done}/{total} parsed, {changed} changed, {failed} failed ({rate:.0f}/s)")
+            sys.stdout.flush()
+
+        # Workers are spawned, not forked (see password_hasher); at most 2 chunks per worker are in flight
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pending = deque()
+            for batch in repo.iter_batches(args.user_id, args.chunk_size, args.after_id):
+                pending.append((len(batch), pool.submit(reparse_rows, batch)))
+                if len(pending) >= args.workers * 2:
+                    size, future = pending.popleft()
+                    apply(size, future.result())
+            while pending:
+                size, future = pending.popleft()
+                apply(size, future.result())
+        print()
+
+        if changed_users and not args.dry_run:
+            summaries = ExpenseSummaryRepository(db)
+            for user_id in sorted(changed_users):
+                summaries.rebuild(user_id)
+            db.commit()
+            print(f"Rebuilt monthly summaries for {len(changed_users)} users")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    verb = "would change" if args.dry_run else "changed"
+    print(f"Re-parsed {done} invoices, {verb} {changed}, {failed} failed, in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
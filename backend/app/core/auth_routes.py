@@ -1,42 +1,91 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User
+from ..models.revoked_token import RevokedToken
+from ..api.deps import get_current_user, get_token_claims
 from ..schemas.auth_schemas import UserCreate, UserResponse, Token
 from . import security
+from .principal_cache import Principal, principal_cache
+from .password_hasher import password_hasher, HashingBusyError
+from .rate_limit import login_ip_limiter, login_account_limiter
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+# bcrypt hash of a throwaway password, verified when the email is unknown
+_DUMMY_HASH = "$2b$12$SSYi5aFWSkujnxrKBlKqLuLWpyg4pdW2BCqwQKUsg8JAuMdEnS.dy"
+
+
+async def _hash_call(call):
+    """Awaits a password_hasher call, turning a saturated pool into 503 + Retry-After."""
+    try:
+        return await call
+    except HashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Creates a new user account with a hashed password."""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (await db.execute(select(User.id).where(User.email == user_data.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
+    await db.rollback()  # Give the connection back to the pool while we hash
 
-    # Hash the password and save
-    hashed_pwd = security.get_password_hash(user_data.password)
+    # Hash the password (worker process) and save
+    hashed_pwd = await _hash_call(password_hasher.hash(user_data.password))
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_pwd
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Registered concurrently while we were hashing
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(),
+                db: AsyncSession = Depends(get_async_db)):
     """Authenticates a user and returns a JWT token."""
-    user = db.query(User).filter(User.email == form_data.username).first()
+    # 1. Rate limits first, before any bcrypt work is spent on the attempt
+    client_host = request.client.host if request.client else "unknown"
+    for limiter, key in ((login_ip_limiter, client_host), (login_account_limiter, form_data.username.lower())):
+        retry_after = limiter.hit(key)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please retry later",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    # 2. Look the user up, then release the session before the slow part
+    user = (await db.execute(
+        select(User.id, User.email, User.hashed_password).where(User.email == form_data.username)
+    )).first()
+    await db.close()
 
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    # 3. Verify in the hashing pool. Unknown emails are checked against a dummy hash
+    # so the response time does not reveal which accounts exist.
+    password_ok = await _hash_call(
+        password_hasher.verify(form_data.password, user.hashed_password if user else _DUMMY_HASH)
+    )
+    if not user or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -44,5 +93,36 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         )
 
     # Generate the token using the user's ID as the 'sub' (subject)
-    access_token = security.create_access_token(data={"sub": str(user.id)})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    access_token = security.create_access_token(data={"sub": str(user.id), "email": user.email})
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+        claims: dict = Depends(get_token_claims),
+        current_user: Principal = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Revokes the current token for every worker (others notice within the principal cache TTL)."""
+    jti = claims.get("jti")
+    if not jti:
+        # Tokens issued before revocation existed cannot be revoked individually
+        principal_cache.invalidate_user(current_user.id)
+        return
+
+    now = datetime.now(timezone.utc)
+    await db.merge(RevokedToken(
+        jti=jti,
+        user_id=current_user.id,
+        expires_at=datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+    ))
+    # Revocations of expired tokens are no longer needed
+    await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+    await db.commit()
+    principal_cache.revoke(jti, claims["exp"])
+
+
+@router.get("/metrics")
+def get_auth_metrics(current_user: Principal = Depends(get_current_user)):
+    """Returns principal cache hit-rate counters and hashing pool usage."""
+    return {**principal_cache.stats(), "hashing": password_hasher.stats()}
@@ -0,0 +1,29 @@
+import json
+from datetime import date, datetime, timedelta
+from enum import Enum
+
+# orjson is optional: it serializes dates and datetimes natively and is several times
+# faster than the json module, which is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    # Same output as Pydantic's JSON mode (UTC datetimes end in "Z")
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if value.utcoffset() == timedelta(0) else text
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    """Encodes dicts/lists of plain values, dates and enums to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
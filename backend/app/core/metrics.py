@@ -0,0 +1,225 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Queries slower than this are logged with their statement
+DB_SLOW_QUERY_MS = int(os.getenv("DB_SLOW_QUERY_MS", "500"))
+# Longest statement text written to the slow query log
+DB_SLOW_QUERY_MAX_CHARS = int(os.getenv("DB_SLOW_QUERY_MAX_CHARS", "2000"))
+
+# Prometheus' default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+_INF_BUCKET = 'le="+Inf"'
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[LabelValues, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, _INF_BUCKET)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Registers a callable returning ready-made exposition lines (gauges read at scrape time)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status")
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Database statement execution time",
+    ("engine", "operation")
+)
+db_slow_queries = registry.counter(
+    "db_slow_queries_total", f"Statements slower than DB_SLOW_QUERY_MS ({DB_SLOW_QUERY_MS} ms)",
+    ("engine", "operation")
+)
+db_query_errors = registry.counter(
+    "db_query_errors_total", "Statements that raised a database error", ("engine", "operation")
+)
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time to obtain a pooled connection (waiting, connecting and pre-ping)",
+    ("engine",), buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+db_pool_timeouts = registry.counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT (pool exhausted)", ("engine",)
+)
+
+_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def _operation(statement: str) -> str:
+    # First keyword only, so the label set stays small
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in _OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: Engine, name: str):
+    """
+    Times every statement of `engine` (a sync Engine, or AsyncEngine.sync_engine) and
+    exports its pool occupancy. Statements slower than DB_SLOW_QUERY_MS are logged.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = _operation(statement)
+        db_query_duration.observe(elapsed, name, operation)
+        if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+            db_slow_queries.inc(name, operation)
+            logger.warning("Slow query on %s engine (%.1f ms): %s",
+                           name, elapsed * 1000, statement[:DB_SLOW_QUERY_MAX_CHARS])
+
+    @event.listens_for(engine, "handle_error")
+    def _count_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        db_query_errors.inc(name, _operation(context.statement or ""))
+
+    _instrumented_engines[name] = engine
+
+
+def timed_pool(pool_class: type, name: str) -> type:
+    """Subclass of `pool_class` that records how long each checkout waited for a connection."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return pool_class.connect(self)
+        except exc.TimeoutError:
+            db_pool_timeouts.inc(name)
+            raise
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started, name)
+
+    return type(f"Timed{pool_class.__name__}", (pool_class,), {"connect": connect})
+
+
+_instrumented_engines: Dict[str, Engine] = {}
+
+_POOL_GAUGES = (
+    ("db_pool_size", "Configured pool size", "size"),
+    ("db_pool_checked_out", "Connections currently in use", "checkedout"),
+    ("db_pool_overflow", "Connections beyond the pool size (negative while the pool is not full)", "overflow"),
+)
+
+
+def _pool_gauges() -> List[str]:
+    # Read at scrape time; pools without sizing (SQLite) report nothing
+    lines: List[str] = []
+    for metric, documentation, method in _POOL_GAUGES:
+        samples = [
+            f'{metric}{{engine="{name}"}} {getattr(engine.pool, method)()}'
+            for name, engine in _instrumented_engines.items() if hasattr(engine.pool, method)
+        ]
+        if samples:
+            lines.extend([f"# HELP {metric} {documentation}", f"# TYPE {metric} gauge", *samples])
+    return lines
+
+
+registry.add_collector(_pool_gauges)
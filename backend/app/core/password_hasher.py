@@ -0,0 +1,105 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from . import security
+
+# Password hashing settings
+# bcrypt is pure CPU work (~100-300 ms per call), so it runs in worker processes:
+# threads would still fight over the GIL with the request handlers.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# Max hash/verify calls admitted at once (running + waiting) before we answer 503
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))
+HASH_RETRY_AFTER_SECONDS = int(os.getenv("HASH_RETRY_AFTER_SECONDS", "2"))
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing pool already holds the maximum number of pending calls."""
+
+    def __init__(self, retry_after: int = HASH_RETRY_AFTER_SECONDS):
+        super().__init__("Authentication service is busy, please retry shortly")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing/verification on a dedicated process pool with bounded admission."""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(security.verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingBusyError()
+        self.pending += 1
+        try:
+            result = await self._submit(func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    async def _submit(self, func, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM kill, crash) and took the pool down with it: start a new one and retry once
+            self._discard_executor(executor)
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise HashingBusyError()
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        # Concurrent calls see the same broken pool: only the first one replaces it
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use. Workers are spawned, not forked: forking a process that
+        # already runs threads (OCR pool, gRPC) is unsafe.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+
+password_hasher = PasswordHasher()
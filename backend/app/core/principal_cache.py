@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# How long a verified user is trusted before the DB is checked again
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+# Read endpoints accept the signed token claims without any DB check
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by the endpoints (detached from any DB session)."""
+    id: int
+    email: str
+
+
+class PrincipalCache:
+    """
+    Per-process cache of verified principals, keyed by token jti (or user id for tokens
+    issued without one). Entries expire after a short TTL, so a revocation made by another
+    worker is picked up within ttl_seconds. Revocations made here take effect immediately.
+    """
+
+    def __init__(self, ttl_seconds: int = PRINCIPAL_CACHE_TTL_SECONDS,
+                 max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, principal)
+        self._revoked: Dict[str, float] = {}  # jti -> token expiry (epoch seconds)
+        self._hits = 0
+        self._misses = 0
+        self._trusted = 0
+        self._rejected = 0
+
+    @staticmethod
+    def key_for(user_id: int, jti: Optional[str]) -> str:
+        return jti or f"user:{user_id}"
+
+    def get(self, key: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: str, principal: Principal):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        """Drops every cached entry of a user (call after the user row changes)."""
+        with self._lock:
+            for key in [key for key, (_, principal) in self._entries.items() if principal.id == user_id]:
+                del self._entries[key]
+
+    def revoke(self, jti: str, token_expires_at: float):
+        with self._lock:
+            self._entries.pop(jti, None)
+            self._revoked[jti] = token_expires_at
+            # Forget revocations of tokens that have expired anyway
+            now = time.time()
+            for expired in [key for key, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[expired]
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        with self._lock:
+            revoked = jti in self._revoked
+            if revoked:
+                self._rejected += 1
+            return revoked
+
+    def record_trusted(self):
+        with self._lock:
+            self._trusted += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "trusted_claims": self._trusted,
+                "revoked_rejections": self._rejected,
+                "revoked_tokens": len(self._revoked),
+            }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,46 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Login attempts allowed per client address and per account within the window
+LOGIN_RATE_LIMIT_PER_IP = int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", "30"))
+LOGIN_RATE_LIMIT_PER_ACCOUNT = int(os.getenv("LOGIN_RATE_LIMIT_PER_ACCOUNT", "10"))
+LOGIN_RATE_WINDOW_SECONDS = int(os.getenv("LOGIN_RATE_WINDOW_SECONDS", "60"))
+
+
+class SlidingWindowRateLimiter:
+    """In-process sliding-window limiter: at most `limit` hits per key within `window_seconds`."""
+
+    def __init__(self, limit: int, window_seconds: int, max_keys: int = 100000):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._hits: Dict[str, deque] = {}
+
+    def hit(self, key: str) -> Optional[int]:
+        """Records an attempt. Returns None if allowed, otherwise the seconds until the next free slot."""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                if len(self._hits) >= self.max_keys:
+                    self._prune(now)
+                hits = self._hits[key] = deque()
+            while hits and hits[0] <= now - self.window_seconds:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return max(1, int(hits[0] + self.window_seconds - now) + 1)
+            hits.append(now)
+            return None
+
+    def _prune(self, now: float):
+        # Drop keys without a hit in the current window
+        for key in [key for key, hits in self._hits.items() if not hits or hits[-1] <= now - self.window_seconds]:
+            del self._hits[key]
+
+
+login_ip_limiter = SlidingWindowRateLimiter(LOGIN_RATE_LIMIT_PER_IP, LOGIN_RATE_WINDOW_SECONDS)
+login_account_limiter = SlidingWindowRateLimiter(LOGIN_RATE_LIMIT_PER_ACCOUNT, LOGIN_RATE_WINDOW_SECONDS)
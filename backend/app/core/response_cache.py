@@ -0,0 +1,128 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .metrics import registry
+
+# Serialized list responses kept per worker process, bounded by total body size
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+# Larger bodies are served but not cached (one huge page would evict everything else)
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+response_cache_lookups = registry.counter(
+    "response_cache_lookups_total", "Cached list responses: hit, miss or not_modified (304)", ("cache", "result")
+)
+
+
+def make_etag(user_id: int, data_version: int, key: str) -> str:
+    """
+    Validator of one response: the user's data version plus the request parameters.
+    It changes whenever the user's data does, so it can be checked without building the response.
+    """
+    digest = hashlib.sha1(f"{user_id}:{data_version}:{key}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" are the same validator
+    return "*" in candidates or etag.removeprefix("W/") in [value.removeprefix("W/") for value in candidates]
+
+
+class ResponseCache:
+    """
+    Per-process LRU of serialized responses keyed by (user id, request key). Each entry
+    remembers the data version it was built from; a lookup with a newer version is a miss,
+    so writers only need to bump users.data_version (every worker notices on the next request).
+    """
+
+    def __init__(self, name: str, max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_entry_bytes: int = RESPONSE_CACHE_MAX_ENTRY_BYTES):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[int, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._evictions = 0
+        registry.add_collector(self._gauges)
+
+    def get(self, user_id: int, key: str, data_version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None or entry[0] != data_version:
+                if entry is not None:
+                    self._drop((user_id, key))
+                self._misses += 1
+                response_cache_lookups.inc(self.name, "miss")
+                return None
+            self._entries.move_to_end((user_id, key))
+            self._hits += 1
+        response_cache_lookups.inc(self.name, "hit")
+        return entry[1]
+
+    def put(self, user_id: int, key: str, data_version: int, body: bytes):
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if (user_id, key) in self._entries:
+                self._drop((user_id, key))
+            self._entries[(user_id, key)] = (data_version, body)
+            self._bytes += len(body)
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+        response_cache_lookups.inc(self.name, "not_modified")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self._not_modified,
+                "evictions": self._evictions,
+            }
+
+    def _drop(self, key: Tuple[int, str]):
+        # Caller holds the lock
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def _gauges(self) -> List[str]:
+        stats = self.stats()
+        lines = []
+        for metric, field, documentation in (
+                ("response_cache_entries", "entries", "Cached responses held by this process"),
+                ("response_cache_bytes", "bytes", "Body bytes held by the response cache"),
+        ):
+            lines.extend([
+                f"# HELP {metric} {documentation}", f"# TYPE {metric} gauge",
+                f'{metric}{{cache="{self.name}"}} {stats[field]}',
+            ])
+        return lines
+
+
+expense_list_cache = ResponseCache("expenses")
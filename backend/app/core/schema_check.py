@@ -0,0 +1,32 @@
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+# The app never changes the schema: migrations run once per deploy (`alembic upgrade head`).
+# At startup each worker only compares the database's revision with the newest one shipped.
+SCHEMA_CHECK_ENABLED = os.getenv("SCHEMA_CHECK_ENABLED", "true").lower() == "true"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              "migrations")
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> str:
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory(MIGRATIONS_DIR).get_current_head()
+
+
+def database_revision(engine: Engine) -> Optional[str]:
+    """The revision recorded by Alembic, or None for a database that was never migrated."""
+    with engine.connect() as conn:
+        try:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except DBAPIError:
+            return None
+
+
+def check_schema(engine: Engine) -> Tuple[Optional[str], str]:
+    """Returns (database revision, head revision); they differ when a migration is pending."""
+    return database_revision(engine), head_revision()
@@ -0,0 +1,57 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List
+from .metrics import registry
+
+# Logged through uvicorn's error logger, so the lines show up under uvicorn and gunicorn alike
+logger = logging.getLogger("uvicorn.error")
+
+
+class StartupTimer:
+    """
+    Cold-start timing of this process, by phase (import, ocr_client, lifespan...) plus
+    `ready`: seconds from process start to serving. A gunicorn worker forked from a
+    preloaded master restarts the clock at the fork (see gunicorn.conf.py), so its
+    `ready` is the worker's own boot time and `import` is the master's, paid once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._phases: Dict[str, float] = {}
+        registry.add_collector(self._gauges)
+
+    def restart(self):
+        with self._lock:
+            self._started = time.perf_counter()
+            self._phases.pop("ready", None)
+
+    def since_start(self) -> float:
+        return time.perf_counter() - self._started
+
+    def record(self, phase: str, seconds: float):
+        with self._lock:
+            self._phases[phase] = seconds
+
+    def ready(self) -> Dict[str, float]:
+        self.record("ready", self.since_start())
+        phases = self.stats()
+        logger.info("Worker %s ready in %.3fs (%s)", os.getpid(), phases["ready"],
+                    ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in phases.items() if phase != "ready"))
+        return phases
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {phase: round(seconds, 4) for phase, seconds in self._phases.items()}
+
+    def _gauges(self) -> List[str]:
+        lines = ["# HELP app_startup_seconds Cold-start time of this process by phase",
+                 "# TYPE app_startup_seconds gauge"]
+        for phase, seconds in self.stats().items():
+            lines.append(f'app_startup_seconds{{phase="{phase}"}} {seconds}')
+        return lines
+
+
+startup_timer = StartupTimer()
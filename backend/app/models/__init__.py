@@ -2,6 +2,13 @@
 from .base import Base
 from .user import User
 from .invoice import Invoice
+from .expense import Expense
+from .ocr_cache import OCRCacheEntry
+from .invoice_fingerprint import InvoiceFingerprint
+from .expense_summary import ExpenseMonthlySummary
+from .revoked_token import RevokedToken
+from .invoice_ocr_text import InvoiceOCRText
+from .invoice_search import InvoiceSearchDocument
 
 # This allows us to import all models from the 'models' package easily
-__all__ = ["Base", "User", "Invoice"]
\ No newline at end of file
+__all__ = ["Base", "User", "Invoice", "Expense", "OCRCacheEntry", "InvoiceFingerprint", "ExpenseMonthlySummary", "RevokedToken", "InvoiceOCRText", "InvoiceSearchDocument"]
\ No newline at end of file
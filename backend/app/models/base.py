@@ -1,7 +1,7 @@
 
 
 
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import declarative_base
 
-# The base class for all database models
+# The base class for all database models (the only one: its metadata is what the migrations track)
 Base = declarative_base()
@@ -1,13 +1,17 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.models.base import Base
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Owner lookups plus category filter/sort, id breaks ties
+        Index("ix_expenses_user_id_category_id", "user_id", "category", "id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     category = Column(String, default="אחר")
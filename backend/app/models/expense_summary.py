@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class ExpenseMonthlySummary(Base):
+    """Per-user rollup of expenses by month and category, kept up to date on every insert."""
+    __tablename__ = "expense_monthly_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # First day of the month
+    category = Column(String, primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
+    amount_before_vat = Column(Float, nullable=False, default=0.0)
+    amount_after_vat = Column(Float, nullable=False, default=0.0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
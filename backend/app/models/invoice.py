@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Index, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -6,11 +6,24 @@ from .base import Base
 
 class Invoice(Base):
     __tablename__ = "invoices"
-
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        # Expense list: filter by owner, then sort by one of these columns (id breaks ties)
+        Index("ix_invoices_user_id_transaction_date_id", "user_id", "transaction_date", "id"),
+        Index("ix_invoices_user_id_amount_after_vat_id", "user_id", "amount_after_vat", "id"),
+        Index("ix_invoices_user_id_amount_before_vat_id", "user_id", "amount_before_vat", "id"),
+        Index("ix_invoices_user_id_business_name_id", "user_id", "business_name", "id"),
+        # Substring vendor search (ILIKE '%term%') needs a trigram index (PostgreSQL only)
+        Index(
+            "ix_invoices_business_name_trgm", "business_name",
+            postgresql_using="gin",
+            postgresql_ops={"business_name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id = Column(Integer, primary_key=True)
 
     # Business Details extracted via OCR
-    business_name = Column(String, index=True)
+    business_name = Column(String)
     company_id = Column(String)  # Tax ID / H.P.
     invoice_number = Column(String, nullable=True)
     document_type = Column(String)  # e.g., "Invoice" or "Receipt"
@@ -22,7 +35,7 @@ class Invoice(Base):
     service_description = Column(String, nullable=True)
 
     # Category (Car, Food, IT, Operations, Training, Other)
-    category = Column(String, default="Other", index=True)
+    category = Column(String, default="Other")
 
     # Foreign Key to User
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -31,4 +44,12 @@ class Invoice(Base):
     owner = relationship("User", back_populates="invoices")
 
     # Metadata
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# The trigram index above needs the pg_trgm extension
+event.listen(
+    Invoice.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
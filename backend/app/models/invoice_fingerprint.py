@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class InvoiceFingerprint(Base):
+    """Links an invoice to the hash of the image it was created from, for duplicate detection."""
+    __tablename__ = "invoice_fingerprints"
+    __table_args__ = (
+        Index("ix_invoice_fingerprints_user_hash", "user_id", "content_hash"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
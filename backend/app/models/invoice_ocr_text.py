@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, LargeBinary, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class InvoiceOCRText(Base):
+    """Raw OCR text an invoice was parsed from (zlib-compressed), so it can be re-parsed later."""
+    __tablename__ = "invoice_ocr_texts"
+
+    invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True)
+    compressed_text = Column(LargeBinary, nullable=False)
+    # Uncompressed length in bytes (UTF-8)
+    raw_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Last time the re-parse command changed the invoice from this text
+    reparsed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from .base import Base
+
+
+class InvoiceSearchDocument(Base):
+    """
+    Full-text search document of an invoice: vendor name and invoice number (weight A),
+    expense notes (B) and the raw OCR text (C). A tsvector on PostgreSQL, lowercased
+    plain text elsewhere (matched with LIKE, for local development).
+    """
+    __tablename__ = "invoice_search_documents"
+    __table_args__ = (
+        Index("ix_invoice_search_documents_user_id", "user_id"),
+        Index(
+            "ix_invoice_search_documents_document", "document", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    document = Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=False)
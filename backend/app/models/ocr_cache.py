@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class OCRCacheEntry(Base):
+    __tablename__ = "ocr_cache_entries"
+
+    # SHA-256 of the uploaded image bytes
+    content_hash = Column(String(64), primary_key=True)
+
+    # Raw OCR text (parsed again on every hit)
+    raw_text = Column(Text, nullable=False)
+
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -6,10 +6,12 @@ from .base import Base
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped with every change to the user's invoices/expenses (see DataVersionRepository)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     invoices = relationship("Invoice", back_populates="owner", cascade="all, delete-orphan")
     expenses = relationship("Expense", back_populates="owner", cascade="all, delete-orphan")
\ No newline at end of file
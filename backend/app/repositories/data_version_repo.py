@@ -0,0 +1,32 @@
+from typing import Iterable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models.user import User
+
+
+class DataVersionRepository:
+    """
+    users.data_version counts the changes to a user's invoices and expenses. Writers bump
+    it in the same transaction as the change; cached responses and ETags are keyed on it.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def bump(self, user_ids: Iterable[int]):
+        """The caller owns the commit."""
+        # Sorted: concurrent writers lock the user rows in the same order (no deadlocks)
+        user_ids = sorted(set(user_ids))
+        if user_ids:
+            self.db.execute(
+                update(User).where(User.id.in_(user_ids)).values(data_version=User.data_version + 1)
+            )
+
+
+class AsyncDataVersionRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, user_id: int) -> Optional[int]:
+        return await self.db.scalar(select(User.data_version).where(User.id == user_id))
@@ -1,11 +1,209 @@
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+import os
+import json
+import base64
+from datetime import date
+from sqlalchemy import Row, Select, and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from typing import Iterator, List, Optional, Tuple
 from ..models.expense import Expense
 from ..models.invoice import Invoice
 from ..schemas.expense_schemas import ExpenseFilter
 
+# Map frontend keys to DB columns
+SORT_MAP = {
+    "business_name": Invoice.business_name,
+    "transaction_date": Invoice.transaction_date,
+    "amount_after_vat": Invoice.amount_after_vat,
+    "amount_before_vat": Invoice.amount_before_vat,
+    "category": Expense.category
+}
 
-class ExpenseRepository:
+# Columns of an expense export, in file order
+EXPORT_COLUMNS = (
+    Expense.id,
+    Invoice.transaction_date,
+    Invoice.business_name,
+    Invoice.company_id,
+    Invoice.invoice_number,
+    Invoice.document_type,
+    Expense.category,
+    Invoice.amount_before_vat,
+    Invoice.amount_after_vat,
+    Expense.notes,
+)
+# Columns of an expense list row, named like the ExpenseResponse fields (fast read path)
+LIST_COLUMNS = (
+    Expense.category,
+    Expense.notes,
+    Expense.id,
+    Expense.invoice_id,
+    Invoice.business_name,
+    Invoice.amount_before_vat,
+    Invoice.amount_after_vat,
+    Invoice.transaction_date,
+    Invoice.invoice_number,
+    Expense.created_at,
+)
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+
+def _sort_keys(sort_by: str):
+    """
+    Returns (sort column, owner column, tiebreak id column) for a sort key.
+    Invoices and expenses are created 1:1 for the same user, so the query is driven from
+    the table that holds the sort column: filtering on its user_id and breaking ties on its
+    id lets PostgreSQL walk the matching (user_id, column, id) index and stop after one page.
+    """
+    column = SORT_MAP[sort_by]
+    if column.table is Invoice.__table__:
+        return column, Invoice.user_id, Invoice.id
+    return column, Expense.user_id, Expense.id
+
+
+def apply_filters(query, filters: ExpenseFilter):
+    """Applies ExpenseFilter to a query (or select) that joins Expense and Invoice."""
+    if filters.category:
+        query = query.filter(Expense.category == filters.category)
+    if filters.business_name:
+        query = query.filter(Invoice.business_name.ilike(f"%{filters.business_name}%"))
+    if filters.start_date:
+        query = query.filter(Invoice.transaction_date >= filters.start_date)
+    if filters.end_date:
+        query = query.filter(Invoice.transaction_date <= filters.end_date)
+    # Amount bounds are on the total including VAT, the amount the list shows and sorts by
+    if filters.min_amount is not None:
+        query = query.filter(Invoice.amount_after_vat >= filters.min_amount)
+    if filters.max_amount is not None:
+        query = query.filter(Invoice.amount_after_vat <= filters.max_amount)
+    return query
+
+
+def _filter_owned(query, filters: ExpenseFilter, user_id: int, owner_column):
+    """apply_filters for a query already narrowed to the user on owner_column."""
+    query = apply_filters(query, filters)
+    ranges = (filters.start_date, filters.end_date, filters.min_amount, filters.max_amount)
+    if owner_column is Expense.user_id and any(value is not None for value in ranges):
+        # Redundant for the result (both rows belong to the user), but it lets the planner
+        # start from the (user_id, transaction_date/amount_after_vat, id) index for the range
+        query = query.where(Invoice.user_id == user_id)
+    return query
+
+
+def _apply_order(query, target_column, tiebreak_column, direction: str):
+    # The id column breaks ties so that every row has a unique, stable position.
+    # NULL placement is explicit (PostgreSQL's defaults) so keyset comparisons stay consistent.
+    if direction == "desc":
+        return query.order_by(target_column.desc().nulls_first(), tiebreak_column.desc())
+    return query.order_by(target_column.asc().nulls_last(), tiebreak_column.asc())
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or was issued for another sort order."""
+
+
+def _flatten(expenses: List[Expense]) -> List[Expense]:
+    # Flatten for the Pydantic schema
+    for exp in expenses:
+        exp.business_name = exp.invoice.business_name
+        exp.amount_before_vat = exp.invoice.amount_before_vat
+        exp.amount_after_vat = exp.invoice.amount_after_vat
+        exp.transaction_date = exp.invoice.transaction_date
+        exp.invoice_number = exp.invoice.invoice_number
+    return expenses
+
+
+class BaseExpenseRepository:
+    """Statement building and pagination cursors, shared by the sync and async repositories."""
+
+    def build_query(
+            self,
+            user_id: int,
+            filters: ExpenseFilter,
+            sort_by: str = "transaction_date",
+            direction: str = "desc",
+            limit: Optional[int] = None,
+            cursor: Optional[str] = None,
+            rows: bool = False
+    ) -> Select:
+        """
+        The filtered, sorted and paginated expense query (not executed). Selects Expense
+        objects with their invoice, or with rows=True just LIST_COLUMNS as plain rows.
+        """
+        sort_by = sort_by if sort_by in SORT_MAP else "transaction_date"
+        target_column, owner_column, tiebreak_column = _sort_keys(sort_by)
+
+        # Start the query with a join (the invoice is loaded from that same join)
+        if rows:
+            query = select(*LIST_COLUMNS).select_from(Expense)
+        else:
+            query = select(Expense).options(contains_eager(Expense.invoice))
+        query = query.join(Invoice, Expense.invoice_id == Invoice.id).where(owner_column == user_id)
+
+        # --- Filtering Logic ---
+        query = _filter_owned(query, filters, user_id, owner_column)
+
+        # --- Sorting Logic ---
+        query = _apply_order(query, target_column, tiebreak_column, direction)
+
+        # --- Keyset Pagination ---
+        if cursor:
+            value, last_id = self.decode_cursor(cursor, sort_by, direction)
+            query = query.where(self._after_cursor(target_column, tiebreak_column, direction, value, last_id))
+        if limit is not None:
+            query = query.limit(limit)
+
+        return query
+
+    def _split_page(self, rows: list, limit: int, sort_by: str, direction: str) -> Tuple[list, Optional[str]]:
+        # One extra row was fetched to know whether another page exists
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        sort_by = sort_by if sort_by in SORT_MAP else "transaction_date"
+        return rows, self.encode_cursor(rows[-1], sort_by, direction)
+
+    @staticmethod
+    def encode_cursor(expense, sort_by: str, direction: str) -> str:
+        """Cursor after `expense`, a flattened Expense or a LIST_COLUMNS row."""
+        value = getattr(expense, sort_by)
+        if isinstance(value, date):
+            value = value.isoformat()
+        _, _, tiebreak_column = _sort_keys(sort_by)
+        last_id = expense.invoice_id if tiebreak_column is Invoice.id else expense.id
+        payload = {"s": sort_by, "d": direction, "v": value, "id": last_id}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str, sort_by: str, direction: str):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            value, last_id = payload["v"], int(payload["id"])
+            if sort_by == "transaction_date" and value is not None:
+                value = date.fromisoformat(value)
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursorError("Invalid cursor")
+        if payload.get("s") != sort_by or payload.get("d") != direction:
+            raise InvalidCursorError("Cursor does not match the requested sort order")
+        return value, last_id
+
+    @staticmethod
+    def _after_cursor(column, id_column, direction: str, value, last_id: int):
+        """Rows strictly after (value, last_id) in the ORDER BY of build_query."""
+        if direction == "desc":
+            # NULLS FIRST: after a NULL come the remaining NULLs, then every non-NULL value
+            if value is None:
+                return or_(and_(column.is_(None), id_column < last_id), column.isnot(None))
+            return tuple_(column, id_column) < tuple_(value, last_id)
+
+        # NULLS LAST: after a value come larger values, then all NULLs
+        if value is None:
+            return and_(column.is_(None), id_column > last_id)
+        return or_(tuple_(column, id_column) > tuple_(value, last_id), column.is_(None))
+
+
+class ExpenseRepository(BaseExpenseRepository):
     def __init__(self, db: Session):
         self.db = db
 
@@ -14,49 +212,101 @@ class ExpenseRepository:
             user_id: int,
             filters: ExpenseFilter,
             sort_by: str = "transaction_date",
-            direction: str = "desc"
+            direction: str = "desc",
+            limit: Optional[int] = None,
+            cursor: Optional[str] = None
     ) -> List[Expense]:
+        query = self.build_query(user_id, filters, sort_by, direction, limit, cursor)
+        return _flatten(list(self.db.scalars(query).all()))
+
+    def iter_export_batches(
+            self,
+            user_id: int,
+            filters: ExpenseFilter,
+            sort_by: str = "transaction_date",
+            direction: str = "desc",
+            batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[List[Row]]:
+        """
+        Yields the filtered, sorted expenses as plain rows (EXPORT_COLUMNS), batch_size at a time.
+        Rows are read through a server-side cursor, so memory stays flat however many match.
+        """
+        sort_by = sort_by if sort_by in SORT_MAP else "transaction_date"
+        target_column, owner_column, tiebreak_column = _sort_keys(sort_by)
 
-        # Start the query with a join
-        query = self.db.query(Expense).join(Invoice).options(joinedload(Expense.invoice)).filter(
-            Expense.user_id == user_id
+        stmt = (
+            select(*EXPORT_COLUMNS)
+            .select_from(Expense)
+            .join(Invoice, Expense.invoice_id == Invoice.id)
+            .where(owner_column == user_id)
         )
+        stmt = _apply_order(_filter_owned(stmt, filters, user_id, owner_column), target_column, tiebreak_column, direction)
 
-        # --- Filtering Logic ---
-        if filters.category:
-            query = query.filter(Expense.category == filters.category)
-        if filters.business_name:
-            query = query.filter(Invoice.business_name.ilike(f"%{filters.business_name}%"))
-        if filters.start_date:
-            query = query.filter(Invoice.transaction_date >= filters.start_date)
-        if filters.end_date:
-            query = query.filter(Invoice.transaction_date <= filters.end_date)
+        result = self.db.execute(stmt.execution_options(yield_per=batch_size))
+        try:
+            for batch in result.partitions():
+                yield batch
+        finally:
+            result.close()
 
-        # --- Sorting Logic ---
-        # Map frontend keys to DB columns
-        sort_map = {
-            "business_name": Invoice.business_name,
-            "transaction_date": Invoice.transaction_date,
-            "amount_after_vat": Invoice.amount_after_vat,
-            "amount_before_vat": Invoice.amount_before_vat,
-            "category": Expense.category
-        }
+    def get_user_expenses_page(
+            self,
+            user_id: int,
+            filters: ExpenseFilter,
+            sort_by: str = "transaction_date",
+            direction: str = "desc",
+            limit: int = 50,
+            cursor: Optional[str] = None
+    ) -> Tuple[List[Expense], Optional[str]]:
+        """Returns one page of expenses and the cursor of the next page (None on the last page)."""
+        rows = self.get_user_expenses_with_filters(user_id, filters, sort_by, direction, limit + 1, cursor)
+        return self._split_page(rows, limit, sort_by, direction)
 
-        target_column = sort_map.get(sort_by, Invoice.transaction_date)
 
-        if direction == "desc":
-            query = query.order_by(target_column.desc())
-        else:
-            query = query.order_by(target_column.asc())
+class AsyncExpenseRepository(BaseExpenseRepository):
+    """ExpenseRepository for AsyncSession: the same queries, awaited instead of blocking."""
 
-        results = query.all()
+    def __init__(self, db: AsyncSession):
+        self.db = db
 
-        # Flatten for the Pydantic schema
-        for exp in results:
-            exp.business_name = exp.invoice.business_name
-            exp.amount_before_vat = exp.invoice.amount_before_vat
-            exp.amount_after_vat = exp.invoice.amount_after_vat
-            exp.transaction_date = exp.invoice.transaction_date
-            exp.invoice_number = exp.invoice.invoice_number
+    async def get_user_expenses_with_filters(
+            self,
+            user_id: int,
+            filters: ExpenseFilter,
+            sort_by: str = "transaction_date",
+            direction: str = "desc",
+            limit: Optional[int] = None,
+            cursor: Optional[str] = None
+    ) -> List[Expense]:
+        query = self.build_query(user_id, filters, sort_by, direction, limit, cursor)
+        return _flatten(list((await self.db.scalars(query)).all()))
 
-        return results
\ No newline at end of file
+    async def get_user_expenses_page(
+            self,
+            user_id: int,
+            filters: ExpenseFilter,
+            sort_by: str = "transaction_date",
+            direction: str = "desc",
+            limit: int = 50,
+            cursor: Optional[str] = None
+    ) -> Tuple[List[Expense], Optional[str]]:
+        """Returns one page of expenses and the cursor of the next page (None on the last page)."""
+        rows = await self.get_user_expenses_with_filters(user_id, filters, sort_by, direction, limit + 1, cursor)
+        return self._split_page(rows, limit, sort_by, direction)
+
+    async def get_user_expense_rows_page(
+            self,
+            user_id: int,
+            filters: ExpenseFilter,
+            sort_by: str = "transaction_date",
+            direction: str = "desc",
+            limit: int = 50,
+            cursor: Optional[str] = None
+    ) -> Tuple[List[Row], Optional[str]]:
+        """
+        get_user_expenses_page without the ORM: LIST_COLUMNS rows from a single join,
+        no identity map, no per-row attribute copying. Render with expense_page_json.
+        """
+        query = self.build_query(user_id, filters, sort_by, direction, limit + 1, cursor, rows=True)
+        rows = list((await self.db.execute(query)).all())
+        return self._split_page(rows, limit, sort_by, direction)
@@ -0,0 +1,150 @@
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from ..models.expense import Expense
+from ..models.invoice import Invoice
+from ..models.invoice_fingerprint import InvoiceFingerprint
+from ..models.invoice_ocr_text import InvoiceOCRText
+from ..schemas.expense_schemas import ExpenseCategory
+from ..schemas.invoice_schemas import InvoiceOCRResponse
+from .summary_repo import ExpenseSummaryRepository
+from .data_version_repo import DataVersionRepository
+from .ocr_text_repo import OCRTextRepository, ocr_text_values
+from .search_repo import SearchRepository
+
+
+class InvoiceRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_with_expense(
+            self,
+            user_id: int,
+            ocr_data: InvoiceOCRResponse,
+            category: ExpenseCategory,
+            notes: str = "Automatically processed",
+            content_hash: Optional[str] = None
+    ) -> Tuple[Invoice, Expense]:
+        """Adds an Invoice and its Expense to the session. The caller owns the commit."""
+        # 1. Create the Invoice record
+        new_invoice = Invoice(**self._invoice_values(user_id, ocr_data))
+        self.db.add(new_invoice)
+        self.db.flush()  # This generates new_invoice.id
+
+        # 2. Create the Expense record linked to the invoice
+        new_expense = Expense(
+            invoice_id=new_invoice.id,
+            user_id=user_id,
+            category=category,
+            notes=notes
+        )
+        self.db.add(new_expense)
+
+        # 3. Remember which image produced it, for duplicate detection
+        if content_hash:
+            self.db.add(InvoiceFingerprint(user_id=user_id, invoice_id=new_invoice.id, content_hash=content_hash))
+
+        # 4. Keep the raw OCR text, so the invoice can be re-parsed without another OCR call
+        if ocr_data.raw_text:
+            self.db.add(InvoiceOCRText(**ocr_text_values(new_invoice.id, ocr_data.raw_text)))
+
+        # 5. Make it searchable
+        SearchRepository(self.db).index_many([self._search_document(new_invoice.id, user_id, ocr_data, notes)])
+
+        # 6. Keep the monthly rollup in step (same transaction)
+        ExpenseSummaryRepository(self.db).record(user_id, [self._summary_entry(ocr_data, category)])
+
+        # 7. Invalidate the user's cached expense lists
+        DataVersionRepository(self.db).bump([user_id])
+        return new_invoice, new_expense
+
+    def bulk_create_with_expenses(
+            self,
+            user_id: int,
+            items: List[Tuple[InvoiceOCRResponse, ExpenseCategory, Optional[str]]],
+            notes: str = "Automatically processed"
+    ) -> List[Tuple[int, int]]:
+        """
+        Inserts many invoices and their expenses with multi-row INSERT ... RETURNING
+        statements. Items are (ocr_data, category, content_hash).
+        Returns (invoice_id, expense_id) pairs in input order. The caller owns the commit.
+        """
+        if not items:
+            return []
+
+        invoice_ids = self.db.scalars(
+            insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True),
+            [self._invoice_values(user_id, ocr_data) for ocr_data, _, _ in items]
+        ).all()
+
+        expense_ids = self.db.scalars(
+            insert(Expense).returning(Expense.id, sort_by_parameter_order=True),
+            [
+                {"invoice_id": invoice_id, "user_id": user_id, "category": category, "notes": notes}
+                for invoice_id, (_, category, _) in zip(invoice_ids, items)
+            ]
+        ).all()
+
+        fingerprints = [
+            {"user_id": user_id, "invoice_id": invoice_id, "content_hash": content_hash}
+            for invoice_id, (_, _, content_hash) in zip(invoice_ids, items)
+            if content_hash
+        ]
+        if fingerprints:
+            self.db.execute(insert(InvoiceFingerprint), fingerprints)
+
+        OCRTextRepository(self.db).add_many([
+            (invoice_id, ocr_data.raw_text)
+            for invoice_id, (ocr_data, _, _) in zip(invoice_ids, items)
+            if ocr_data.raw_text
+        ])
+
+        SearchRepository(self.db).index_many([
+            self._search_document(invoice_id, user_id, ocr_data, notes)
+            for invoice_id, (ocr_data, _, _) in zip(invoice_ids, items)
+        ])
+
+        ExpenseSummaryRepository(self.db).record(
+            user_id, [self._summary_entry(ocr_data, category) for ocr_data, category, _ in items]
+        )
+        DataVersionRepository(self.db).bump([user_id])
+
+        return list(zip(invoice_ids, expense_ids))
+
+    def find_duplicates(self, user_id: int, content_hashes: List[str]) -> Dict[str, Tuple[Invoice, Expense]]:
+        """Maps each hash to the user's existing invoice (and expense) created from the same image."""
+        if not content_hashes:
+            return {}
+        rows = self.db.execute(
+            select(InvoiceFingerprint.content_hash, Invoice, Expense)
+            .join(Invoice, InvoiceFingerprint.invoice_id == Invoice.id)
+            .join(Expense, Expense.invoice_id == Invoice.id)
+            .where(InvoiceFingerprint.user_id == user_id, InvoiceFingerprint.content_hash.in_(set(content_hashes)))
+            .order_by(Invoice.id.desc())
+        ).all()
+        # Oldest invoice wins when the same image was stored more than once
+        return {content_hash: (invoice, expense) for content_hash, invoice, expense in rows}
+
+    @staticmethod
+    def _invoice_values(user_id: int, ocr_data: InvoiceOCRResponse) -> dict:
+        return {
+            "user_id": user_id,
+            "document_type": ocr_data.document_type,
+            "business_name": ocr_data.business_name,
+            "company_id": ocr_data.business_vat_number,
+            "invoice_number": ocr_data.invoice_number,
+            "amount_before_vat": ocr_data.amount_before_vat,
+            "amount_after_vat": ocr_data.amount_after_vat,
+            "transaction_date": ocr_data.transaction_date,
+        }
+
+    @staticmethod
+    def _search_document(invoice_id: int, user_id: int, ocr_data: InvoiceOCRResponse, notes: Optional[str]) -> dict:
+        return {
+            "invoice_id": invoice_id, "user_id": user_id, "business_name": ocr_data.business_name,
+            "invoice_number": ocr_data.invoice_number, "notes": notes, "text": ocr_data.raw_text,
+        }
+
+    @staticmethod
+    def _summary_entry(ocr_data: InvoiceOCRResponse, category: ExpenseCategory):
+        return ocr_data.transaction_date, category, ocr_data.amount_before_vat, ocr_data.amount_after_vat
@@ -0,0 +1,103 @@
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from ..models.invoice import Invoice
+from ..models.invoice_fingerprint import InvoiceFingerprint
+from ..models.invoice_ocr_text import InvoiceOCRText
+from ..models.ocr_cache import OCRCacheEntry
+
+# Invoice columns the parser fills in (see InvoiceRepository._invoice_values)
+PARSED_COLUMNS = (
+    Invoice.document_type,
+    Invoice.business_name,
+    Invoice.company_id,
+    Invoice.invoice_number,
+    Invoice.amount_before_vat,
+    Invoice.amount_after_vat,
+    Invoice.transaction_date,
+)
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def ocr_text_values(invoice_id: int, text: str) -> dict:
+    return {"invoice_id": invoice_id, "compressed_text": compress_text(text), "raw_size": len(text.encode("utf-8"))}
+
+
+class OCRTextRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_many(self, texts: List[Tuple[int, str]]):
+        """Stores (invoice_id, raw_text) pairs. The caller owns the commit."""
+        if texts:
+            self.db.execute(insert(InvoiceOCRText), [ocr_text_values(invoice_id, text) for invoice_id, text in texts])
+
+    def count(self, user_id: Optional[int] = None) -> int:
+        stmt = select(func.count()).select_from(InvoiceOCRText)
+        if user_id is not None:
+            stmt = stmt.join(Invoice, InvoiceOCRText.invoice_id == Invoice.id).where(Invoice.user_id == user_id)
+        return self.db.scalar(stmt)
+
+    def iter_batches(self, user_id: Optional[int] = None, batch_size: int = 1000,
+                     after_id: int = 0) -> Iterator[list]:
+        """
+        Yields (invoice_id, user_id, compressed_text, *PARSED_COLUMNS) rows in invoice id order,
+        batch_size at a time. Each batch is its own keyset query, so no cursor stays open
+        while the caller writes between batches.
+        """
+        while True:
+            stmt = (
+                select(InvoiceOCRText.invoice_id, Invoice.user_id, InvoiceOCRText.compressed_text, *PARSED_COLUMNS)
+                .join(Invoice, InvoiceOCRText.invoice_id == Invoice.id)
+                .where(InvoiceOCRText.invoice_id > after_id)
+                .order_by(InvoiceOCRText.invoice_id)
+                .limit(batch_size)
+            )
+            if user_id is not None:
+                stmt = stmt.where(Invoice.user_id == user_id)
+            batch = [tuple(row) for row in self.db.execute(stmt)]
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1][0]
+
+    def apply_reparsed(self, changes: List[dict]):
+        """
+        Writes re-parsed invoice fields back with one executemany UPDATE per chunk.
+        Each dict holds the invoice `id` plus the changed columns. The caller owns the commit.
+        """
+        if not changes:
+            return
+        self.db.execute(update(Invoice), changes)
+        self.db.execute(
+            update(InvoiceOCRText)
+            .where(InvoiceOCRText.invoice_id.in_([change["id"] for change in changes]))
+            .values(reparsed_at=datetime.now(timezone.utc))
+        )
+
+    def backfill_from_cache(self, batch_size: int = 1000) -> int:
+        """
+        Stores raw text for invoices created before texts were kept, using the OCR cache
+        entry of the image they came from (when it has not been evicted). The caller owns the commit.
+        """
+        stmt = (
+            select(InvoiceFingerprint.invoice_id, func.min(OCRCacheEntry.raw_text))
+            .join(OCRCacheEntry, OCRCacheEntry.content_hash == InvoiceFingerprint.content_hash)
+            .outerjoin(InvoiceOCRText, InvoiceOCRText.invoice_id == InvoiceFingerprint.invoice_id)
+            .where(InvoiceOCRText.invoice_id.is_(None))
+            .group_by(InvoiceFingerprint.invoice_id)
+        )
+        stored = 0
+        for batch in self.db.execute(stmt.execution_options(yield_per=batch_size)).partitions():
+            self.add_many([(invoice_id, text) for invoice_id, text in batch])
+            stored += len(batch)
+        return stored
@@ -0,0 +1,186 @@
+import os
+from datetime import date, timedelta
+from sqlalchemy import Date, Integer, cast, func, literal_column, select
+from sqlalchemy.orm import Session
+from typing import List
+from ..models.expense import Expense
+from ..models.expense_summary import ExpenseMonthlySummary
+from ..models.invoice import Invoice
+from ..schemas.expense_schemas import ExpenseFilter
+from ..schemas.report_schemas import (
+    ReportPeriod, ReportTotals, CategoryBreakdown, VendorBreakdown, TimeSeriesPoint
+)
+from .expense_repo import apply_filters
+
+VENDOR_REPORT_LIMIT = 20
+# Serve reports from expense_monthly_summaries whenever the filters allow it
+REPORT_USE_SUMMARIES = os.getenv("REPORT_USE_SUMMARIES", "true").lower() == "true"
+
+
+def _totals_columns():
+    return (
+        func.count(Expense.id).label("count"),
+        func.coalesce(func.sum(Invoice.amount_before_vat), 0).label("amount_before_vat"),
+        func.coalesce(func.sum(Invoice.amount_after_vat), 0).label("amount_after_vat"),
+        func.coalesce(func.sum(Invoice.amount_after_vat - Invoice.amount_before_vat), 0).label("vat"),
+    )
+
+
+def _summary_totals_columns():
+    before = func.coalesce(func.sum(ExpenseMonthlySummary.amount_before_vat), 0)
+    after = func.coalesce(func.sum(ExpenseMonthlySummary.amount_after_vat), 0)
+    return (
+        func.coalesce(func.sum(ExpenseMonthlySummary.count), 0).label("count"),
+        before.label("amount_before_vat"),
+        after.label("amount_after_vat"),
+        (after - before).label("vat"),
+    )
+
+
+def _totals(row) -> dict:
+    return {
+        "count": row.count,
+        "amount_before_vat": round(float(row.amount_before_vat), 2),
+        "amount_after_vat": round(float(row.amount_after_vat), 2),
+        "vat": round(float(row.vat), 2),
+    }
+
+
+def period_start(column, period: ReportPeriod, dialect: str):
+    """SQL expression for the first day of the month/quarter containing a date column."""
+    if dialect == "postgresql":
+        # Inlined rather than bound so the SELECT and GROUP BY expressions are identical
+        return cast(func.date_trunc(literal_column(f"'{period.value}'"), column), Date)
+
+    # SQLite (local development)
+    if period == ReportPeriod.MONTH:
+        return func.strftime("%Y-%m-01", column)
+    month = cast(func.strftime("%m", column), Integer)
+    return func.printf("%s-%02d-01", func.strftime("%Y", column), (month - 1) // 3 * 3 + 1)
+
+
+def _next_period(start: date, period: ReportPeriod) -> date:
+    months = 1 if period == ReportPeriod.MONTH else 3
+    month_index = start.year * 12 + start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _period_start(day: date, period: ReportPeriod) -> date:
+    month = day.month if period == ReportPeriod.MONTH else (day.month - 1) // 3 * 3 + 1
+    return date(day.year, month, 1)
+
+
+class ReportRepository:
+    """
+    Expense reports aggregated in the database (GROUP BY), one small result per request.
+    Whole-month reports without a vendor filter read the precomputed monthly rollup;
+    anything finer-grained aggregates invoices/expenses directly.
+    """
+
+    def __init__(self, db: Session, use_summaries: bool = REPORT_USE_SUMMARIES):
+        self.db = db
+        self.use_summaries = use_summaries
+
+    def get_totals(self, user_id: int, filters: ExpenseFilter) -> ReportTotals:
+        row = self.db.execute(self._select(user_id, filters, *self._totals_columns(filters))).one()
+        return ReportTotals(**_totals(row))
+
+    def get_by_category(self, user_id: int, filters: ExpenseFilter) -> List[CategoryBreakdown]:
+        totals = self._totals_columns(filters)
+        category = ExpenseMonthlySummary.category if self._from_summary(filters) else Expense.category
+        stmt = (
+            self._select(user_id, filters, category.label("category"), *totals)
+            .group_by(category)
+            .order_by(totals[2].desc())
+        )
+        return [CategoryBreakdown(category=row.category, **_totals(row)) for row in self.db.execute(stmt)]
+
+    def get_by_vendor(self, user_id: int, filters: ExpenseFilter,
+                      limit: int = VENDOR_REPORT_LIMIT) -> List[VendorBreakdown]:
+        """Top vendors by spend (always from invoices, the rollup has no vendor)."""
+        totals = _totals_columns()
+        stmt = (
+            self._select_rows(user_id, filters, Invoice.business_name, *totals)
+            .group_by(Invoice.business_name)
+            .order_by(totals[2].desc(), Invoice.business_name)
+            .limit(limit)
+        )
+        return [
+            VendorBreakdown(business_name=row.business_name or "Unknown Vendor", **_totals(row))
+            for row in self.db.execute(stmt)
+        ]
+
+    def get_time_series(self, user_id: int, filters: ExpenseFilter,
+                        period: ReportPeriod = ReportPeriod.MONTH) -> List[TimeSeriesPoint]:
+        """Totals per month/quarter. Periods without expenses are returned with zero totals."""
+        if self._from_summary(filters):
+            day_column = ExpenseMonthlySummary.month
+        else:
+            day_column = Invoice.transaction_date
+        bucket = period_start(day_column, period, self._dialect()).label("period_start")
+        stmt = (
+            self._select(user_id, filters, bucket, *self._totals_columns(filters))
+            .where(day_column.isnot(None))
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        found = {}
+        for row in self.db.execute(stmt):
+            start = row.period_start
+            if isinstance(start, str):  # SQLite returns text dates
+                start = date.fromisoformat(start)
+            found[start] = _totals(row)
+
+        first = _period_start(filters.start_date, period) if filters.start_date else min(found, default=None)
+        last = _period_start(filters.end_date, period) if filters.end_date else max(found, default=None)
+        if first is None or last is None:
+            return []
+
+        points = []
+        current = first
+        while current <= last:
+            points.append(TimeSeriesPoint(period_start=current, **found.get(current, {})))
+            current = _next_period(current, period)
+        return points
+
+    def _from_summary(self, filters: ExpenseFilter) -> bool:
+        """The rollup can answer only whole months and has no vendor or amount dimension."""
+        if not self.use_summaries or filters.business_name:
+            return False
+        if filters.min_amount is not None or filters.max_amount is not None:
+            return False
+        if filters.start_date and filters.start_date.day != 1:
+            return False
+        if filters.end_date and (filters.end_date + timedelta(days=1)).day != 1:
+            return False
+        return True
+
+    def _totals_columns(self, filters: ExpenseFilter):
+        return _summary_totals_columns() if self._from_summary(filters) else _totals_columns()
+
+    def _select(self, user_id: int, filters: ExpenseFilter, *columns):
+        if not self._from_summary(filters):
+            return self._select_rows(user_id, filters, *columns)
+
+        stmt = select(*columns).where(ExpenseMonthlySummary.user_id == user_id)
+        if filters.category:
+            stmt = stmt.where(ExpenseMonthlySummary.category == filters.category)
+        if filters.start_date:
+            stmt = stmt.where(ExpenseMonthlySummary.month >= filters.start_date)
+        if filters.end_date:
+            stmt = stmt.where(ExpenseMonthlySummary.month <= filters.end_date)
+        return stmt
+
+    def _select_rows(self, user_id: int, filters: ExpenseFilter, *columns):
+        # Aggregates read every matching row, so both sides are narrowed to the owner:
+        # PostgreSQL then hash-joins two small index scans instead of scanning all expenses.
+        stmt = (
+            select(*columns)
+            .select_from(Expense)
+            .join(Invoice, Expense.invoice_id == Invoice.id)
+            .where(Invoice.user_id == user_id, Expense.user_id == user_id)
+        )
+        return apply_filters(stmt, filters)
+
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
@@ -0,0 +1,206 @@
+import os
+import re
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import Select, and_, bindparam, cast, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models.expense import Expense
+from ..models.invoice import Invoice
+from ..models.invoice_ocr_text import InvoiceOCRText
+from ..models.invoice_search import InvoiceSearchDocument
+from .ocr_text_repo import decompress_text
+
+# Text search configuration of the search documents and queries. 'simple' lowercases
+# words without stemming, which works for Hebrew (PostgreSQL ships no Hebrew dictionary)
+# and English alike. Changing it needs a rebuild (python -m app.commands.rebuild_search_index).
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+# OCR text beyond this many characters is not indexed (tsvectors are limited to 1 MB)
+SEARCH_MAX_TEXT_CHARS = int(os.getenv("SEARCH_MAX_TEXT_CHARS", "20000"))
+# Words of a query beyond this are ignored
+SEARCH_MAX_TERMS = 8
+
+# Letters and digits only: everything else (quotes, &, |, !, :) is tsquery syntax
+_TERM = re.compile(r"[^\W_]+")
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE (see summary_repo)
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Columns of a search hit, plus its rank
+HIT_COLUMNS = (
+    Expense.id.label("expense_id"),
+    Invoice.id.label("invoice_id"),
+    Invoice.business_name,
+    Invoice.invoice_number,
+    Invoice.transaction_date,
+    Invoice.amount_after_vat,
+    Expense.category,
+)
+
+
+def search_terms(query: str) -> List[str]:
+    return _TERM.findall(query.lower())[:SEARCH_MAX_TERMS]
+
+
+def _words(value: Optional[str]) -> str:
+    """
+    Splits the text into the same words as search_terms. Left to the PostgreSQL parser,
+    "INV-2024-0017" would become 'inv', '-2024', '-0017' and a search for 2024 would miss it.
+    """
+    return " ".join(_TERM.findall(value.lower())) if value else ""
+
+
+def _weighted(value, weight: str):
+    return func.setweight(func.to_tsvector(cast(SEARCH_TS_CONFIG, REGCONFIG), func.coalesce(value, "")), weight)
+
+
+def _tsquery(terms: List[str]):
+    # Every word must match, each as a prefix so partial words and invoice numbers are found
+    return func.to_tsquery(cast(SEARCH_TS_CONFIG, REGCONFIG), " & ".join(f"{term}:*" for term in terms))
+
+
+class BaseSearchRepository:
+    """Search statement building, shared by the sync and async repositories."""
+
+    @staticmethod
+    def build_search(dialect: str, user_id: int, terms: List[str], limit: int, offset: int = 0) -> Select:
+        """
+        Invoices of the user whose document matches every term, best match first.
+        PostgreSQL ranks with ts_rank_cd (name and number outweigh notes, notes outweigh
+        OCR text) over the GIN index; other databases fall back to LIKE, newest first.
+        """
+        document = InvoiceSearchDocument.document
+        if dialect == "postgresql":
+            query = _tsquery(terms)
+            rank = func.ts_rank_cd(document, query)
+            match = document.op("@@")(query)
+        else:
+            rank = literal(0.0)
+            match = and_(*(document.like(f"%{term}%") for term in terms))
+
+        return (
+            select(*HIT_COLUMNS, rank.label("rank"))
+            .select_from(InvoiceSearchDocument)
+            .join(Invoice, Invoice.id == InvoiceSearchDocument.invoice_id)
+            .join(Expense, Expense.invoice_id == Invoice.id)
+            .where(InvoiceSearchDocument.user_id == user_id, match)
+            .order_by(rank.desc(), InvoiceSearchDocument.invoice_id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+
+
+class SearchRepository(BaseSearchRepository):
+    """Maintains invoice_search_documents. Writers index invoices in the same transaction that creates them."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def index_many(self, documents: List[dict]):
+        """
+        Upserts search documents. Each dict holds invoice_id, user_id, business_name,
+        invoice_number, notes and text (raw OCR text), any of them may be None.
+        The caller owns the commit.
+        """
+        if not documents:
+            return
+        dialect = self.db.get_bind().dialect.name
+        table = InvoiceSearchDocument.__table__
+        insert = _UPSERT_INSERTS[dialect]
+        if dialect == "postgresql":
+            # The tsvector is built by the database from the fields, split into words
+            stmt = insert(table).values(document=(
+                _weighted(bindparam("p_business_name"), "A")
+                .op("||")(_weighted(bindparam("p_invoice_number"), "A"))
+                .op("||")(_weighted(bindparam("p_notes"), "B"))
+                .op("||")(_weighted(bindparam("p_text"), "C"))
+            ))
+            params = [
+                {
+                    "invoice_id": doc["invoice_id"], "user_id": doc["user_id"],
+                    "p_business_name": _words(doc.get("business_name")),
+                    "p_invoice_number": _words(doc.get("invoice_number")),
+                    "p_notes": _words(doc.get("notes")),
+                    "p_text": _words((doc.get("text") or "")[:SEARCH_MAX_TEXT_CHARS]),
+                }
+                for doc in documents
+            ]
+        else:
+            stmt = insert(table)
+            params = [
+                {"invoice_id": doc["invoice_id"], "user_id": doc["user_id"], "document": self._plain_document(doc)}
+                for doc in documents
+            ]
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.invoice_id], set_={"document": stmt.excluded.document})
+        self.db.execute(stmt, params)
+
+    def refresh(self, invoice_ids: List[int]) -> int:
+        """Re-indexes invoices from their current fields and stored OCR text. The caller owns the commit."""
+        if not invoice_ids:
+            return 0
+        rows = self.db.execute(
+            select(Invoice.id, Invoice.user_id, Invoice.business_name, Invoice.invoice_number,
+                   Expense.notes, InvoiceOCRText.compressed_text)
+            .outerjoin(Expense, Expense.invoice_id == Invoice.id)
+            .outerjoin(InvoiceOCRText, InvoiceOCRText.invoice_id == Invoice.id)
+            .where(Invoice.id.in_(invoice_ids))
+        ).all()
+        self.index_many([
+            {
+                "invoice_id": invoice_id, "user_id": user_id, "business_name": business_name,
+                "invoice_number": invoice_number, "notes": notes,
+                "text": decompress_text(compressed_text) if compressed_text is not None else None,
+            }
+            for invoice_id, user_id, business_name, invoice_number, notes, compressed_text in rows
+        ])
+        return len(rows)
+
+    def iter_invoice_ids(self, user_id: Optional[int] = None, batch_size: int = 1000,
+                         after_id: int = 0) -> Iterator[List[int]]:
+        """Yields invoice ids in order, batch_size at a time (keyset queries, see OCRTextRepository.iter_batches)."""
+        while True:
+            stmt = select(Invoice.id).where(Invoice.id > after_id).order_by(Invoice.id).limit(batch_size)
+            if user_id is not None:
+                stmt = stmt.where(Invoice.user_id == user_id)
+            batch = list(self.db.scalars(stmt))
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1]
+
+    def search(self, user_id: int, query: str, limit: int = 20, offset: int = 0) -> List[tuple]:
+        terms = search_terms(query)
+        if not terms:
+            return []
+        stmt = self.build_search(self.db.get_bind().dialect.name, user_id, terms, limit, offset)
+        return list(self.db.execute(stmt).all())
+
+    @staticmethod
+    def _plain_document(doc: dict) -> str:
+        parts = (doc.get("business_name"), doc.get("invoice_number"), doc.get("notes"),
+                 (doc.get("text") or "")[:SEARCH_MAX_TEXT_CHARS])
+        return " ".join(_words(part) for part in parts if part)
+
+
+class AsyncSearchRepository(BaseSearchRepository):
+    """Search for AsyncSession (the endpoint); indexing stays with the sync writers."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search_page(self, user_id: int, query: str, limit: int = 20,
+                          offset: int = 0) -> Tuple[List[tuple], Optional[int]]:
+        """Returns one page of hits and the offset of the next page (None on the last page)."""
+        terms = search_terms(query)
+        if not terms:
+            return [], None
+        # One extra row tells whether another page exists
+        stmt = self.build_search(self.db.get_bind().dialect.name, user_id, terms, limit + 1, offset)
+        rows = list((await self.db.execute(stmt)).all())
+        if len(rows) <= limit:
+            return rows, None
+        return rows[:limit], offset + limit
@@ -0,0 +1,116 @@
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import delete, func, literal_column, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional, Tuple
+from ..models.expense import Expense
+from ..models.expense_summary import ExpenseMonthlySummary
+from ..models.invoice import Invoice
+from ..schemas.expense_schemas import ExpenseCategory
+from ..schemas.report_schemas import ReportPeriod
+from .report_repo import period_start
+
+# (transaction_date, category, amount_before_vat, amount_after_vat)
+SummaryEntry = Tuple[Optional[date], str, Optional[float], Optional[float]]
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class ExpenseSummaryRepository:
+    """
+    Maintains expense_monthly_summaries. Writers call record() in the same transaction
+    as the invoice/expense change, so the rollup is always consistent with the rows.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, user_id: int, entries: Iterable[SummaryEntry], sign: int = 1):
+        """
+        Adds expenses to the rollup (sign=-1 removes them, e.g. before an edit or a delete).
+        Expenses without a transaction date are not part of the monthly rollup.
+        """
+        deltas = defaultdict(lambda: [0, 0.0, 0.0])
+        for transaction_date, category, amount_before_vat, amount_after_vat in entries:
+            if transaction_date is None:
+                continue
+            category = getattr(category, "value", category) or ExpenseCategory.OTHER.value
+            key = (date(transaction_date.year, transaction_date.month, 1), category)
+            delta = deltas[key]
+            delta[0] += sign
+            delta[1] += sign * (amount_before_vat or 0.0)
+            delta[2] += sign * (amount_after_vat or 0.0)
+        if not deltas:
+            return
+
+        table = ExpenseMonthlySummary.__table__
+        insert = _UPSERT_INSERTS[self.db.get_bind().dialect.name]
+        # Sorted keys: concurrent batches lock the same rows in the same order (no deadlocks)
+        stmt = insert(table).values([
+            {
+                "user_id": user_id, "month": month, "category": category,
+                "count": count, "amount_before_vat": before, "amount_after_vat": after
+            }
+            for (month, category), (count, before, after) in sorted(deltas.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.month, table.c.category],
+            set_={
+                "count": table.c.count + stmt.excluded.count,
+                "amount_before_vat": table.c.amount_before_vat + stmt.excluded.amount_before_vat,
+                "amount_after_vat": table.c.amount_after_vat + stmt.excluded.amount_after_vat,
+                "updated_at": func.now(),
+            }
+        )
+        self.db.execute(stmt)
+
+        if sign < 0:
+            self.db.execute(delete(ExpenseMonthlySummary).where(
+                ExpenseMonthlySummary.user_id == user_id, ExpenseMonthlySummary.count <= 0
+            ))
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """
+        Recomputes the rollup from invoices/expenses (all users, or one). The caller owns the commit.
+        Returns the number of summary rows written.
+        """
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            # Blocks concurrent record() calls until we commit so no upload is counted twice.
+            # Readers are not blocked.
+            self.db.execute(text("LOCK TABLE expense_monthly_summaries IN EXCLUSIVE MODE"))
+
+        cleanup = delete(ExpenseMonthlySummary)
+        if user_id is not None:
+            cleanup = cleanup.where(ExpenseMonthlySummary.user_id == user_id)
+        self.db.execute(cleanup)
+
+        month = period_start(Invoice.transaction_date, ReportPeriod.MONTH, dialect)
+        # Inlined constant so the SELECT and GROUP BY expressions are identical
+        category = func.coalesce(Expense.category, literal_column(f"'{ExpenseCategory.OTHER.value}'"))
+        source = (
+            select(
+                Expense.user_id,
+                month,
+                category,
+                func.count(Expense.id),
+                func.coalesce(func.sum(Invoice.amount_before_vat), 0),
+                func.coalesce(func.sum(Invoice.amount_after_vat), 0),
+            )
+            .join(Invoice, Expense.invoice_id == Invoice.id)
+            .where(Invoice.transaction_date.isnot(None))
+            .group_by(Expense.user_id, month, category)
+        )
+        if user_id is not None:
+            source = source.where(Expense.user_id == user_id)
+
+        table = ExpenseMonthlySummary.__table__
+        result = self.db.execute(table.insert().from_select(
+            ["user_id", "month", "category", "count", "amount_before_vat", "amount_after_vat"], source
+        ))
+        return result.rowcount
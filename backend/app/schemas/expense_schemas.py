@@ -1,7 +1,8 @@
 from pydantic import BaseModel
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
+from ..core import fast_json
 
 class ExpenseCategory(str, Enum):
     VEHICLE = "רכב"
@@ -34,4 +35,20 @@ class ExpenseFilter(BaseModel):
     min_amount: Optional[float] = None
     max_amount: Optional[float] = None
     category: Optional[ExpenseCategory] = None
-    business_name: Optional[str] = None
\ No newline at end of file
+    business_name: Optional[str] = None
+
+class ExpensePage(BaseModel):
+    items: List[ExpenseResponse]
+    next_cursor: Optional[str] = None
+
+def expense_page_json(rows: list, next_cursor: Optional[str]) -> bytes:
+    """
+    The ExpensePage body built straight from list rows (named like the ExpenseResponse
+    fields, see expense_repo.LIST_COLUMNS), skipping per-row model validation.
+    """
+    fields = rows[0]._fields if rows else ()
+    return fast_json.dumps({"items": [dict(zip(fields, row)) for row in rows], "next_cursor": next_cursor})
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    XLSX = "xlsx"
@@ -1,7 +1,7 @@
 
-from pydantic import BaseModel
-from datetime import date
-from typing import Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import List, Optional
 from enum import Enum
 
 class DocumentType(str, Enum):
@@ -16,4 +16,54 @@ class InvoiceOCRResponse(BaseModel):
     amount_after_vat: float
     transaction_date: date
     invoice_number: Optional[str] = None
-    service_description: Optional[str] = None
\ No newline at end of file
+    service_description: Optional[str] = None
+    # Raw OCR text the fields were parsed from; stored with the invoice, never serialized
+    raw_text: Optional[str] = Field(default=None, exclude=True)
+
+class UploadResult(BaseModel):
+    status: str = "success"  # "duplicate" when an identical image was already uploaded
+    expense_id: int
+    business_name: str
+    amount: float
+    date: date
+
+    @classmethod
+    def from_records(cls, invoice, expense, status: str = "success") -> "UploadResult":
+        """Builds the result from stored Invoice and Expense rows."""
+        return cls(
+            status=status,
+            expense_id=expense.id,
+            business_name=invoice.business_name,
+            amount=invoice.amount_after_vat,
+            date=invoice.transaction_date
+        )
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class UploadJobResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[UploadResult] = None
+    error: Optional[str] = None
+
+
+class BatchUploadItem(BaseModel):
+    filename: str
+    status: str  # "success", "duplicate" or "failed"
+    result: Optional[UploadResult] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    succeeded: int
+    duplicates: int = 0
+    failed: int
+    items: List[BatchUploadItem]
@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List
+from enum import Enum
+
+class ReportPeriod(str, Enum):
+    MONTH = "month"
+    QUARTER = "quarter"
+
+class ReportTotals(BaseModel):
+    count: int = 0
+    amount_before_vat: float = 0.0
+    amount_after_vat: float = 0.0
+    vat: float = 0.0
+
+class CategoryBreakdown(ReportTotals):
+    category: str
+
+class VendorBreakdown(ReportTotals):
+    business_name: str
+
+class TimeSeriesPoint(ReportTotals):
+    period_start: date
+
+class ReportSummary(BaseModel):
+    totals: ReportTotals
+    by_category: List[CategoryBreakdown]
+
+class TimeSeries(BaseModel):
+    period: ReportPeriod
+    points: List[TimeSeriesPoint]
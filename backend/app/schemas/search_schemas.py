@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+
+
+class SearchHit(BaseModel):
+    expense_id: int
+    invoice_id: int
+    business_name: Optional[str] = None
+    invoice_number: Optional[str] = None
+    transaction_date: Optional[date] = None
+    amount_after_vat: Optional[float] = None
+    category: Optional[str] = None
+    rank: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    items: List[SearchHit]
+    # Pass as `offset` for the next page, None on the last page
+    next_offset: Optional[int] = None
@@ -0,0 +1,93 @@
+import io
+import csv
+import tempfile
+from typing import Iterator, List
+from ..database import SessionLocal
+from ..repositories.expense_repo import ExpenseRepository
+from ..schemas.expense_schemas import ExpenseFilter
+
+# XLSX export is optional: it needs openpyxl
+try:
+    from openpyxl import Workbook
+except ImportError:  # pragma: no cover - depends on the environment
+    Workbook = None
+
+EXPORT_HEADERS = [
+    "Expense ID", "Date", "Vendor", "Business ID", "Invoice #", "Document Type",
+    "Category", "Amount Before VAT", "VAT", "Amount After VAT", "Notes"
+]
+# Size of the pieces an XLSX file is streamed in
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+class ExportUnavailableError(Exception):
+    """Raised when the requested export format cannot be produced on this server."""
+
+
+def _export_values(row) -> list:
+    vat = None
+    if row.amount_before_vat is not None and row.amount_after_vat is not None:
+        vat = round(row.amount_after_vat - row.amount_before_vat, 2)
+    return [
+        row.id, row.transaction_date, row.business_name, row.company_id, row.invoice_number,
+        row.document_type, row.category, row.amount_before_vat, vat, row.amount_after_vat, row.notes
+    ]
+
+
+class ExpenseExporter:
+    """
+    Produces expense exports as generators for StreamingResponse. Each export opens its
+    own DB session, because the response body is produced after the request handler returns.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def csv_stream(self, user_id: int, filters: ExpenseFilter,
+                   sort_by: str = "transaction_date", direction: str = "desc") -> Iterator[str]:
+        """Yields the CSV file one batch of rows at a time."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write("\ufeff")  # BOM so Excel opens the Hebrew text as UTF-8
+        writer.writerow(EXPORT_HEADERS)
+
+        for batch in self._batches(user_id, filters, sort_by, direction):
+            writer.writerows(_export_values(row) for row in batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():  # Nothing matched: just the header
+            yield buffer.getvalue()
+
+    def xlsx_stream(self, user_id: int, filters: ExpenseFilter,
+                    sort_by: str = "transaction_date", direction: str = "desc") -> Iterator[bytes]:
+        """
+        Returns the XLSX file as a stream of bytes. A workbook is a zip archive that can only be sent once complete,
+        so rows go through openpyxl's write-only mode into a temporary file first.
+        """
+        # Checked up front: once streaming has started the error could no longer become a 4xx
+        if Workbook is None:
+            raise ExportUnavailableError("XLSX export requires openpyxl on the server")
+        return self._xlsx_chunks(user_id, filters, sort_by, direction)
+
+    def _xlsx_chunks(self, user_id: int, filters: ExpenseFilter, sort_by: str, direction: str) -> Iterator[bytes]:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Expenses")
+        sheet.append(EXPORT_HEADERS)
+        for batch in self._batches(user_id, filters, sort_by, direction):
+            for row in batch:
+                sheet.append(_export_values(row))
+
+        with tempfile.TemporaryFile() as output:
+            workbook.save(output)
+            output.seek(0)
+            while chunk := output.read(XLSX_CHUNK_SIZE):
+                yield chunk
+
+    def _batches(self, user_id: int, filters: ExpenseFilter, sort_by: str, direction: str) -> Iterator[List]:
+        db = self.session_factory()
+        try:
+            yield from ExpenseRepository(db).iter_export_batches(user_id, filters, sort_by, direction)
+        finally:
+            db.close()
@@ -0,0 +1,214 @@
+import os
+import uuid
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..database import SessionLocal
+from ..repositories.invoice_repo import InvoiceRepository
+from ..schemas.expense_schemas import ExpenseCategory
+from ..schemas.invoice_schemas import InvoiceOCRResponse, JobStatus, UploadJobResponse, UploadResult
+from .ocr_cache import hash_content
+from .ocr_service import OCRService, OCRQueueFullError
+from .upload_service import InspectedUpload, UploadKind, UploadMemoryBudget, upload_memory_budget
+
+# Background ingestion settings
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+# Max uploads waiting for a worker; beyond this the POST is rejected with 429
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "200"))
+# How many finished jobs are remembered for status polling
+INGEST_MAX_JOBS = int(os.getenv("INGEST_MAX_JOBS", "5000"))
+
+
+class IngestionQueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept more uploads."""
+
+
+class IngestionJob:
+    def __init__(self, user_id: int, contents: bytes, category: ExpenseCategory, flag_duplicates: bool = False,
+                 content_hash: Optional[str] = None, kind: UploadKind = UploadKind.JPEG, reserved_bytes: int = 0):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.category = category
+        self.flag_duplicates = flag_duplicates
+        self.contents: Optional[bytes] = contents
+        self.content_hash = content_hash or hash_content(contents)
+        self.kind = kind
+        # Upload memory budget held until the job finishes
+        self.reserved_bytes = reserved_bytes
+        self.status = JobStatus.QUEUED
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[UploadResult] = None
+        self.error: Optional[str] = None
+
+    def to_response(self) -> UploadJobResponse:
+        return UploadJobResponse(
+            job_id=self.id,
+            status=self.status,
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+            result=self.result,
+            error=self.error
+        )
+
+
+class IngestionPipeline:
+    """
+    In-process upload pipeline: the request only enqueues the file, and background
+    workers run OCR -> parse -> persist. A DB session is opened just for the final insert.
+    """
+
+    def __init__(self, ocr_service: OCRService, session_factory=SessionLocal,
+                 workers: int = INGEST_WORKERS, queue_size: int = INGEST_QUEUE_SIZE,
+                 max_jobs: int = INGEST_MAX_JOBS, memory_budget: UploadMemoryBudget = upload_memory_budget):
+        self.ocr_service = ocr_service
+        self.memory_budget = memory_budget
+        self.session_factory = session_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, user_id: int, contents: bytes, category: ExpenseCategory,
+               flag_duplicates: bool = False, **job_options) -> IngestionJob:
+        """Queues an upload and returns its job immediately."""
+        self._ensure_workers()
+        job = IngestionJob(user_id, contents, category, flag_duplicates, **job_options)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.memory_budget.release(job.reserved_bytes)
+            raise IngestionQueueFullError("Upload queue is full, please retry later")
+        self._remember(job)
+        return job
+
+    async def submit_upload(self, upload: InspectedUpload, user_id: int, category: ExpenseCategory,
+                            flag_duplicates: bool = False) -> IngestionJob:
+        """
+        Reads an inspected upload into memory and queues it. Queued jobs hold their bytes,
+        so the upload memory budget is reserved first and the POST is rejected when it is full.
+        """
+        if not self.memory_budget.try_reserve(upload.size):
+            raise IngestionQueueFullError("Too many uploads waiting for processing, please retry later")
+        try:
+            contents = await upload.file.read()
+        except Exception:
+            self.memory_budget.release(upload.size)
+            raise
+        return self.submit(user_id, contents, category, flag_duplicates, content_hash=upload.content_hash,
+                           kind=upload.kind, reserved_bytes=upload.size)
+
+    def get_job(self, job_id: str, user_id: int) -> Optional[IngestionJob]:
+        job = self._jobs.get(job_id)
+        # Jobs are private to the user that submitted them
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def get_jobs(self, job_ids: List[str], user_id: int) -> List[IngestionJob]:
+        jobs = (self.get_job(job_id, user_id) for job_id in job_ids)
+        return [job for job in jobs if job is not None]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._tasks),
+            "tracked_jobs": len(self._jobs),
+        }
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Stops the workers once every queued job is finished, or when the timeout expires.
+        Jobs live only in this process, so the ones still waiting then are lost; returns their count.
+        """
+        if self._queue is None:
+            return 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        return sum(1 for job in self._jobs.values() if job.status not in (JobStatus.COMPLETED, JobStatus.FAILED))
+
+    def _ensure_workers(self):
+        # Workers are bound to the running event loop, so they are started on first use
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _remember(self, job: IngestionJob):
+        self._jobs[job.id] = job
+        # Forget the oldest finished jobs once we track too many
+        while len(self._jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status not in (JobStatus.COMPLETED, JobStatus.FAILED):
+                break
+            del self._jobs[oldest_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: IngestionJob):
+        job.status = JobStatus.PROCESSING
+        loop = asyncio.get_running_loop()
+        try:
+            if job.flag_duplicates:
+                # Skip OCR entirely when the same image was already stored
+                job.result = await loop.run_in_executor(None, self._find_duplicate, job)
+            if job.result is None:
+                ocr_data = await self._run_ocr(job)
+                job.result = await loop.run_in_executor(None, self._persist, job, ocr_data)
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            job.contents = None  # Release the image bytes as soon as the job is done
+            self.memory_budget.release(job.reserved_bytes)
+            job.reserved_bytes = 0
+            job.finished_at = datetime.utcnow()
+
+    async def _run_ocr(self, job: IngestionJob) -> InvoiceOCRResponse:
+        # A saturated OCR pool is not an error here: wait and retry in the background
+        while True:
+            try:
+                return await self.ocr_service.process_upload(job.contents, job.content_hash, job.kind)
+            except OCRQueueFullError as e:
+                await asyncio.sleep(e.retry_after)
+
+    def _find_duplicate(self, job: IngestionJob) -> Optional[UploadResult]:
+        db = self.session_factory()
+        try:
+            duplicate = InvoiceRepository(db).find_duplicates(job.user_id, [job.content_hash]).get(job.content_hash)
+            return UploadResult.from_records(*duplicate, status="duplicate") if duplicate else None
+        finally:
+            db.close()
+
+    def _persist(self, job: IngestionJob, ocr_data: InvoiceOCRResponse) -> UploadResult:
+        db = self.session_factory()
+        try:
+            new_invoice, new_expense = InvoiceRepository(db).create_with_expense(
+                user_id=job.user_id,
+                ocr_data=ocr_data,
+                category=job.category,
+                content_hash=job.content_hash
+            )
+            db.commit()
+            return UploadResult.from_records(new_invoice, new_expense)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,179 @@
+import re
+from datetime import date, datetime
+from typing import Optional
+from ..schemas.invoice_schemas import InvoiceOCRResponse, DocumentType
+
+# Multi-language receipt keywords that mark a line as holding the total
+TOTAL_KEYWORDS = [
+    # Hebrew
+    'סה״כ', 'סהכ', 'סך הכל', 'סכום', 'לתשלום', 'סה"כ',
+    # English
+    'total', 'amount', 'sum', 'balance', 'due', 'payment', 'grand total',
+    # Other common
+    'subtotal', 'net', 'gross'
+]
+
+# Lines containing any of these are headers, not the business name
+GENERIC_TERMS = [
+    # Hebrew
+    "חשבונית", "מס", "קבלה", "נאמן", "מספר", "מקור", "תאריך", "עוסק", "ח.פ", "ע.מ",
+    # English
+    "TAX", "INV", "INVOICE", "RECEIPT", "DATE", "NUMBER", "NO.", "#",
+    "VAT", "ID", "BUSINESS", "COMPANY"
+]
+
+# All patterns are compiled once at import time instead of on every parse.
+# Keyword lists are matched with a single alternation regex rather than
+# one substring test per keyword.
+_PRICE_DOT = re.compile(r'\b(\d{1,6}\.\d{2})\b')  # 123.45
+_PRICE_COMMA = re.compile(r'\b(\d{1,6},\d{2})\b')  # Israeli format 123,45
+_PRICE_THOUSANDS = re.compile(r'\b(\d{1,3}[,\.]\d{3}[,\.]\d{2})\b')  # 1,234.56 or 1.234,56
+_KEYWORD_LINE_NUMBER = re.compile(r'\b(\d{2,6})\b')
+_ANY_NUMBER = re.compile(r'\b(\d+)\b')
+_VAT_ID = re.compile(r'\b(\d{9})\b')  # Israeli Business ID (H.P. / O.M.) - Always 9 digits
+_DATE = re.compile(r'(\d{2}[/\.]\d{2}[/\.]\d{2,4})')  # DD/MM/YYYY or DD.MM.YYYY
+_TOTAL_KEYWORDS = re.compile('|'.join(re.escape(keyword) for keyword in TOTAL_KEYWORDS))
+_GENERIC_TERMS = re.compile('|'.join(re.escape(term) for term in GENERIC_TERMS))
+_INVOICE_WORDS = re.compile('חשבונית|invoice')  # Matched against lowercased text
+
+# Tried in order, the first pattern that matches wins
+_INVOICE_NUMBER_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    # Hebrew
+    r'(?:מס[\'׳]?\s*חשבונית|מספר)[:\s]*([A-Z0-9\-/]+)',
+    # English
+    r'(?:invoice\s*#?|inv\s*#?|receipt\s*#?|ref)[:\s]*([A-Z0-9\-/]+)',
+    # Generic patterns
+    r'\b([A-Z]{2,}\d{4,})\b',  # Pattern like AB12345
+    r'#\s*(\d{4,})',  # Pattern like #12345
+    r'NO[.:]?\s*([A-Z0-9\-/]+)',  # Pattern like NO: 12345
+)]
+
+BUSINESS_NAME_SCAN_LINES = 8  # Only the top of the receipt can hold the vendor name
+VAT_RATE = 1.17  # Standard Israeli VAT (17%)
+
+
+def parse_invoice_text(text: str) -> InvoiceOCRResponse:
+    """Extracts invoice fields from raw OCR text."""
+    text_lower = text.lower()
+
+    # 1. Price Extraction - the total is the largest amount found
+    total_amount = _find_total_amount(text, text_lower)
+
+    # 2. Business ID: first 9-digit number
+    vat_match = _VAT_ID.search(text)
+    business_id = vat_match.group(1) if vat_match else "Unknown"
+
+    # 3. Date: first date-looking token, today when the text has none
+    transaction_date = find_transaction_date(text) or datetime.now().date()
+
+    # 4. Business Name from the top lines
+    business_name = _find_business_name(text)
+
+    # 5. Document Type Detection - Multi-language
+    doc_type = DocumentType.INVOICE if _INVOICE_WORDS.search(text_lower) else DocumentType.RECEIPT
+
+    # Calculate Before VAT
+    amount_before_vat = round(total_amount / VAT_RATE, 2) if total_amount > 0 else 0.0
+
+    # 6. Invoice Number Detection - Multi-language
+    invoice_number = None
+    for pattern in _INVOICE_NUMBER_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            invoice_number = match.group(1)
+            break
+
+    return InvoiceOCRResponse(
+        document_type=doc_type,
+        business_name=business_name,
+        business_vat_number=business_id,
+        amount_before_vat=amount_before_vat,
+        amount_after_vat=total_amount,
+        transaction_date=transaction_date,
+        invoice_number=invoice_number,
+        service_description="Universal Multi-Language OCR with Israeli & International Format Support"
+    )
+
+
+def find_transaction_date(text: str) -> Optional[date]:
+    """The date the text actually holds, or None (parse_invoice_text then falls back to today)."""
+    date_match = _DATE.search(text)
+    return parse_date(date_match.group(1)) if date_match else None
+
+
+def parse_date(date_str: str) -> Optional[date]:
+    # Normalize dots to slashes for parsing
+    normalized_date = date_str.replace('.', '/')
+    formats = ('%d/%m/%Y', '%d/%m/%y')
+    for fmt in formats:
+        try:
+            return datetime.strptime(normalized_date, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _find_total_amount(text: str, text_lower: str) -> float:
+    # Decimal amounts anywhere in the text
+    candidates = [float(p) for p in _PRICE_DOT.findall(text)]
+    candidates.extend(float(p.replace(',', '.')) for p in _PRICE_COMMA.findall(text))
+    for match in _PRICE_THOUSANDS.findall(text):
+        # Normalize: last separator is decimal, others are thousands
+        digits = match.replace(',', '').replace('.', '')
+        candidates.append(float(digits[:-2] + '.' + digits[-2:]))
+
+    # Whole numbers on lines that mention a total keyword. The keyword regex scans the
+    # whole text once and we jump straight to the matching lines. Lowercasing never adds
+    # or removes newlines, so line numbers in text_lower match those in text.
+    lines = None
+    line_no = 0
+    pos = 0
+    while True:
+        match = _TOTAL_KEYWORDS.search(text_lower, pos)
+        if match is None:
+            break
+        line_no += text_lower.count('\n', pos, match.start())
+        if lines is None:
+            lines = text.split('\n')
+        for number in _KEYWORD_LINE_NUMBER.findall(lines[line_no]):
+            value = int(number)
+            # If it's a reasonable price range (20-999999)
+            if 20 <= value <= 999999:
+                candidates.append(float(value))
+        # Continue on the next line
+        line_end = text_lower.find('\n', match.end())
+        if line_end == -1:
+            break
+        line_no += 1
+        pos = line_end + 1
+
+    best = max(candidates) if candidates else 0.0
+
+    # Fallback: the first reasonable number in the text (Israeli shekel business range)
+    if best == 0.0:
+        for match in _ANY_NUMBER.finditer(text):
+            value = int(match.group(1))
+            if 10 <= value <= 50000:
+                return float(value)
+    return best
+
+
+def _find_business_name(text: str) -> str:
+    seen = 0
+    for raw_line in text.split('\n'):
+        line = raw_line.strip()
+        if not line:
+            continue
+        seen += 1
+        if seen > BUSINESS_NAME_SCAN_LINES:
+            break
+        # Skip very short lines and lines with only numbers
+        if len(line) < 3 or line.isdigit():
+            continue
+        # Skip lines that are mostly numbers
+        if sum(c.isdigit() for c in line) / len(line) > 0.5:
+            continue
+        # Check if line contains generic terms
+        if not _GENERIC_TERMS.search(line):
+            return line
+    return "Unknown Vendor"
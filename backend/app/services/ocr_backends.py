@@ -0,0 +1,273 @@
+import io
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Union
+
+# OCR backend selection
+# vision (Google Cloud Vision), tesseract (local, needs the tesseract binary + pytesseract)
+# or fixture (deterministic fake text, for CI and load tests)
+OCR_BACKEND = os.getenv("OCR_BACKEND", "vision")
+# Local backend used when the primary one fails or exceeds the latency budget ("" disables)
+OCR_FALLBACK_BACKEND = os.getenv("OCR_FALLBACK_BACKEND", "")
+OCR_LATENCY_BUDGET_SECONDS = float(os.getenv("OCR_LATENCY_BUDGET_SECONDS", "10"))
+# After a timeout or error, skip the primary backend for this long
+OCR_FALLBACK_COOLDOWN_SECONDS = int(os.getenv("OCR_FALLBACK_COOLDOWN_SECONDS", "30"))
+OCR_TESSERACT_LANG = os.getenv("OCR_TESSERACT_LANG", "heb+eng")
+# Directory of <sha256>.txt files returned by the fixture backend
+OCR_FIXTURE_DIR = os.getenv("OCR_FIXTURE_DIR", "")
+# Simulated call latency of the fixture backend (load tests), +/- the jitter, in milliseconds
+OCR_FIXTURE_LATENCY_MS = int(os.getenv("OCR_FIXTURE_LATENCY_MS", "0"))
+OCR_FIXTURE_JITTER_MS = int(os.getenv("OCR_FIXTURE_JITTER_MS", "0"))
+
+
+class OCRBackendUnavailableError(Exception):
+    """Raised when a configured OCR backend cannot be used in this environment."""
+
+
+class OCRBackend:
+    """
+    A text detection engine. Implementations are blocking and are called from the
+    OCR thread pool; they return the full raw text of an image.
+    """
+    name = "base"
+    # Images sent per detect_batch call
+    batch_size = 1
+
+    def detect_text(self, content: bytes) -> str:
+        raise NotImplementedError
+
+    def detect_batch(self, files: List[bytes]) -> List[Union[str, Exception]]:
+        """Returns the text or the exception for each image."""
+        results = []
+        for content in files:
+            try:
+                results.append(self.detect_text(content))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stats(self) -> dict:
+        return {"name": self.name}
+
+    def shutdown(self, wait: bool = True):
+        pass
+
+
+class VisionBackend(OCRBackend):
+    name = "vision"
+    # Vision's batch_annotate_images accepts at most 16 images per request
+    batch_size = 16
+
+    def __init__(self):
+        """
+        Initialize the Google Vision client by checking for Environment Variables (Production)
+        or falling back to the local credentials file (Development).
+        """
+        from google.cloud import vision
+        from google.oauth2 import service_account
+        self._vision = vision
+
+        # 1. Attempt to get credentials from the Render Environment Variable
+        key_content = os.environ.get("GCP_SERVICE_ACCOUNT_JSON")
+
+        if key_content:
+            try:
+                # Production: Load credentials from the JSON string stored in Environment Variables
+                key_info = json.loads(key_content)
+                credentials = service_account.Credentials.from_service_account_info(key_info)
+                self.client = vision.ImageAnnotatorClient(credentials=credentials)
+            except Exception as e:
+                print(f"Error loading credentials from Environment Variable: {e}")
+                # Fallback to default behavior if parsing fails
+                self.client = vision.ImageAnnotatorClient()
+        else:
+            # Development: Uses the local 'google-key.json' file via GOOGLE_APPLICATION_CREDENTIALS
+            # Make sure your local .env has: GOOGLE_APPLICATION_CREDENTIALS="google-key.json"
+            self.client = vision.ImageAnnotatorClient()
+
+    def detect_text(self, content: bytes) -> str:
+        image = self._vision.Image(content=content)
+        response = self.client.text_detection(image=image)
+        annotations = response.text_annotations
+
+        if not annotations:
+            raise Exception("No text detected in the image")
+
+        return annotations[0].description
+
+    def detect_batch(self, files: List[bytes]) -> List[Union[str, Exception]]:
+        requests = [
+            {
+                "image": self._vision.Image(content=content),
+                "features": [{"type_": self._vision.Feature.Type.TEXT_DETECTION}],
+            }
+            for content in files
+        ]
+        response = self.client.batch_annotate_images(requests=requests)
+
+        results = []
+        for image_response in response.responses:
+            if image_response.error.message:
+                results.append(Exception(image_response.error.message))
+            elif not image_response.text_annotations:
+                results.append(Exception("No text detected in the image"))
+            else:
+                results.append(image_response.text_annotations[0].description)
+        return results
+
+
+class TesseractBackend(OCRBackend):
+    """Local, offline OCR. Needs the `tesseract` binary (with the language packs) and pytesseract."""
+    name = "tesseract"
+
+    def __init__(self, lang: str = OCR_TESSERACT_LANG):
+        try:
+            import pytesseract
+            from PIL import Image
+        except ImportError as e:
+            raise OCRBackendUnavailableError("The tesseract backend needs pytesseract and Pillow installed") from e
+        try:
+            pytesseract.get_tesseract_version()
+        except pytesseract.TesseractNotFoundError as e:
+            raise OCRBackendUnavailableError("The tesseract binary was not found on PATH") from e
+        self._pytesseract = pytesseract
+        self._image = Image
+        self.lang = lang
+
+    def detect_text(self, content: bytes) -> str:
+        with self._image.open(io.BytesIO(content)) as image:
+            text = self._pytesseract.image_to_string(image, lang=self.lang)
+        if not text.strip():
+            raise Exception("No text detected in the image")
+        return text
+
+
+class FixtureBackend(OCRBackend):
+    """
+    Deterministic fake OCR: returns OCR_FIXTURE_DIR/<sha256>.txt when it exists, otherwise
+    a synthetic receipt derived from the image hash. The same image always yields the same text.
+    With latency_ms it sleeps like a remote call would, so load tests see realistic OCR times.
+    """
+    name = "fixture"
+
+    def __init__(self, fixture_dir: str = OCR_FIXTURE_DIR, latency_ms: int = OCR_FIXTURE_LATENCY_MS,
+                 jitter_ms: int = OCR_FIXTURE_JITTER_MS):
+        self.fixture_dir = fixture_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def detect_text(self, content: bytes) -> str:
+        if self.latency_ms:
+            time.sleep(max(0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        digest = hashlib.sha256(content).hexdigest()
+        if self.fixture_dir:
+            path = os.path.join(self.fixture_dir, f"{digest}.txt")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+        seed = int(digest[:12], 16)
+        total = 10 + seed % 99000 / 100
+        return "\n".join([
+            f"Fixture Vendor {digest[:6].upper()}",
+            f"Business ID {100000000 + seed % 900000000}",
+            f"Invoice #{10000 + seed % 90000}",
+            f"Date {1 + seed % 28:02d}/{1 + seed % 12:02d}/2024",
+            f"Total {total:.2f}",
+        ])
+
+
+class FallbackBackend(OCRBackend):
+    """
+    Sends each call to `primary` and answers from `fallback` when the primary fails or
+    does not answer within `latency_budget` seconds. After a failure the primary is
+    skipped for `cooldown` seconds, so an outage or exhausted quota does not cost the
+    full budget on every image.
+    """
+
+    def __init__(self, primary: OCRBackend, fallback: OCRBackend,
+                 latency_budget: float = OCR_LATENCY_BUDGET_SECONDS,
+                 cooldown: int = OCR_FALLBACK_COOLDOWN_SECONDS, max_workers: int = 4):
+        self.primary = primary
+        self.fallback = fallback
+        self.latency_budget = latency_budget
+        self.cooldown = cooldown
+        self.name = f"{primary.name}+{fallback.name}"
+        self.batch_size = primary.batch_size
+        # Primary calls run here so the OCR worker can stop waiting for them at the budget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr-primary")
+        self._lock = threading.Lock()
+        self._skip_until = 0.0
+        self._primary_calls = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._fallback_calls = 0
+
+    def detect_text(self, content: bytes) -> str:
+        return self._route(self.primary.detect_text, self.fallback.detect_text, content)
+
+    def detect_batch(self, files: List[bytes]) -> List[Union[str, Exception]]:
+        return self._route(self.primary.detect_batch, self.fallback.detect_batch, files)
+
+    def _route(self, primary_call, fallback_call, payload):
+        if time.monotonic() >= self._skip_until:
+            future = self._executor.submit(primary_call, payload)
+            with self._lock:
+                self._primary_calls += 1
+            try:
+                return future.result(timeout=self.latency_budget)
+            except FutureTimeoutError:
+                # The primary call keeps running in the background; its result is dropped
+                self._record_failure(timed_out=True)
+            except Exception:
+                self._record_failure(timed_out=False)
+        with self._lock:
+            self._fallback_calls += 1
+        return fallback_call(payload)
+
+    def _record_failure(self, timed_out: bool):
+        with self._lock:
+            if timed_out:
+                self._timeouts += 1
+            else:
+                self._errors += 1
+            self._skip_until = time.monotonic() + self.cooldown
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "primary_calls": self._primary_calls,
+                "primary_timeouts": self._timeouts,
+                "primary_errors": self._errors,
+                "fallback_calls": self._fallback_calls,
+                "primary_skipped": time.monotonic() < self._skip_until,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        self.primary.shutdown(wait)
+        self.fallback.shutdown(wait)
+
+
+_BACKENDS = {
+    VisionBackend.name: VisionBackend,
+    TesseractBackend.name: TesseractBackend,
+    FixtureBackend.name: FixtureBackend,
+}
+
+
+def create_backend(name: str = OCR_BACKEND, fallback: Optional[str] = OCR_FALLBACK_BACKEND) -> OCRBackend:
+    """Builds the configured backend, wrapped with fallback routing when a fallback is set."""
+    if name not in _BACKENDS:
+        raise OCRBackendUnavailableError(f"Unknown OCR backend '{name}', expected one of {sorted(_BACKENDS)}")
+    backend = _BACKENDS[name]()
+    if fallback and fallback != name:
+        if fallback not in _BACKENDS:
+            raise OCRBackendUnavailableError(f"Unknown OCR fallback backend '{fallback}'")
+        backend = FallbackBackend(backend, _BACKENDS[fallback]())
+    return backend
@@ -0,0 +1,182 @@
+import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, select
+from ..database import SessionLocal
+from ..models.ocr_cache import OCRCacheEntry
+
+# OCR result cache settings
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+# In-memory LRU tier (per process)
+OCR_CACHE_MEMORY_ITEMS = int(os.getenv("OCR_CACHE_MEMORY_ITEMS", "1024"))
+# Persistent tier (ocr_cache_entries table)
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "100000"))
+OCR_CACHE_TTL_DAYS = int(os.getenv("OCR_CACHE_TTL_DAYS", "90"))
+# Run the table eviction every N writes instead of on every insert
+OCR_CACHE_PRUNE_EVERY = int(os.getenv("OCR_CACHE_PRUNE_EVERY", "500"))
+
+
+def hash_content(file_content: bytes) -> str:
+    """Content address of an uploaded image."""
+    return hashlib.sha256(file_content).hexdigest()
+
+
+class OCRCache:
+    """
+    Two-tier cache of OCR text keyed by image hash: an in-memory LRU in front of
+    the ocr_cache_entries table. Both tiers expire entries after the TTL.
+    Only the text is cached, callers parse it again on a hit, so parser fixes
+    also apply to images uploaded again.
+    """
+
+    def __init__(self, session_factory=SessionLocal, memory_items: int = OCR_CACHE_MEMORY_ITEMS,
+                 max_entries: int = OCR_CACHE_MAX_ENTRIES, ttl_days: int = OCR_CACHE_TTL_DAYS):
+        self.session_factory = session_factory
+        self.memory_items = memory_items
+        self.max_entries = max_entries
+        self.ttl = timedelta(days=ttl_days)
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, raw_text)
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        result = self._get_memory(key)
+        if result is not None:
+            return result
+        # The persistent tier is a blocking DB call, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._get_db, key)
+
+    async def put(self, key: str, raw_text: str):
+        self._put_memory(key, raw_text)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._put_db, key, raw_text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "memory_items": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            stored_at, raw_text = item
+            if self._now() - stored_at > self.ttl:
+                del self._memory[key]
+                self.evictions += 1
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return raw_text
+
+    def _put_memory(self, key: str, raw_text: str, stored_at: Optional[datetime] = None):
+        with self._lock:
+            self._memory[key] = (stored_at or self._now(), raw_text)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def _get_db(self, key: str) -> Optional[str]:
+        db = self.session_factory()
+        try:
+            entry = db.get(OCRCacheEntry, key)
+            if entry is None or self._is_expired(entry.created_at):
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            raw_text = entry.raw_text
+            stored_at = self._as_aware(entry.created_at) if entry.created_at else None
+
+            entry.hit_count += 1
+            entry.last_used_at = self._now()
+            db.commit()
+
+            with self._lock:
+                self.db_hits += 1
+            self._put_memory(key, raw_text, stored_at)
+            return raw_text
+        except Exception:
+            # Treat an unreadable cache as a miss and fall back to OCR
+            db.rollback()
+            with self._lock:
+                self.misses += 1
+            return None
+        finally:
+            db.close()
+
+    def _put_db(self, key: str, raw_text: str):
+        db = self.session_factory()
+        try:
+            db.merge(OCRCacheEntry(
+                content_hash=key,
+                raw_text=raw_text,
+                hit_count=0,
+                created_at=self._now(),
+                last_used_at=self._now()
+            ))
+            db.commit()
+            with self._lock:
+                self.writes += 1
+                self._writes_since_prune += 1
+                should_prune = self._writes_since_prune >= OCR_CACHE_PRUNE_EVERY
+                if should_prune:
+                    self._writes_since_prune = 0
+            if should_prune:
+                self._prune(db)
+        except Exception:
+            # A failed cache write must never fail the upload itself
+            db.rollback()
+        finally:
+            db.close()
+
+    def _prune(self, db):
+        """Drops expired rows, then the least recently used rows above max_entries."""
+        removed = db.execute(
+            delete(OCRCacheEntry).where(OCRCacheEntry.created_at < self._now() - self.ttl)
+        ).rowcount
+
+        overflow_keys = select(OCRCacheEntry.content_hash).order_by(
+            OCRCacheEntry.last_used_at.desc()
+        ).offset(self.max_entries)
+        removed += db.execute(
+            delete(OCRCacheEntry).where(OCRCacheEntry.content_hash.in_(overflow_keys))
+        ).rowcount
+        db.commit()
+
+        with self._lock:
+            self.evictions += max(removed, 0)
+
+    def _is_expired(self, created_at: Optional[datetime]) -> bool:
+        if created_at is None:
+            return False
+        return self._now() - self._as_aware(created_at) > self.ttl
+
+    @staticmethod
+    def _as_aware(value: datetime) -> datetime:
+        # SQLite returns naive datetimes even for timezone-aware columns
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
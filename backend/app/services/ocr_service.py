@@ -1,191 +1,317 @@
-import re
 import os
-import json
-from datetime import datetime
-from google.cloud import vision
-from google.oauth2 import service_account
-from ..schemas.invoice_schemas import InvoiceOCRResponse, DocumentType
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
+from ..schemas.invoice_schemas import InvoiceOCRResponse
+from .invoice_parser import parse_invoice_text
+from .ocr_cache import OCRCache, OCR_CACHE_ENABLED, hash_content
+from .ocr_backends import OCRBackend, create_backend
+from .image_preprocessor import ImagePreprocessor, IMAGE_PREPROCESS_ENABLED
+from .pdf_pages import PDF_MAX_PAGES, count_pages, read_page
+from .upload_service import UploadKind
+
+# OCR concurrency settings
+# Backend calls are blocking (gRPC requests, local OCR), so they run on a dedicated thread pool.
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", "4"))
+# Max requests admitted at once (running + waiting for a worker) before we reject with 429
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", "32"))
+OCR_RETRY_AFTER_SECONDS = int(os.getenv("OCR_RETRY_AFTER_SECONDS", "5"))
+# At shutdown, how long to wait for admitted OCR calls before stopping the pool anyway
+OCR_DRAIN_TIMEOUT_SECONDS = int(os.getenv("OCR_DRAIN_TIMEOUT_SECONDS", "20"))
+
+
+class OCRQueueFullError(Exception):
+    """Raised when the OCR pool already holds the maximum number of pending jobs."""
+
+    def __init__(self, retry_after: int = OCR_RETRY_AFTER_SECONDS):
+        super().__init__("OCR queue is full, please retry later")
+        self.retry_after = retry_after
+
+
+class OCRMetrics:
+    """Thread-safe counters for the OCR pool: queue depth, in-flight calls and latency."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)  # Recent samples for percentiles
+        self.pending = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def admit(self, limit: int) -> bool:
+        with self._lock:
+            if self.pending >= limit:
+                self.rejected += 1
+                return False
+            self.pending += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, latency: float, ok: bool = True):
+        with self._lock:
+            self.in_flight -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self._latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._latencies)
+            calls = self.completed + self.failed
+
+            def percentile(q: float) -> float:
+                if not samples:
+                    return 0.0
+                return round(samples[min(len(samples) - 1, int(q * len(samples)))], 4)
+
+            return {
+                "queue_depth": max(self.pending - self.in_flight, 0),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "latency_avg_seconds": round(self.total_latency / calls, 4) if calls else 0.0,
+                "latency_p50_seconds": percentile(0.50),
+                "latency_p95_seconds": percentile(0.95),
+                "latency_max_seconds": round(self.max_latency, 4),
+            }
 
 
 class OCRService:
-    def __init__(self):
+    def __init__(self, max_workers: int = OCR_MAX_WORKERS, max_pending: int = OCR_MAX_PENDING,
+                 cache: Optional[OCRCache] = None, backend: Optional[OCRBackend] = None,
+                 preprocessor: Optional[ImagePreprocessor] = None):
+        # OCR text is cached by image hash so re-uploads skip the OCR call
+        self.cache = cache if cache is not None else (OCRCache() if OCR_CACHE_ENABLED else None)
+
+        # Blocking backend calls are executed here instead of on the event loop
+        self.max_pending = max_pending
+        self.metrics = OCRMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+
+        # Text detection engine (Vision by default, see ocr_backends for the others).
+        # Built by start(), not here: this object is created at import time, which under
+        # `gunicorn --preload` happens in the master, and gRPC channels do not survive a fork.
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+
+        # Large photos are shrunk before they are sent to the backend (cache keys stay on the original bytes)
+        self.preprocessor = preprocessor if preprocessor is not None else (
+            ImagePreprocessor() if IMAGE_PREPROCESS_ENABLED else None
+        )
+
+    @property
+    def backend(self) -> OCRBackend:
+        return self._backend if self._backend is not None else self.start()
+
+    def start(self) -> OCRBackend:
+        """Builds the backend client if it does not exist yet (the app lifespan calls this once per worker)."""
+        with self._backend_lock:
+            if self._backend is None:
+                self._backend = create_backend()
+            return self._backend
+
+    async def drain(self, timeout: float = OCR_DRAIN_TIMEOUT_SECONDS) -> bool:
+        """Waits until no OCR call is admitted or running. Returns False if the timeout expired first."""
+        deadline = time.monotonic() + timeout
+        while self.metrics.pending > 0:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def process_invoice(self, file_content: bytes, content_hash: Optional[str] = None) -> InvoiceOCRResponse:
         """
-        Initialize the Google Vision client by checking for Environment Variables (Production)
-        or falling back to the local credentials file (Development).
+        Processes image content with the configured OCR backend.
+        Raises OCRQueueFullError when the pool is saturated.
         """
-        # 1. Attempt to get credentials from the Render Environment Variable
-        key_content = os.environ.get("GCP_SERVICE_ACCOUNT_JSON")
+        key = content_hash or hash_content(file_content)
+        if self.cache:
+            cached_text = await self.cache.get(key)
+            if cached_text is not None:
+                # Parsed again rather than cached, so parser fixes reach re-uploads too
+                return self._parse_text_to_schema(cached_text)
 
-        if key_content:
-            try:
-                # Production: Load credentials from the JSON string stored in Environment Variables
-                key_info = json.loads(key_content)
-                credentials = service_account.Credentials.from_service_account_info(key_info)
-                self.client = vision.ImageAnnotatorClient(credentials=credentials)
-            except Exception as e:
-                print(f"Error loading credentials from Environment Variable: {e}")
-                # Fallback to default behavior if parsing fails
-                self.client = vision.ImageAnnotatorClient()
-        else:
-            # Development: Uses the local 'google-key.json' file via GOOGLE_APPLICATION_CREDENTIALS
-            # Make sure your local .env has: GOOGLE_APPLICATION_CREDENTIALS="google-key.json"
-            self.client = vision.ImageAnnotatorClient()
-
-    async def process_invoice(self, file_content: bytes) -> InvoiceOCRResponse:
+        # Admitted before the photo is shrunk: a saturated pool answers 429 without decoding it first
+        async with self._admitted():
+            if self.preprocessor:
+                file_content = await self.preprocessor.prepare(file_content)
+            full_text = await self._run_admitted(self._detect_text, file_content)
+        parsed = self._parse_text_to_schema(full_text)
+
+        if self.cache:
+            await self.cache.put(key, full_text)
+        return parsed
+
+    async def process_upload(self, contents: bytes, content_hash: Optional[str] = None,
+                             kind: UploadKind = UploadKind.JPEG) -> InvoiceOCRResponse:
+        """Runs OCR for an uploaded image or PDF."""
+        if kind == UploadKind.PDF:
+            return await self.process_pdf(contents, content_hash)
+        return await self.process_invoice(contents, content_hash)
+
+    async def process_pdf(self, pdf: bytes, content_hash: Optional[str] = None) -> InvoiceOCRResponse:
         """
-        Processes image content using Google Vision with improved parsing.
+        Reads a PDF invoice page by page: pages with a text layer are used as they are,
+        scanned pages are rendered and OCR'd one at a time, so only one page image is in
+        memory. The page texts are parsed together.
         """
-        image = vision.Image(content=file_content)
-        response = self.client.text_detection(image=image)
-        annotations = response.text_annotations
+        key = content_hash or hash_content(pdf)
+        if self.cache:
+            cached_text = await self.cache.get(key)
+            if cached_text is not None:
+                # Parsed again rather than cached, so parser fixes reach re-uploads too
+                return self._parse_text_to_schema(cached_text)
 
-        if not annotations:
-            raise Exception("No text detected in the image")
+        # Through the pool like the pages: admitted (or rejected with a 429) and measured
+        pages = min(await self._run_in_pool(count_pages, pdf), PDF_MAX_PAGES)
+        texts = []
+        for index in range(pages):
+            try:
+                texts.append(await self._run_in_pool(self._read_pdf_page, pdf, index))
+            except OCRQueueFullError:
+                raise
+            except Exception:
+                continue  # A blank or unreadable page does not fail the whole invoice
+        if not texts:
+            raise Exception("No text detected in the document")
 
-        full_text = annotations[0].description
-        return self._parse_text_to_schema(full_text)
+        full_text = "\n".join(texts)
+        parsed = self._parse_text_to_schema(full_text)
+        if self.cache:
+            await self.cache.put(key, full_text)
+        return parsed
 
-    def _parse_text_to_schema(self, text: str) -> InvoiceOCRResponse:
-        # Split into lines and clean whitespace
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-
-        # 1. ENHANCED Price Extraction - Multiple Patterns
-        found_prices = []
-
-        # Pattern 1: Standard decimal with dot (123.45)
-        pattern1 = r'\b(\d{1,6}\.\d{2})\b'
-        found_prices.extend(re.findall(pattern1, text))
-
-        # Pattern 2: Israeli format with comma (123,45)
-        pattern2 = r'\b(\d{1,6},\d{2})\b'
-        found_prices.extend([p.replace(',', '.') for p in re.findall(pattern2, text)])
-
-        # Pattern 3: No decimals but likely prices (look for "total", "סה״כ", etc.)
-        # Multi-language receipt keywords
-        total_keywords = [
-            # Hebrew
-            'סה״כ', 'סהכ', 'סך הכל', 'סכום', 'לתשלום', 'סה"כ',
-            # English
-            'total', 'amount', 'sum', 'balance', 'due', 'payment', 'grand total',
-            # Other common
-            'subtotal', 'net', 'gross'
-        ]
-        for line in lines:
-            if any(keyword in line.lower() for keyword in total_keywords):
-                # Extract numbers from this line
-                numbers = re.findall(r'\b(\d{2,6})\b', line)
-                for num in numbers:
-                    # If it's a reasonable price range (20-999999)
-                    if 20 <= int(num) <= 999999:
-                        found_prices.append(num + '.00')
-
-        # Pattern 4: Prices with thousand separators (1,234.56 or 1.234,56)
-        pattern4 = r'\b(\d{1,3}[,\.]\d{3}[,\.]\d{2})\b'
-        for match in re.findall(pattern4, text):
-            # Normalize: last separator is decimal, others are thousands
-            normalized = match.replace(',', '').replace('.', '')
-            # Add decimal point before last 2 digits
-            if len(normalized) > 2:
-                normalized = normalized[:-2] + '.' + normalized[-2:]
-                found_prices.append(normalized)
-
-        total_amount = 0.0
-        if found_prices:
-            # Convert to floats and pick the MAX value
-            float_prices = []
-            for p in found_prices:
-                try:
-                    float_prices.append(float(p))
-                except ValueError:
+    async def process_batch(self, files: List[bytes],
+                            content_hashes: Optional[List[str]] = None) -> List[Union[InvoiceOCRResponse, Exception]]:
+        """
+        Runs OCR for many images using backend batch requests. Chunks are processed
+        concurrently on the pool and parsed inside the worker threads.
+        Returns one entry per input: the parsed result or the exception that file raised.
+        """
+        keys = content_hashes or [hash_content(content) for content in files]
+        results: List[Union[InvoiceOCRResponse, Exception, None]] = [None] * len(files)
+
+        # 1. Serve what we can from the cache, only misses go to the backend
+        if self.cache:
+            for index, key in enumerate(keys):
+                cached_text = await self.cache.get(key)
+                if cached_text is None:
                     continue
+                try:
+                    results[index] = self._parse_text_to_schema(cached_text)
+                except Exception as e:
+                    results[index] = e
+        misses = [index for index, result in enumerate(results) if result is None]
 
-            if float_prices:
-                total_amount = max(float_prices)
-
-        # Fallback: If still 0, look for ANY reasonable number in the text
-        if total_amount == 0.0:
-            all_numbers = re.findall(r'\b(\d+)\b', text)
-            for num in all_numbers:
-                val = int(num)
-                # Israeli shekel typical range for business expenses
-                if 10 <= val <= 50000:
-                    total_amount = float(val)
-                    break
-
-        # 2. Israeli Business ID (H.P. / O.M.) - Always 9 digits
-        vat_id_pattern = r'\b(\d{9})\b'
-        vat_ids = re.findall(vat_id_pattern, text)
-        business_id = vat_ids[0] if vat_ids else "Unknown"
-
-        # 3. Date Extraction (Israeli format DD/MM/YYYY or DD.MM.YYYY)
-        date_pattern = r'(\d{2}[/\.]\d{2}[/\.]\d{2,4})'
-        dates = re.findall(date_pattern, text)
-
-        # 4. Business Name Logic - Multi-language
-        business_name = "Unknown Vendor"
-        generic_terms = [
-            # Hebrew
-            "חשבונית", "מס", "קבלה", "נאמן", "מספר", "מקור", "תאריך", "עוסק", "ח.פ", "ע.מ",
-            # English
-            "TAX", "INV", "INVOICE", "RECEIPT", "DATE", "NUMBER", "NO.", "#",
-            "VAT", "ID", "BUSINESS", "COMPANY"
-        ]
-
-        for line in lines[:8]:  # Look at top 8 lines (increased from 5)
-            # Skip very short lines and lines with only numbers
-            if len(line) < 3 or line.isdigit():
-                continue
-            # Skip lines that are mostly numbers
-            if sum(c.isdigit() for c in line) / len(line) > 0.5:
-                continue
-            # Check if line contains generic terms
-            if not any(term in line for term in generic_terms):
-                business_name = line
-                break
-
-        # 5. Document Type Detection - Multi-language
-        doc_type = DocumentType.INVOICE if any(
-            word in text.lower() for word in ["חשבונית", "invoice", "tax invoice"]) else DocumentType.RECEIPT
-
-        # Calculate Before VAT (Standard 17%)
-        amount_before_vat = round(total_amount / 1.17, 2) if total_amount > 0 else 0.0
-
-        # 6. Enhanced Invoice Number Detection - Multi-language
-        invoice_number = None
-        invoice_patterns = [
-            # Hebrew
-            r'(?:מס[\'׳]?\s*חשבונית|מספר)[:\s]*([A-Z0-9\-/]+)',
-            # English
-            r'(?:invoice\s*#?|inv\s*#?|receipt\s*#?|ref)[:\s]*([A-Z0-9\-/]+)',
-            # Generic patterns
-            r'\b([A-Z]{2,}\d{4,})\b',  # Pattern like AB12345
-            r'#\s*(\d{4,})',  # Pattern like #12345
-            r'NO[.:]?\s*([A-Z0-9\-/]+)',  # Pattern like NO: 12345
-        ]
-        for pattern in invoice_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                invoice_number = match.group(1)
-                break
-
-        return InvoiceOCRResponse(
-            document_type=doc_type,
-            business_name=business_name,
-            business_vat_number=business_id,
-            amount_before_vat=amount_before_vat,
-            amount_after_vat=total_amount,
-            transaction_date=self._parse_date(dates[0]) if dates else datetime.now().date(),
-            invoice_number=invoice_number,
-            service_description="Universal Multi-Language OCR with Israeli & International Format Support"
+        # 2. Batch the misses (each chunk is shrunk once it has been admitted)
+        batch_size = self.backend.batch_size
+        chunks = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+        chunk_results = await asyncio.gather(
+            *(self._detect_chunk([files[i] for i in chunk]) for chunk in chunks),
+            return_exceptions=True
         )
 
-    def _parse_date(self, date_str: str):
-        # Normalize dots to slashes for parsing
-        normalized_date = date_str.replace('.', '/')
-        formats = ('%d/%m/%Y', '%d/%m/%y')
-        for fmt in formats:
-            try:
-                return datetime.strptime(normalized_date, fmt).date()
-            except ValueError:
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            if isinstance(chunk_result, Exception):
+                # The whole backend request failed (or was rejected), so every file in it failed
+                chunk_result = [chunk_result] * len(chunk)
+            for index, file_result in zip(chunk, chunk_result):
+                if isinstance(file_result, Exception):
+                    results[index] = file_result
+                    continue
+                full_text, parsed = file_result
+                results[index] = parsed
+                if self.cache:
+                    await self.cache.put(keys[index], full_text)
+        return results
+
+    async def _detect_chunk(self, files: List[bytes]) -> List[Union[tuple, Exception]]:
+        """Shrinks and OCRs one backend batch under a single admission slot."""
+        async with self._admitted():
+            if self.preprocessor:
+                files = await self.preprocessor.prepare_many(files)
+            return await self._run_admitted(self._detect_and_parse_batch, files)
+
+    async def _run_in_pool(self, func, *args):
+        """Runs a blocking call on the OCR thread pool, enforcing the max-pending limit."""
+        async with self._admitted():
+            return await self._run_admitted(func, *args)
+
+    @asynccontextmanager
+    async def _admitted(self):
+        """Holds one of the max_pending slots, or raises OCRQueueFullError when none is free."""
+        if not self.metrics.admit(self.max_pending):
+            raise OCRQueueFullError()
+        try:
+            yield
+        finally:
+            self.metrics.release()
+
+    async def _run_admitted(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, func, *args)
+
+    def _timed(self, func, *args):
+        # Runs inside a worker thread: measures only the time spent doing OCR, not queueing
+        self.metrics.started()
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = func(*args)
+            ok = True
+            return result
+        finally:
+            self.metrics.finished(time.perf_counter() - start, ok)
+
+    def _detect_text(self, file_content: bytes) -> str:
+        return self.backend.detect_text(file_content)
+
+    def _read_pdf_page(self, pdf: bytes, index: int) -> str:
+        text, image = read_page(pdf, index)
+        return text if text is not None else self.backend.detect_text(image)
+
+    def _detect_and_parse_batch(self, files: List[bytes]) -> List[Union[tuple, Exception]]:
+        """Returns (raw_text, parsed) or the exception for each image."""
+        results = []
+        for text in self.backend.detect_batch(files):
+            if isinstance(text, Exception):
+                results.append(text)
                 continue
-        return datetime.now().date()
\ No newline at end of file
+            try:
+                results.append((text, self._parse_text_to_schema(text)))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def shutdown(self, wait: bool = True):
+        """Stops the OCR pool, optionally waiting for in-flight calls to finish."""
+        self._executor.shutdown(wait=wait)
+        if self._backend is not None:
+            self._backend.shutdown(wait)
+        if self.preprocessor:
+            self.preprocessor.shutdown(wait)
+
+    def _parse_text_to_schema(self, text: str) -> InvoiceOCRResponse:
+        parsed = parse_invoice_text(text)
+        parsed.raw_text = text  # Kept with the invoice for later re-parsing
+        return parsed
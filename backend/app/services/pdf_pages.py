@@ -0,0 +1,68 @@
+import io
+import os
+import threading
+from typing import Optional, Tuple
+
+# PDF invoice settings
+# Pages beyond this are ignored (totals are on the first pages of an invoice)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))
+# Scanned pages are rendered at this resolution for OCR
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "200"))
+# A page whose embedded text layer has at least this many characters is not OCR'd
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "40"))
+
+# PDFium is not thread-safe; all calls into it are serialized
+_PDFIUM_LOCK = threading.Lock()
+
+
+class PDFUnavailableError(Exception):
+    """Raised when PDF support (pypdfium2) is not installed."""
+
+
+def _pdfium():
+    try:
+        import pypdfium2
+    except ImportError as e:
+        raise PDFUnavailableError("PDF invoices need the pypdfium2 package") from e
+    return pypdfium2
+
+
+def ensure_pdf_support():
+    """Raises PDFUnavailableError up front, before the upload is read."""
+    _pdfium()
+
+
+def count_pages(data: bytes) -> int:
+    pdfium = _pdfium()
+    with _PDFIUM_LOCK:
+        document = pdfium.PdfDocument(data)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+
+def read_page(data: bytes, index: int, dpi: int = PDF_RENDER_DPI,
+              min_chars: int = PDF_TEXT_MIN_CHARS) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    Returns (text, None) when the page has a usable text layer (digital PDFs need no OCR),
+    otherwise (None, grayscale JPEG of the page) for the OCR backend.
+    """
+    pdfium = _pdfium()
+    with _PDFIUM_LOCK:
+        document = pdfium.PdfDocument(data)
+        try:
+            page = document[index]
+            text_page = page.get_textpage()
+            text = text_page.get_text_range()
+            text_page.close()
+            if len(text.strip()) >= min_chars:
+                page.close()
+                return text, None
+            image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+            page.close()
+        finally:
+            document.close()
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=85)
+    return None, output.getvalue()
@@ -0,0 +1,231 @@
+import os
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable, Optional
+from fastapi import HTTPException, UploadFile
+from starlette.formparsers import MultiPartParser
+from starlette.responses import JSONResponse
+
+# Upload limits
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+# Uploaded files larger than this are spooled to a temporary file instead of kept in memory
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+# Raw upload bytes a worker process holds in memory at once (requests in OCR + queued jobs)
+UPLOAD_MEMORY_BUDGET_BYTES = int(os.getenv("UPLOAD_MEMORY_BUDGET_BYTES", str(256 * 1024 * 1024)))
+# How long a request waits for memory budget before it is answered with 429
+UPLOAD_BUDGET_WAIT_SECONDS = int(os.getenv("UPLOAD_BUDGET_WAIT_SECONDS", "10"))
+# Room for multipart boundaries and form fields on top of the file size limit
+FORM_OVERHEAD_BYTES = 64 * 1024
+READ_CHUNK_BYTES = 256 * 1024
+
+# Starlette's threshold for rolling an uploaded file over to disk. It is a class attribute, so
+# this applies to every multipart form parsed in the process, not only to the upload routes
+# (the other routes take no files, and smaller fields stay in memory as before).
+MultiPartParser.spool_max_size = UPLOAD_SPOOL_BYTES
+
+
+class UploadKind(str, Enum):
+    JPEG = "image/jpeg"
+    PNG = "image/png"
+    PDF = "application/pdf"
+    ZIP = "application/zip"
+
+
+IMAGE_KINDS = {UploadKind.JPEG, UploadKind.PNG}
+
+# Magic numbers at the start of each supported format
+_SIGNATURES = (
+    (b"\xff\xd8\xff", UploadKind.JPEG),
+    (b"\x89PNG\r\n\x1a\n", UploadKind.PNG),
+    (b"%PDF-", UploadKind.PDF),
+    (b"PK\x03\x04", UploadKind.ZIP),
+)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds its size limit."""
+
+
+class UnsupportedUploadError(Exception):
+    """Raised when the uploaded bytes are not one of the accepted formats."""
+
+
+class UploadBudgetExhaustedError(Exception):
+    """Raised when too many upload bytes are already held in memory."""
+
+
+def sniff_kind(head: bytes) -> Optional[UploadKind]:
+    """Detects the file format from its first bytes; the client's content type is not trusted."""
+    for signature, kind in _SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    return None
+
+
+@dataclass
+class InspectedUpload:
+    file: UploadFile
+    kind: UploadKind
+    size: int
+    content_hash: str
+
+
+async def inspect_upload(file: UploadFile, allowed: Iterable[UploadKind],
+                         max_bytes: int = UPLOAD_MAX_BYTES) -> InspectedUpload:
+    """
+    Sniffs the format and hashes the (spooled) file in chunks without loading it into
+    memory, then rewinds it. Raises UnsupportedUploadError or UploadTooLargeError.
+    """
+    head = await file.read(16)
+    kind = sniff_kind(head)
+    if kind is None or kind not in allowed:
+        raise UnsupportedUploadError(f"Invalid file type: {file.filename or 'upload'}")
+
+    digest = hashlib.sha256(head)
+    size = len(head)
+    while chunk := await file.read(READ_CHUNK_BYTES):
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+        digest.update(chunk)
+    await file.seek(0)
+    return InspectedUpload(file=file, kind=kind, size=size, content_hash=digest.hexdigest())
+
+
+class UploadMemoryBudget:
+    """
+    Caps the raw upload bytes held in memory at once. Requests reserve the size of their
+    file before reading it and release it once OCR is done; background jobs hold their
+    reservation until they finish.
+    """
+
+    def __init__(self, capacity: int = UPLOAD_MEMORY_BUDGET_BYTES):
+        self.capacity = capacity
+        self.in_use = 0
+        self.rejected = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def try_reserve(self, size: int) -> bool:
+        size = min(size, self.capacity)  # A single file larger than the budget may still run alone
+        if self.in_use + size > self.capacity:
+            self.rejected += 1
+            return False
+        self.in_use += size
+        return True
+
+    async def reserve(self, size: int, timeout: float = UPLOAD_BUDGET_WAIT_SECONDS) -> bool:
+        """Waits up to `timeout` seconds for room. Returns False if there was none."""
+        condition = self._get_condition()
+        async with condition:
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self.in_use + min(size, self.capacity) <= self.capacity),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            self.in_use += min(size, self.capacity)
+            return True
+
+    def release(self, size: int):
+        self.in_use -= min(size, self.capacity)
+        if self._condition is not None:
+            asyncio.get_running_loop().create_task(self._notify())
+
+    @asynccontextmanager
+    async def lease(self, timeout: float = UPLOAD_BUDGET_WAIT_SECONDS):
+        """Yields a BudgetLease for data read in a piece at a time; all it reserved is released at the end."""
+        lease = BudgetLease(self, timeout)
+        try:
+            yield lease
+        finally:
+            for size in lease.sizes:
+                self.release(size)
+
+    @asynccontextmanager
+    async def hold(self, size: int, timeout: float = UPLOAD_BUDGET_WAIT_SECONDS):
+        """Reserves `size` bytes for the block; raises UploadBudgetExhaustedError if none free up in time."""
+        if not await self.reserve(size, timeout):
+            raise UploadBudgetExhaustedError()
+        try:
+            yield
+        finally:
+            self.release(size)
+
+    def stats(self) -> Dict[str, int]:
+        return {"capacity": self.capacity, "in_use": self.in_use, "rejected": self.rejected}
+
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Bound to the running loop, so it is created on first use
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+
+class BudgetLease:
+    """Memory budget reserved step by step, as a batch upload reads its files and zip members in."""
+
+    def __init__(self, budget: UploadMemoryBudget, timeout: float):
+        self.budget = budget
+        self.timeout = timeout
+        self.sizes = []
+
+    async def add(self, size: int):
+        """Reserves `size` more bytes before they are read; raises UploadBudgetExhaustedError if none free up in time."""
+        if not await self.budget.reserve(size, self.timeout):
+            raise UploadBudgetExhaustedError()
+        self.sizes.append(size)
+
+
+upload_memory_budget = UploadMemoryBudget()
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized upload bodies while they stream in: first by Content-Length, then by
+    counting the received bytes, so a client cannot push more than the limit into the spool.
+    `limits` maps POST paths to their maximum file bytes.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        limit += FORM_OVERHEAD_BYTES
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the form parser, FastAPI turns it into the 413 response
+                    raise HTTPException(status_code=413, detail="Upload is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(scope, receive, send):
+        response = JSONResponse({"detail": "Upload is too large"}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
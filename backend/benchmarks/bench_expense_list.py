@@ -0,0 +1,98 @@
+"""
+Expense list read path benchmark: ORM objects + Pydantic vs column rows + fast JSON.
+
+For every size, fetches that many expenses of one user (one sorted query, no paging)
+and renders the ExpensePage body both ways, checking the bodies are byte-identical:
+
+  * orm:  Expense objects (contains_eager invoice), _flatten, ExpensePage.model_dump_json
+  * rows: LIST_COLUMNS tuples, expense_page_json (orjson when installed)
+
+    python -m benchmarks.bench_expense_list --rows 10000 100000 --repeat 3
+
+The benchmark user (bench-list@example.com) is seeded with the largest size first if
+it has fewer invoices (see benchmarks.seed_data); DATABASE_URL selects the database.
+"""
+import time
+import random
+import asyncio
+import argparse
+from sqlalchemy import func, select
+from app.core import fast_json
+from app.core.security import get_password_hash
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import Expense, User
+from app.repositories.expense_repo import AsyncExpenseRepository, _flatten
+from app.schemas.expense_schemas import ExpenseFilter, ExpensePage, expense_page_json
+from .bench_parser import build_corpus
+from .seed_data import migrate_database, seed_user
+
+BENCH_EMAIL = "bench-list@example.com"
+
+
+def ensure_user(rows: int) -> int:
+    migrate_database()
+    db = SessionLocal()
+    try:
+        user_id = db.scalar(select(User.id).where(User.email == BENCH_EMAIL))
+        if user_id is None:
+            user = User(email=BENCH_EMAIL, hashed_password=get_password_hash("bench"))
+            db.add(user)
+            db.commit()
+            user_id = user.id
+        existing = db.scalar(select(func.count()).select_from(Expense).where(Expense.user_id == user_id))
+        if existing < rows:
+            print(f"Seeding {rows - existing} invoices for {BENCH_EMAIL}...")
+            seed_user(db, user_id, rows - existing, 2000, build_corpus(2000), random.Random(3))
+        return user_id
+    finally:
+        db.close()
+
+
+async def render_orm(user_id: int, limit: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        repo = AsyncExpenseRepository(db)
+        query = repo.build_query(user_id, ExpenseFilter(), "transaction_date", "desc", limit)
+        expenses = _flatten(list((await db.scalars(query)).all()))
+        return ExpensePage(items=expenses, next_cursor=None).model_dump_json().encode()
+
+
+async def render_rows(user_id: int, limit: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        repo = AsyncExpenseRepository(db)
+        query = repo.build_query(user_id, ExpenseFilter(), "transaction_date", "desc", limit, rows=True)
+        rows = list((await db.execute(query)).all())
+        return expense_page_json(rows, None)
+
+
+async def timed(render, user_id: int, limit: int, repeat: int):
+    best, body = float("inf"), b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await render(user_id, limit)
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+async def run(user_id: int, sizes, repeat: int):
+    await render_rows(user_id, 10)  # Warm up the pool and the statement caches
+    print(f"{'rows':>8} {'orm ms':>9} {'rows ms':>9} {'speedup':>8} {'µs/row orm':>11} {'µs/row rows':>12}  identical")
+    for size in sizes:
+        orm_seconds, orm_body = await timed(render_orm, user_id, size, repeat)
+        rows_seconds, rows_body = await timed(render_rows, user_id, size, repeat)
+        print(f"{size:8d} {orm_seconds * 1000:9.1f} {rows_seconds * 1000:9.1f} {orm_seconds / rows_seconds:7.1f}x "
+              f"{orm_seconds / size * 1e6:11.1f} {rows_seconds / size * 1e6:12.1f}  {orm_body == rows_body}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs per size")
+    args = parser.parse_args()
+
+    user_id = ensure_user(max(args.rows))
+    print(f"JSON encoder: {'orjson' if fast_json.orjson else 'json (install orjson for the fast path)'}")
+    asyncio.run(run(user_id, args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Login throughput benchmark for the bcrypt hashing pool.
+
+Runs a burst of concurrent password verifications two ways and reports
+logins/sec, logins/sec per core and how long the event loop was blocked:
+
+  * inline: verify_password called on the event loop (what a sync endpoint
+    costs the process, minus the threadpool hop)
+  * pool:   PasswordHasher, bcrypt in worker processes
+
+    python -m benchmarks.bench_login --logins 40 --workers 4
+"""
+import os
+import time
+import asyncio
+import argparse
+from app.core import security
+from app.core.password_hasher import PasswordHasher
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Largest delay between when a timer should fire and when it did (event loop blocking)."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run_inline(hashed: str, logins: int) -> tuple:
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    for _ in range(logins):
+        security.verify_password("correct horse", hashed)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag
+
+
+async def run_pool(hashed: str, logins: int, workers: int) -> tuple:
+    hasher = PasswordHasher(workers=workers, max_pending=logins)
+    await hasher.verify("warm up", hashed)  # Spawn the workers outside the timed section
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(hasher.verify("correct horse", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    hasher.shutdown()
+    assert all(results)
+    return elapsed, await lag
+
+
+def report(label: str, logins: int, elapsed: float, lag: float, cores: int):
+    rate = logins / elapsed
+    print(f"{label:8} {rate:7.1f} logins/s  {rate / cores:6.1f} per core  "
+          f"max event-loop stall {lag * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed = security.get_password_hash("correct horse")
+    print(f"bcrypt cost {hashed.split('$')[2]}, {args.logins} logins, {os.cpu_count()} CPUs")
+
+    elapsed, lag = asyncio.run(run_inline(hashed, args.logins))
+    report("inline", args.logins, elapsed, lag, 1)
+
+    elapsed, lag = asyncio.run(run_pool(hashed, args.logins, args.workers))
+    report(f"pool x{args.workers}", args.logins, elapsed, lag, min(args.workers, os.cpu_count() or 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Micro-benchmark for the OCR text parser.
+
+Checks that parse_invoice_text() returns exactly what the original implementation
+returned on a synthetic receipt corpus, then times both. The regression corpus
+with expected field values is tests/data/invoice_parser_corpus.json (run by pytest).
+
+    python -m benchmarks.bench_parser --docs 2000 --repeat 5
+"""
+import re
+import time
+import random
+import argparse
+from datetime import datetime
+from app.schemas.invoice_schemas import InvoiceOCRResponse, DocumentType
+from app.services.invoice_parser import parse_invoice_text, parse_date
+
+VENDORS = ["Cafe Noir", "סופר פארם", "Office Depot", "דלק תחנת שירות", "Bezeq International", "AWS EMEA"]
+FILLER = [
+    "Tel Aviv", "רחוב הרצל 12", "Thank you!", "תודה ולהתראות", "Cashier: 3", "Table 12",
+    "Espresso 12.00", "Croissant 14,50", "Parking 2 x 15", "Qty 3", "Card **** 4432",
+]
+TOTAL_LINES = ['סה"כ לתשלום {}', "TOTAL {}", "Grand Total: {}", "סך הכל {}", "Amount due {}"]
+HEADERS = ["חשבונית מס {}", "Tax Invoice #{}", "קבלה מספר {}", "Receipt No: {}", "INV{}"]
+
+
+def build_corpus(docs: int, seed: int = 7) -> list:
+    """Deterministic receipts of realistic length (20-80 lines)."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(docs):
+        lines = [rng.choice(VENDORS), rng.choice(FILLER), str(rng.randint(510000000, 519999999))]
+        lines.append(rng.choice(HEADERS).format(rng.randint(1000, 99999)))
+        lines.append(f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/20{rng.randint(20, 26)}")
+        for _ in range(rng.randint(15, 75)):
+            lines.append(rng.choice(FILLER))
+        amount = rng.uniform(10, 25000)
+        lines.append(rng.choice(TOTAL_LINES).format(f"{amount:,.2f}" if rng.random() < 0.3 else f"{amount:.2f}"))
+        corpus.append("\n".join(lines))
+    return corpus
+
+
+def time_parser(parse, corpus: list, repeat: int) -> float:
+    """Best-of-N wall time to parse the whole corpus once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.docs)
+
+    # 1. Golden check: both implementations must agree on every document
+    mismatches = [text for text in corpus if reference_parse(text) != parse_invoice_text(text)]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} documents parse differently, first one:\n{mismatches[0]}")
+
+    # 2. Timing
+    reference = time_parser(reference_parse, corpus, args.repeat)
+    current = time_parser(parse_invoice_text, corpus, args.repeat)
+    print(f"documents:           {len(corpus)}")
+    print(f"reference parser:    {reference * 1000:.1f} ms  ({len(corpus) / reference:,.0f} docs/s)")
+    print(f"parse_invoice_text:  {current * 1000:.1f} ms  ({len(corpus) / current:,.0f} docs/s)")
+    print(f"speedup:             {reference / current:.2f}x")
+
+
+def reference_parse(text: str) -> InvoiceOCRResponse:
+    """The original per-call regex implementation, kept as the correctness and speed baseline."""
+    # Split into lines and clean whitespace
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+
+    # 1. ENHANCED Price Extraction - Multiple Patterns
+    found_prices = []
+
+    # Pattern 1: Standard decimal with dot (123.45)
+    pattern1 = r'\b(\d{1,6}\.\d{2})\b'
+    found_prices.extend(re.findall(pattern1, text))
+
+    # Pattern 2: Israeli format with comma (123,45)
+    pattern2 = r'\b(\d{1,6},\d{2})\b'
+    found_prices.extend([p.replace(',', '.') for p in re.findall(pattern2, text)])
+
+    # Pattern 3: No decimals but likely prices (look for "total", "סה״כ", etc.)
+    # Multi-language receipt keywords
+    total_keywords = [
+        # Hebrew
+        'סה״כ', 'סהכ', 'סך הכל', 'סכום', 'לתשלום', 'סה"כ',
+        # English
+        'total', 'amount', 'sum', 'balance', 'due', 'payment', 'grand total',
+        # Other common
+        'subtotal', 'net', 'gross'
+    ]
+    for line in lines:
+        if any(keyword in line.lower() for keyword in total_keywords):
+            # Extract numbers from this line
+            numbers = re.findall(r'\b(\d{2,6})\b', line)
+            for num in numbers:
+                # If it's a reasonable price range (20-999999)
+                if 20 <= int(num) <= 999999:
+                    found_prices.append(num + '.00')
+
+    # Pattern 4: Prices with thousand separators (1,234.56 or 1.234,56)
+    pattern4 = r'\b(\d{1,3}[,\.]\d{3}[,\.]\d{2})\b'
+    for match in re.findall(pattern4, text):
+        # Normalize: last separator is decimal, others are thousands
+        normalized = match.replace(',', '').replace('.', '')
+        # Add decimal point before last 2 digits
+        if len(normalized) > 2:
+            normalized = normalized[:-2] + '.' + normalized[-2:]
+            found_prices.append(normalized)
+
+    total_amount = 0.0
+    if found_prices:
+        # Convert to floats and pick the MAX value
+        float_prices = []
+        for p in found_prices:
+            try:
+                float_prices.append(float(p))
+            except ValueError:
+                continue
+
+        if float_prices:
+            total_amount = max(float_prices)
+
+    # Fallback: If still 0, look for ANY reasonable number in the text
+    if total_amount == 0.0:
+        all_numbers = re.findall(r'\b(\d+)\b', text)
+        for num in all_numbers:
+            val = int(num)
+            # Israeli shekel typical range for business expenses
+            if 10 <= val <= 50000:
+                total_amount = float(val)
+                break
+
+    # 2. Israeli Business ID (H.P. / O.M.) - Always 9 digits
+    vat_id_pattern = r'\b(\d{9})\b'
+    vat_ids = re.findall(vat_id_pattern, text)
+    business_id = vat_ids[0] if vat_ids else "Unknown"
+
+    # 3. Date Extraction (Israeli format DD/MM/YYYY or DD.MM.YYYY)
+    date_pattern = r'(\d{2}[/\.]\d{2}[/\.]\d{2,4})'
+    dates = re.findall(date_pattern, text)
+
+    # 4. Business Name Logic - Multi-language
+    business_name = "Unknown Vendor"
+    generic_terms = [
+        # Hebrew
+        "חשבונית", "מס", "קבלה", "נאמן", "מספר", "מקור", "תאריך", "עוסק", "ח.פ", "ע.מ",
+        # English
+        "TAX", "INV", "INVOICE", "RECEIPT", "DATE", "NUMBER", "NO.", "#",
+        "VAT", "ID", "BUSINESS", "COMPANY"
+    ]
+
+    for line in lines[:8]:  # Look at top 8 lines (increased from 5)
+        # Skip very short lines and lines with only numbers
+        if len(line) < 3 or line.isdigit():
+            continue
+        # Skip lines that are mostly numbers
+        if sum(c.isdigit() for c in line) / len(line) > 0.5:
+            continue
+        # Check if line contains generic terms
+        if not any(term in line for term in generic_terms):
+            business_name = line
+            break
+
+    # 5. Document Type Detection - Multi-language
+    doc_type = DocumentType.INVOICE if any(
+        word in text.lower() for word in ["חשבונית", "invoice", "tax invoice"]) else DocumentType.RECEIPT
+
+    # Calculate Before VAT (Standard 17%)
+    amount_before_vat = round(total_amount / 1.17, 2) if total_amount > 0 else 0.0
+
+    # 6. Enhanced Invoice Number Detection - Multi-language
+    invoice_number = None
+    invoice_patterns = [
+        # Hebrew
+        r'(?:מס[\'׳]?\s*חשבונית|מספר)[:\s]*([A-Z0-9\-/]+)',
+        # English
+        r'(?:invoice\s*#?|inv\s*#?|receipt\s*#?|ref)[:\s]*([A-Z0-9\-/]+)',
+        # Generic patterns
+        r'\b([A-Z]{2,}\d{4,})\b',  # Pattern like AB12345
+        r'#\s*(\d{4,})',  # Pattern like #12345
+        r'NO[.:]?\s*([A-Z0-9\-/]+)',  # Pattern like NO: 12345
+    ]
+    for pattern in invoice_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            invoice_number = match.group(1)
+            break
+
+    return InvoiceOCRResponse(
+        document_type=doc_type,
+        business_name=business_name,
+        business_vat_number=business_id,
+        amount_before_vat=amount_before_vat,
+        amount_after_vat=total_amount,
+        transaction_date=(parse_date(dates[0]) if dates else None) or datetime.now().date(),
+        invoice_number=invoice_number,
+        service_description="Universal Multi-Language OCR with Israeli & International Format Support"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Image preprocessing benchmark.
+
+For every sample image, runs OCR on the original bytes and on the preprocessed
+bytes and reports bytes saved, preprocessing time, OCR latency and whether the
+parsed fields (total, date, business ID) still match the ones read from the original:
+
+    python -m benchmarks.bench_preprocess --samples ./receipts --backend vision
+    python -m benchmarks.bench_preprocess --synthetic 5 --backend tesseract
+
+With --synthetic, large phone-like JPEGs with a printed receipt are generated
+(there is no ground truth for the fixture backend, use vision or tesseract for accuracy).
+"""
+import io
+import os
+import time
+import random
+import argparse
+from typing import List, Tuple
+from app.services.image_preprocessor import preprocess_image, IMAGE_MAX_SIDE, IMAGE_JPEG_QUALITY
+from app.services.invoice_parser import parse_invoice_text
+from app.services.ocr_backends import create_backend
+
+COMPARED_FIELDS = ("amount_after_vat", "transaction_date", "business_vat_number")
+
+
+def load_samples(directory: str) -> List[Tuple[str, bytes]]:
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(directory, name), "rb") as f:
+                samples.append((name, f.read()))
+    return samples
+
+
+def synthetic_samples(count: int) -> List[Tuple[str, bytes]]:
+    """Noisy 4000x3000 photos of a printed receipt, saved rotated with an EXIF orientation tag."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(42)
+    try:
+        font = ImageFont.load_default(size=90)
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    samples = []
+    for i in range(count):
+        image = Image.effect_noise((4000, 3000), 12).convert("RGB")
+        paper = Image.new("RGB", (2400, 2600), (245, 243, 238))
+        draw = ImageDraw.Draw(paper)
+        total = rng.randint(1000, 99999) / 100
+        lines = [f"Store {i} Ltd", f"Business ID {rng.randint(100000000, 999999999)}",
+                 f"Date {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024", f"Total {total:.2f}"]
+        for row, line in enumerate(lines):
+            draw.text((150, 200 + row * 300), line, fill=(20, 20, 20), font=font)
+        image.paste(paper, (800, 200))
+        image = image.rotate(90, expand=True)  # Stored sideways, EXIF says rotate back
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=95, exif=exif)
+        samples.append((f"synthetic-{i}.jpg", output.getvalue()))
+    return samples
+
+
+def timed_ocr(backend, content: bytes):
+    started = time.perf_counter()
+    try:
+        parsed = parse_invoice_text(backend.detect_text(content))
+    except Exception as e:
+        return None, time.perf_counter() - started, str(e)
+    return parsed, time.perf_counter() - started, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", help="Directory of sample images")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N synthetic samples instead")
+    parser.add_argument("--backend", default="fixture", help="vision, tesseract or fixture")
+    parser.add_argument("--max-side", type=int, default=IMAGE_MAX_SIDE)
+    parser.add_argument("--quality", type=int, default=IMAGE_JPEG_QUALITY)
+    parser.add_argument("--color", action="store_true", help="Keep colour instead of converting to grayscale")
+    args = parser.parse_args()
+
+    if args.samples:
+        samples = load_samples(args.samples)
+    else:
+        samples = synthetic_samples(args.synthetic or 3)
+    backend = create_backend(args.backend, fallback="")
+
+    totals = {"in": 0, "out": 0, "prep": 0.0, "ocr_raw": 0.0, "ocr_prep": 0.0, "matches": 0, "compared": 0}
+    print(f"{'sample':24} {'in KB':>8} {'out KB':>8} {'prep ms':>8} {'ocr raw':>8} {'ocr prep':>8}  fields")
+    for name, content in samples:
+        started = time.perf_counter()
+        processed = preprocess_image(content, args.max_side, not args.color, args.quality)
+        prep = time.perf_counter() - started
+
+        raw, raw_latency, raw_error = timed_ocr(backend, content)
+        prepared, prep_latency, prep_error = timed_ocr(backend, processed)
+        if backend.name == "fixture":
+            fields = "n/a (fixture text depends on the bytes)"
+        elif raw and prepared:
+            same = [field for field in COMPARED_FIELDS if getattr(raw, field) == getattr(prepared, field)]
+            fields = f"{len(same)}/{len(COMPARED_FIELDS)} match"
+            totals["matches"] += len(same)
+            totals["compared"] += len(COMPARED_FIELDS)
+        else:
+            fields = f"error: raw={raw_error} prep={prep_error}"
+
+        totals["in"] += len(content)
+        totals["out"] += len(processed)
+        totals["prep"] += prep
+        totals["ocr_raw"] += raw_latency
+        totals["ocr_prep"] += prep_latency
+        print(f"{name[:24]:24} {len(content) / 1024:8.0f} {len(processed) / 1024:8.0f} {prep * 1000:8.0f} "
+              f"{raw_latency * 1000:7.0f}ms {prep_latency * 1000:7.0f}ms  {fields}")
+
+    count = len(samples)
+    print(f"\n{count} samples, backend={backend.name}: {totals['in'] / 1024 / 1024:.1f} MB -> "
+          f"{totals['out'] / 1024 / 1024:.1f} MB ({1 - totals['out'] / totals['in']:.0%} saved)")
+    print(f"avg preprocess {totals['prep'] / count * 1000:.0f} ms, avg OCR {totals['ocr_raw'] / count * 1000:.0f} ms "
+          f"raw vs {totals['ocr_prep'] / count * 1000:.0f} ms preprocessed")
+    if totals["compared"]:
+        print(f"field agreement with the original: {totals['matches'] / totals['compared']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
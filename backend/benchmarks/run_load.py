@@ -0,0 +1,464 @@
+"""
+End-to-end load test of the API: login, expense list (full and 304 revalidation),
+search, reports and single-image upload, plus the OCR text parser in-process.
+
+Seed data first (see benchmarks.seed_data), then either point it at a running server
+started with the fake OCR backend, or let it start uvicorn itself:
+
+    OCR_BACKEND=fixture OCR_FIXTURE_LATENCY_MS=400 OCR_FIXTURE_JITTER_MS=200 \\
+        LOGIN_RATE_LIMIT_PER_IP=1000000 LOGIN_RATE_LIMIT_PER_ACCOUNT=1000000 uvicorn main:app
+    python -m benchmarks.run_load --url http://127.0.0.1:8000 --server-pid <uvicorn pid>
+
+    python -m benchmarks.run_load --spawn --workers 2 --ocr-latency-ms 400 --label baseline
+    python -m benchmarks.run_load --spawn --scenarios expenses,upload --compare latest
+    python -m benchmarks.run_load --spawn --server gunicorn --workers 4 --label gunicorn
+
+Each scenario runs for --duration seconds with --concurrency concurrent clients and
+reports p50/p95/p99 latency, throughput, error counts and the server's resident memory
+(the process tree of --server-pid / the spawned server: start, peak, end). Results are
+written to --results-dir as JSON; --compare (a file or "latest") prints the change
+against an earlier run and exits with status 1 when p95 latency or throughput regressed
+by more than --threshold. A spawned server's cold start (seconds until it answered, and
+the app_startup_seconds phases it reports at /metrics) is saved with the results. Uploads use unique bytes, so the OCR cache never answers them.
+
+Needs httpx (pip install httpx). The client shares the machine with the server: for
+numbers beyond a few hundred requests per second, run it from another host.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+import httpx
+from .bench_parser import build_corpus
+from .seed_data import EMAIL_PATTERN, DEFAULT_PASSWORD
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+SCENARIOS = ("login", "expenses", "expenses_304", "search", "reports", "upload", "parser")
+SORT_KEYS = ("transaction_date", "amount_after_vat", "business_name", "category")
+SEARCH_WORDS = ("cafe", "office", "aws", "bezeq", "סופר", "דלק", "פארם", "international")
+# Pages a client walks through the list before starting over with another sort order
+MAX_PAGES = 5
+
+
+class Scenario:
+    """Per-scenario client state and results."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.elapsed = 0.0
+        self.rss: List[int] = []
+
+    def record(self, started: float, status: Optional[int]):
+        latency = time.perf_counter() - started
+        if status is None:
+            self.errors += 1
+            return
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status < 400:
+            self.latencies.append(latency)
+        else:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+        result = {
+            "requests": len(ordered) + self.errors,
+            "ok": len(ordered),
+            "errors": self.errors,
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+            "throughput_rps": round(len(ordered) / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+        }
+        if self.rss:
+            result.update(rss_start_mb=_mb(self.rss[0]), rss_peak_mb=_mb(max(self.rss)), rss_end_mb=_mb(self.rss[-1]))
+        return result
+
+
+def _mb(value: int) -> float:
+    return round(value / 1024 / 1024, 1)
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """Resident memory of a process and all its descendants (Linux /proc), None elsewhere."""
+    if not os.path.exists(f"/proc/{pid}/status"):
+        return None
+    pids, total = [pid], 0
+    for current in pids:
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+            with open(f"/proc/{current}/status") as f:
+                total += next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            continue  # Exited while we were reading it
+    return total
+
+
+def base_receipt_jpeg() -> bytes:
+    """A small JPEG with a printed receipt; uploads append a unique suffix after the image data."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("L", (600, 800), 245)
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(["Load Test Store", "Business ID 514000000", "Date 01/02/2024", "Total 117.00"]):
+        draw.text((40, 60 + row * 40), line, fill=20)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=85)
+    return output.getvalue()
+
+
+class LoadTest:
+    def __init__(self, args, base_url: str, server_pid: Optional[int]):
+        self.args = args
+        self.base_url = base_url
+        self.server_pid = server_pid
+        self.rng = random.Random(args.seed)
+        self.tokens: List[str] = []
+        self.receipt = base_receipt_jpeg()
+        self.upload_counter = 0
+
+    async def login_users(self, client: httpx.AsyncClient):
+        for i in range(self.args.users):
+            response = await client.post("/api/auth/login", data={
+                "username": EMAIL_PATTERN.format(i), "password": self.args.password
+            })
+            if response.status_code != 200:
+                raise SystemExit(f"Login of {EMAIL_PATTERN.format(i)} failed ({response.status_code}): "
+                                 f"seed the users first (python -m benchmarks.seed_data --users {self.args.users})")
+            self.tokens.append(response.json()["access_token"])
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+
+    # --- Client loops: one request per call, returns the status code ---
+
+    async def do_login(self, client, state) -> int:
+        response = await client.post("/api/auth/login", data={
+            "username": EMAIL_PATTERN.format(self.rng.randrange(self.args.users)), "password": self.args.password
+        })
+        return response.status_code
+
+    async def do_expenses(self, client, state) -> int:
+        # Walk a few pages of one sort order, like a user scrolling, then start over
+        if not state.get("cursor") or state.get("pages", 0) >= MAX_PAGES:
+            state.update(cursor=None, pages=0, headers=self._headers(), params={
+                "sort_by": self.rng.choice(SORT_KEYS), "direction": self.rng.choice(("asc", "desc")),
+                "limit": self.args.page_size,
+            })
+        params = dict(state["params"], **({"cursor": state["cursor"]} if state["cursor"] else {}))
+        response = await client.get("/api/expenses", params=params, headers=state["headers"])
+        if response.status_code == 200:
+            state["cursor"] = response.json().get("next_cursor")
+            state["pages"] += 1
+        return response.status_code
+
+    async def do_expenses_304(self, client, state) -> int:
+        # Revalidation of an unchanged first page, as a browser does on every navigation
+        if "etag" not in state:
+            state["headers"] = self._headers()
+            response = await client.get("/api/expenses", headers=state["headers"])
+            state["etag"] = response.headers.get("etag", "")
+        response = await client.get("/api/expenses", headers={**state["headers"], "If-None-Match": state["etag"]})
+        return response.status_code
+
+    async def do_search(self, client, state) -> int:
+        response = await client.get("/api/search", headers=self._headers(), params={
+            "q": self.rng.choice(SEARCH_WORDS)[:self.rng.randint(3, 6)]
+        })
+        return response.status_code
+
+    async def do_reports(self, client, state) -> int:
+        year = self.rng.randint(2020, 2026)
+        response = await client.get("/api/reports/summary", headers=self._headers(), params={
+            "start_date": f"{year}-01-01", "end_date": f"{year}-12-31"
+        })
+        return response.status_code
+
+    async def do_upload(self, client, state) -> int:
+        self.upload_counter += 1
+        # Bytes after the JPEG end marker are ignored by decoders but change the content hash
+        content = self.receipt + f"{os.getpid()}-{time.time_ns()}-{self.upload_counter}".encode()
+        response = await client.post(
+            "/api/invoice/upload", headers=self._headers(),
+            files={"file": ("receipt.jpg", content, "image/jpeg")}, data={"category": "אחר"}
+        )
+        return response.status_code
+
+    # --- Runner ---
+
+    async def run_scenario(self, client: httpx.AsyncClient, name: str) -> Scenario:
+        scenario = Scenario(name)
+        action: Callable = getattr(self, f"do_{name}")
+        deadline = time.perf_counter() + self.args.duration
+        stop = asyncio.Event()
+
+        async def worker():
+            state: dict = {}
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status = await action(client, state)
+                except httpx.HTTPError:
+                    status = None
+                scenario.record(started, status)
+
+        async def sample_memory():
+            while not stop.is_set():
+                rss = process_tree_rss(self.server_pid)
+                if rss is not None:
+                    scenario.rss.append(rss)
+                try:
+                    await asyncio.wait_for(stop.wait(), 0.25)
+                except asyncio.TimeoutError:
+                    pass
+
+        sampler = asyncio.create_task(sample_memory()) if self.server_pid else None
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        scenario.elapsed = time.perf_counter() - started
+        stop.set()
+        if sampler:
+            await sampler
+        return scenario
+
+    async def run(self, names: List[str]) -> Dict[str, dict]:
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        results = {}
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.args.timeout) as client:
+            await self.login_users(client)
+            for name in names:
+                scenario = await self.run_scenario(client, name)
+                results[name] = scenario.summary()
+                print_row(name, results[name])
+        return results
+
+
+def run_parser(docs: int, seed: int) -> dict:
+    """The OCR text parser in this process (no server), docs parsed per second and per-doc latency."""
+    from app.services.invoice_parser import parse_invoice_text
+
+    corpus = build_corpus(docs, seed)
+    latencies = []
+    started = time.perf_counter()
+    for text in corpus:
+        doc_started = time.perf_counter()
+        parse_invoice_text(text)
+        latencies.append(time.perf_counter() - doc_started)
+    scenario = Scenario("parser")
+    scenario.latencies = latencies
+    scenario.statuses = {200: len(latencies)}
+    scenario.elapsed = time.perf_counter() - started
+    return scenario.summary()
+
+
+def print_header():
+    print(f"{'scenario':14} {'req':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'rss MB (start/peak/end)':>24}")
+
+
+def print_row(name: str, result: dict):
+    def fmt(value):
+        return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+    rss = (f"{result['rss_start_mb']}/{result['rss_peak_mb']}/{result['rss_end_mb']}"
+           if "rss_peak_mb" in result else "-")
+    print(f"{name:14} {result['requests']:7d} {result['errors']:5d} {result['throughput_rps']:8.1f} "
+          f"{fmt(result['p50_ms'])} {fmt(result['p95_ms'])} {fmt(result['p99_ms'])} {fmt(result['max_ms'])} {rss:>24}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results_dir: str, report: dict) -> str:
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(results_dir, f"{stamp}-{report['label']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def previous_result(results_dir: str, exclude: str) -> Optional[str]:
+    # File names start with a UTC timestamp, so the newest sorts last
+    files = sorted(
+        os.path.join(results_dir, name) for name in os.listdir(results_dir)
+        if name.endswith(".json") and os.path.join(results_dir, name) != exclude
+    ) if os.path.isdir(results_dir) else []
+    return files[-1] if files else None
+
+
+def compare(previous: dict, current: dict, threshold: float) -> List[str]:
+    """Prints p95/throughput changes per scenario; returns the scenarios that regressed."""
+    print(f"\nCompared with {previous['label']} ({previous.get('git_commit') or '?'}, {previous['started_at']}):")
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if not before or not before.get("p95_ms") or not result.get("p95_ms") or not before["throughput_rps"]:
+            continue
+        p95_change = result["p95_ms"] / before["p95_ms"] - 1
+        rps_change = result["throughput_rps"] / before["throughput_rps"] - 1
+        regressed = p95_change > threshold or rps_change < -threshold
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:14} p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms ({p95_change:+.0%}), "
+              f"throughput {before['throughput_rps']:.1f} -> {result['throughput_rps']:.1f} rps ({rps_change:+.0%})"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def spawn_server(args) -> subprocess.Popen:
+    """uvicorn (or gunicorn, see gunicorn.conf.py) with the fake OCR backend and login rate limits out of the way."""
+    env = dict(
+        os.environ,
+        OCR_BACKEND="fixture",
+        OCR_FALLBACK_BACKEND="",
+        OCR_FIXTURE_LATENCY_MS=str(args.ocr_latency_ms),
+        OCR_FIXTURE_JITTER_MS=str(args.ocr_jitter_ms),
+        LOGIN_RATE_LIMIT_PER_IP="1000000",
+        LOGIN_RATE_LIMIT_PER_ACCOUNT="1000000",
+    )
+    if args.server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app",
+                   "--bind", f"127.0.0.1:{args.port}", "--workers", str(args.workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+                   "--workers", str(args.workers), "--log-level", "warning"]
+    # Own process group, so the server's worker pools are stopped with it
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, start_new_session=True)
+
+
+def stop_server(server: subprocess.Popen):
+    try:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+    except ProcessLookupError:
+        pass
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 60) -> dict:
+    """Polls until the server answers; returns its cold start (seconds since spawn, app_startup_seconds)."""
+    started = time.monotonic()
+    while time.monotonic() < started + timeout:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with status {server.returncode}")
+        try:
+            response = httpx.get(f"{base_url}/metrics", timeout=2)
+            if response.status_code == 200:
+                startup = {"spawn_to_ready_seconds": round(time.monotonic() - started, 3)}
+                # Phases of whichever worker answered (ready_seconds: that worker's own boot)
+                for line in response.text.splitlines():
+                    if line.startswith("app_startup_seconds{"):
+                        phase = line.split('"')[1]
+                        startup[f"{phase}_seconds"] = float(line.rsplit(" ", 1)[1])
+                return startup
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit("Server did not start in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--server-pid", type=int, default=None, help="Sample this process tree's memory")
+    parser.add_argument("--spawn", action="store_true", help="Start uvicorn (fake OCR) for the run")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the spawned server")
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn", help="Spawned server")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes of the spawned server")
+    parser.add_argument("--ocr-latency-ms", type=int, default=400, help="Fake OCR call latency (spawned server)")
+    parser.add_argument("--ocr-jitter-ms", type=int, default=150)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per scenario")
+    parser.add_argument("--users", type=int, default=10, help="Seeded users to spread requests over")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--parser-docs", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="run", help="Name of this run in the results file")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", default=None, help='Earlier results file, or "latest"')
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    server = None
+    base_url, server_pid = args.url, args.server_pid
+    if args.spawn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = spawn_server(args)
+        server_pid = server.pid
+    report = {
+        "label": args.label,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("password", "results_dir", "compare")},
+        "scenarios": {},
+    }
+    try:
+        http_names = [name for name in names if name != "parser"]
+        if http_names and server:
+            report["startup"] = wait_until_ready(base_url, server)
+            print(f"Server ready {report['startup']['spawn_to_ready_seconds']:.2f}s after spawn\n")
+        print_header()
+        if http_names:
+            report["scenarios"].update(asyncio.run(LoadTest(args, base_url, server_pid).run(http_names)))
+        if "parser" in names:
+            report["scenarios"]["parser"] = run_parser(args.parser_docs, args.seed)
+            print_row("parser", report["scenarios"]["parser"])
+    finally:
+        if server:
+            stop_server(server)
+
+    path = save_results(args.results_dir, report)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        previous_path = previous_result(args.results_dir, path) if args.compare == "latest" else args.compare
+        if not previous_path:
+            print("No earlier results to compare with")
+            return
+        with open(previous_path, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Seeds the database in DATABASE_URL with load-test users and their invoices/expenses.
+
+    python -m benchmarks.seed_data --users 50 --invoices-per-user 2000
+    DATABASE_URL=sqlite:////tmp/loadtest.db python -m benchmarks.seed_data --users 5 --invoices-per-user 500
+
+Users are loadtest<N>@example.com with the same password (--password). Invoices go
+through InvoiceRepository.bulk_create_with_expenses, so OCR texts, search documents,
+monthly rollups and data versions are written exactly as uploads write them. The
+receipt texts come from the parser benchmark corpus (vendors, dates and totals vary).
+Users that already exist are skipped, so the command can be re-run to top up; --reset
+deletes the load-test users and all their data first. The schema is migrated to head first.
+"""
+import os
+import time
+import random
+import argparse
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import delete, select
+from app.core import security
+from app.database import SessionLocal
+from app.models import (
+    User, Invoice, Expense, InvoiceFingerprint, InvoiceOCRText, InvoiceSearchDocument, ExpenseMonthlySummary
+)
+from app.repositories.invoice_repo import InvoiceRepository
+from app.schemas.expense_schemas import ExpenseCategory
+from app.services.invoice_parser import parse_invoice_text
+from .bench_parser import build_corpus
+
+EMAIL_PATTERN = "loadtest{}@example.com"
+DEFAULT_PASSWORD = "loadtest-password"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def migrate_database():
+    """`alembic upgrade head` on DATABASE_URL (the app no longer creates tables itself)."""
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(config, "head")
+
+
+def reset_users(db) -> int:
+    """Deletes the load-test users and their rows (invoices and expenses have no ON DELETE CASCADE)."""
+    user_ids = list(db.scalars(select(User.id).where(User.email.like(EMAIL_PATTERN.format("%")))))
+    if not user_ids:
+        return 0
+    invoice_ids = select(Invoice.id).where(Invoice.user_id.in_(user_ids))
+    for model in (InvoiceSearchDocument, InvoiceOCRText, InvoiceFingerprint):
+        db.execute(delete(model).where(model.invoice_id.in_(invoice_ids)))
+    db.execute(delete(ExpenseMonthlySummary).where(ExpenseMonthlySummary.user_id.in_(user_ids)))
+    db.execute(delete(Expense).where(Expense.user_id.in_(user_ids)))
+    db.execute(delete(Invoice).where(Invoice.user_id.in_(user_ids)))
+    db.execute(delete(User).where(User.id.in_(user_ids)))
+    db.commit()
+    return len(user_ids)
+
+
+def seed_user(db, user_id: int, invoices: int, chunk_size: int, corpus: list, rng: random.Random) -> int:
+    repo = InvoiceRepository(db)
+    categories = list(ExpenseCategory)
+    created = 0
+    while created < invoices:
+        size = min(chunk_size, invoices - created)
+        items = []
+        for _ in range(size):
+            ocr_data = parse_invoice_text(rng.choice(corpus))
+            items.append((ocr_data, rng.choice(categories), None))
+        repo.bulk_create_with_expenses(user_id, items)
+        db.commit()
+        created += size
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--invoices-per-user", type=int, default=1000)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--chunk-size", type=int, default=500, help="Invoices per bulk insert")
+    parser.add_argument("--corpus", type=int, default=2000, help="Distinct receipt texts to draw from")
+    parser.add_argument("--reset", action="store_true", help="Delete existing load-test users first")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    migrate_database()
+
+    started = time.perf_counter()
+    rng = random.Random(args.seed)
+    corpus = build_corpus(args.corpus, args.seed)
+    hashed_password = security.get_password_hash(args.password)  # bcrypt once, shared by all users
+    emails = [EMAIL_PATTERN.format(i) for i in range(args.users)]
+
+    db = SessionLocal()
+    try:
+        if args.reset:
+            print(f"Deleted {reset_users(db)} load-test users")
+
+        existing = set(db.scalars(select(User.email).where(User.email.in_(emails))))
+        total = 0
+        for email in emails:
+            if email in existing:
+                continue
+            user = User(email=email, hashed_password=hashed_password)
+            db.add(user)
+            db.commit()
+            total += seed_user(db, user.id, args.invoices_per_user, args.chunk_size, corpus, rng)
+            rate = total / max(time.perf_counter() - started, 1e-9)
+            print(f"{email}: {args.invoices_per_user} invoices ({total} total, {rate:.0f}/s)")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Seeded {args.users - len(existing)} users ({len(existing)} already existed) and {total} invoices "
+          f"in {time.perf_counter() - started:.1f}s. Password: {args.password}")
+
+
+if __name__ == "__main__":
+    main()
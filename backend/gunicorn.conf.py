@@ -0,0 +1,56 @@
+"""
+Production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Every setting can be overridden with the usual gunicorn flags or GUNICORN_CMD_ARGS.
+"""
+import os
+import multiprocessing
+
+# 1. Workers: one event loop per core. Requests are async and OCR calls wait on the network
+#    in each worker's thread pool, so more workers than cores would only add memory.
+CPU_COUNT = multiprocessing.cpu_count()
+workers = int(os.getenv("WEB_CONCURRENCY", str(CPU_COUNT)))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# 2. The process pools for bcrypt and image shrinking default to one process per core in
+#    every worker. post_fork splits the cores between the workers actually started instead
+#    (this value, WEB_CONCURRENCY or a --workers flag), unless HASH_WORKERS or
+#    IMAGE_PREPROCESS_WORKERS is set explicitly.
+
+# 3. Import the app once in the master and fork the workers from it: imports are paid once
+#    and the code pages are shared. Nothing that cannot cross a fork is built at import time
+#    (the OCR client and the process pools are created per worker, see main.lifespan).
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# 4. Graceful shutdown: SIGTERM lets open requests finish and the lifespan drain queued
+#    uploads (OCR_DRAIN_TIMEOUT_SECONDS, keep it below this) before a worker is killed
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# A worker that does not report for this long is restarted (batch uploads can take a while)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", None)
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    from app.core.startup import startup_timer
+    from app.core.password_hasher import password_hasher
+    from app.api.invoices import ocr_service
+    from app.database import engine, async_engine
+
+    # The worker's cold start is measured from the fork, not from the master's imports
+    startup_timer.restart()
+    # Connections the master may have opened while importing must not be shared with it
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    # The pools start on first use, so their size can still be set here
+    share = max(CPU_COUNT // server.cfg.workers, 1)
+    if "HASH_WORKERS" not in os.environ:
+        password_hasher.workers = share
+    if "IMAGE_PREPROCESS_WORKERS" not in os.environ and ocr_service.preprocessor:
+        ocr_service.preprocessor.workers = share
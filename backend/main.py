@@ -1,18 +1,82 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from app.core.startup import startup_timer  # First, so the import phase covers everything below
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import engine
-from app.models.base import Base
+from app.database import engine, async_engine
 from app.core import auth_routes
-from app.api import invoices
-from app.models import user, invoice, expense
+from app.core.metrics import registry, http_request_duration
+from app.core.password_hasher import password_hasher
+from app.core.schema_check import SCHEMA_CHECK_ENABLED, check_schema, head_revision
+from app.services.ocr_service import OCR_DRAIN_TIMEOUT_SECONDS
+from app.services.upload_service import UploadSizeLimitMiddleware, UPLOAD_MAX_BYTES
+from app.api import invoices, reports, search
+
+# The schema is not created here: run `alembic upgrade head` once per deploy, before the workers start.
+# The newest revision is read from migrations/ at import, so a preloading master does it for all workers.
+if SCHEMA_CHECK_ENABLED:
+    head_revision()
+
+logger = logging.getLogger("uvicorn.error")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 1. Warn when the database is not at this code's migration (one row read, no catalog introspection)
+    if SCHEMA_CHECK_ENABLED:
+        started = time.perf_counter()
+        current, head = await asyncio.to_thread(check_schema, engine)
+        if current != head:
+            logger.error("Database schema is at revision %s but this code expects %s: run `alembic upgrade head`",
+                         current or "(none)", head)
+        startup_timer.record("schema_check", time.perf_counter() - started)
+
+    # 2. Build the OCR client in this worker (a gRPC channel must not be inherited across a fork)
+    started = time.perf_counter()
+    await asyncio.to_thread(invoices.ocr_service.start)
+    startup_timer.record("ocr_client", time.perf_counter() - started)
+    startup_timer.ready()
+
+    yield
+
+    # 3. Graceful shutdown: the server has stopped accepting requests and finished the open ones.
+    #    Let queued background uploads and admitted OCR calls finish, then stop the pools.
+    drain_started = time.perf_counter()
+    lost = await invoices.ingestion_pipeline.drain(OCR_DRAIN_TIMEOUT_SECONDS)
+    remaining = max(OCR_DRAIN_TIMEOUT_SECONDS - (time.perf_counter() - drain_started), 0)
+    drained = await invoices.ocr_service.drain(remaining)
+    if lost:
+        logger.warning("Shutdown drain timed out: %d queued uploads were not processed", lost)
+    if not drained:
+        logger.warning("Shutdown drain timed out with OCR calls still running")
+    invoices.ocr_service.shutdown(wait=drained)
+    password_hasher.shutdown(wait=True)
+    await async_engine.dispose()
+    engine.dispose()
 
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Invoice Management System API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Oversized uploads are cut off while the body streams in (added first, so CORS wraps its 413)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/invoice/upload": UPLOAD_MAX_BYTES,
+        "/api/invoice/jobs": UPLOAD_MAX_BYTES,
+        "/api/invoice/upload/batch": invoices.BATCH_MAX_BYTES,
+    }
 )
 
 # CORS
@@ -24,12 +88,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template (/api/reports/{...}), not the raw path, to bound the series count
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - started,
+            request.method, getattr(route, "path", "unmatched"), str(status_code)
+        )
+
+
 app.include_router(auth_routes.router)
 app.include_router(invoices.router)
+app.include_router(reports.router)
+app.include_router(search.router)
 
 @app.get("/")
 def health_check():
     return {"status": "online"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (per worker process)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+startup_timer.record("import", startup_timer.since_start())
+
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Development server (single process, reloads on change). Production runs several
+    # workers under gunicorn: `gunicorn -c gunicorn.conf.py main:app`
+    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")), reload=True)
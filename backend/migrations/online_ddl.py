@@ -0,0 +1,51 @@
+"""
+Index changes that do not block writes, for migrations that touch large, live tables.
+
+On PostgreSQL, CREATE/DROP INDEX CONCURRENTLY lets inserts and updates continue while the
+index is built or removed (a plain CREATE INDEX holds a SHARE lock until it is done). It
+cannot run inside a transaction, so the calls run in an autocommit block: the migration's
+transaction is committed first. Other databases get the plain statements.
+
+    from migrations.online_ddl import create_index_online, drop_index_online
+
+    def upgrade():
+        create_index_online("ix_invoices_user_id_created_at", "invoices", ["user_id", "created_at"])
+"""
+from typing import List
+from alembic import op
+import sqlalchemy as sa
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _invalid_index(name: str) -> bool:
+    # An interrupted concurrent build leaves an INVALID index behind, ignored by queries
+    # but still maintained on writes; IF NOT EXISTS would keep it forever.
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name}
+    ).first() is not None
+
+
+def create_index_online(name: str, table: str, columns: List[str], **kwargs):
+    if not _is_postgresql():
+        op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+        return
+    with op.get_context().autocommit_block():
+        # (offline --sql runs have no connection to check against)
+        if not op.get_context().as_sql and _invalid_index(name):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+
+
+def drop_index_online(name: str, table: str):
+    if not _is_postgresql():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
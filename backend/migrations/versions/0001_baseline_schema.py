@@ -0,0 +1,95 @@
+"""Baseline schema (what Base.metadata.create_all produced before migrations existed)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing deployments already have these tables from create_all, so only missing ones are created
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "invoices" not in existing:
+        op.create_table(
+            "invoices",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("business_name", sa.String()),
+            sa.Column("company_id", sa.String()),
+            sa.Column("invoice_number", sa.String(), nullable=True),
+            sa.Column("document_type", sa.String()),
+            sa.Column("amount_before_vat", sa.Float()),
+            sa.Column("amount_after_vat", sa.Float()),
+            sa.Column("transaction_date", sa.Date()),
+            sa.Column("service_description", sa.String(), nullable=True),
+            sa.Column("category", sa.String()),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_invoices_id", "invoices", ["id"])
+        op.create_index("ix_invoices_business_name", "invoices", ["business_name"])
+        op.create_index("ix_invoices_category", "invoices", ["category"])
+
+    if "expenses" not in existing:
+        op.create_table(
+            "expenses",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("invoices.id"), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("category", sa.String()),
+            sa.Column("notes", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_expenses_id", "expenses", ["id"])
+
+    if "ocr_cache_entries" not in existing:
+        op.create_table(
+            "ocr_cache_entries",
+            sa.Column("content_hash", sa.String(64), primary_key=True),
+            sa.Column("raw_text", sa.Text(), nullable=False),
+            sa.Column("parsed_json", sa.Text(), nullable=False),
+            sa.Column("hit_count", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_ocr_cache_entries_created_at", "ocr_cache_entries", ["created_at"])
+        op.create_index("ix_ocr_cache_entries_last_used_at", "ocr_cache_entries", ["last_used_at"])
+
+    if "invoice_fingerprints" not in existing:
+        op.create_table(
+            "invoice_fingerprints",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("content_hash", sa.String(64), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_invoice_fingerprints_id", "invoice_fingerprints", ["id"])
+        op.create_index("ix_invoice_fingerprints_user_hash", "invoice_fingerprints", ["user_id", "content_hash"])
+
+
+def downgrade():
+    op.drop_table("invoice_fingerprints")
+    op.drop_table("ocr_cache_entries")
+    op.drop_table("expenses")
+    op.drop_table("invoices")
+    op.drop_table("users")
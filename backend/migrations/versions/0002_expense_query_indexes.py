@@ -0,0 +1,44 @@
+"""Indexes for the expense list: FK, (user_id, sort column, id) and trigram vendor search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+from migrations.online_ddl import create_index_online
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+COMPOSITE_INDEXES = [
+    ("ix_invoices_user_id_transaction_date_id", "invoices", ["user_id", "transaction_date", "id"]),
+    ("ix_invoices_user_id_amount_after_vat_id", "invoices", ["user_id", "amount_after_vat", "id"]),
+    ("ix_invoices_user_id_amount_before_vat_id", "invoices", ["user_id", "amount_before_vat", "id"]),
+    ("ix_invoices_user_id_business_name_id", "invoices", ["user_id", "business_name", "id"]),
+    ("ix_expenses_user_id_category_id", "expenses", ["user_id", "category", "id"]),
+    ("ix_expenses_invoice_id", "expenses", ["invoice_id"]),
+]
+
+
+def upgrade():
+    # Databases from before migrations have these tables full and in use: build without blocking writes
+    for name, table, columns in COMPOSITE_INDEXES:
+        create_index_online(name, table, columns)
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        create_index_online(
+            "ix_invoices_business_name_trgm", "invoices", ["business_name"],
+            postgresql_using="gin",
+            postgresql_ops={"business_name": "gin_trgm_ops"}
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_invoices_business_name_trgm", table_name="invoices", if_exists=True)
+    for name, table, _ in reversed(COMPOSITE_INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
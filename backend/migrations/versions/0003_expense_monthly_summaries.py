@@ -0,0 +1,50 @@
+"""Per-user monthly expense rollup (expense_monthly_summaries), backfilled from existing rows
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+MONTH_EXPRESSIONS = {
+    "postgresql": "CAST(date_trunc('month', invoices.transaction_date) AS DATE)",
+    "sqlite": "strftime('%Y-%m-01', invoices.transaction_date)",
+}
+
+BACKFILL = """
+INSERT INTO expense_monthly_summaries (user_id, month, category, count, amount_before_vat, amount_after_vat)
+SELECT expenses.user_id, {month}, COALESCE(expenses.category, 'אחר'),
+       COUNT(expenses.id), COALESCE(SUM(invoices.amount_before_vat), 0), COALESCE(SUM(invoices.amount_after_vat), 0)
+FROM expenses JOIN invoices ON expenses.invoice_id = invoices.id
+WHERE invoices.transaction_date IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+
+def upgrade():
+    bind = op.get_bind()
+    # create_all at app startup may already have created the (empty) table
+    if "expense_monthly_summaries" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "expense_monthly_summaries",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("month", sa.Date(), primary_key=True),
+            sa.Column("category", sa.String(), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.Column("amount_before_vat", sa.Float(), nullable=False),
+            sa.Column("amount_after_vat", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    op.execute("DELETE FROM expense_monthly_summaries")
+    op.execute(BACKFILL.format(month=MONTH_EXPRESSIONS[bind.dialect.name]))
+
+
+def downgrade():
+    op.drop_table("expense_monthly_summaries")
@@ -0,0 +1,33 @@
+"""Raw OCR text per invoice (invoice_ocr_texts), for re-parsing without another OCR call
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all at app startup may already have created the table
+    if "invoice_ocr_texts" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "invoice_ocr_texts",
+        sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("compressed_text", sa.LargeBinary(), nullable=False),
+        sa.Column("raw_size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("reparsed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Texts of existing invoices are copied from the OCR cache by
+    # `python -m app.commands.reparse_invoices --backfill` (compression happens in Python)
+
+
+def downgrade():
+    op.drop_table("invoice_ocr_texts")
@@ -0,0 +1,61 @@
+"""Full-text search documents per invoice (invoice_search_documents) with a GIN index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import os
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Must match app.repositories.search_repo.SEARCH_TS_CONFIG
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_postgresql = bind.dialect.name == "postgresql"
+    # create_all at app startup may already have created the table
+    if "invoice_search_documents" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "invoice_search_documents",
+            sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("invoices.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("document", postgresql.TSVECTOR() if is_postgresql else sa.Text(), nullable=False),
+        )
+        op.create_index("ix_invoice_search_documents_user_id", "invoice_search_documents", ["user_id"])
+        if is_postgresql:
+            op.create_index("ix_invoice_search_documents_document", "invoice_search_documents", ["document"],
+                            postgresql_using="gin")
+
+    # Index vendor, number and notes of existing invoices. Their OCR texts are added by
+    # `python -m app.commands.rebuild_search_index` (decompression happens in Python)
+    if is_postgresql:
+        op.execute(sa.text("""
+            INSERT INTO invoice_search_documents (invoice_id, user_id, document)
+            SELECT i.id, i.user_id,
+                   setweight(to_tsvector(CAST(:config AS regconfig), regexp_replace(lower(coalesce(i.business_name, '')), '[^[:alnum:]]+', ' ', 'g')), 'A')
+                   || setweight(to_tsvector(CAST(:config AS regconfig), regexp_replace(lower(coalesce(i.invoice_number, '')), '[^[:alnum:]]+', ' ', 'g')), 'A')
+                   || setweight(to_tsvector(CAST(:config AS regconfig), regexp_replace(lower(coalesce(e.notes, '')), '[^[:alnum:]]+', ' ', 'g')), 'B')
+            FROM invoices i LEFT JOIN expenses e ON e.invoice_id = i.id
+            ON CONFLICT (invoice_id) DO NOTHING
+        """).bindparams(config=SEARCH_TS_CONFIG))
+        op.execute("ANALYZE invoice_search_documents")
+    else:
+        op.execute("""
+            INSERT OR IGNORE INTO invoice_search_documents (invoice_id, user_id, document)
+            SELECT i.id, i.user_id,
+                   lower(trim(coalesce(i.business_name, '') || ' ' || coalesce(i.invoice_number, '') || ' '
+                              || coalesce(e.notes, '')))
+            FROM invoices i LEFT JOIN expenses e ON e.invoice_id = i.id
+        """)
+
+
+def downgrade():
+    op.drop_table("invoice_search_documents")
@@ -0,0 +1,25 @@
+"""users.data_version, the per-user change counter behind expense list caching and ETags
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")]
+    if "data_version" in columns:
+        return
+    # A constant server default: PostgreSQL adds the column without rewriting the table
+    op.add_column("users", sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    op.drop_column("users", "data_version")
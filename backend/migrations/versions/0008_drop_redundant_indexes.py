@@ -0,0 +1,35 @@
+"""Drop indexes that duplicate a primary key or are covered by the per-user composite indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from migrations.online_ddl import create_index_online, drop_index_online
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns). Every insert maintains them, no query uses them:
+# the *_id ones repeat the primary key, every invoice query filters on user_id first
+# (served by ix_invoices_user_id_*), and invoices.category is never queried
+# (the list, filters and reports use expenses.category).
+REDUNDANT_INDEXES = [
+    ("ix_users_id", "users", ["id"]),
+    ("ix_invoices_id", "invoices", ["id"]),
+    ("ix_expenses_id", "expenses", ["id"]),
+    ("ix_invoice_fingerprints_id", "invoice_fingerprints", ["id"]),
+    ("ix_invoices_business_name", "invoices", ["business_name"]),
+    ("ix_invoices_category", "invoices", ["category"]),
+]
+
+
+def upgrade():
+    for name, table, _ in REDUNDANT_INDEXES:
+        drop_index_online(name, table)
+
+
+def downgrade():
+    for name, table, columns in reversed(REDUNDANT_INDEXES):
+        create_index_online(name, table, columns)
@@ -0,0 +1,27 @@
+"""Drop ocr_cache_entries.parsed_json: the OCR cache keeps only the text and parses it again on a hit
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column["name"] for column in sa.inspect(op.get_bind()).get_columns("ocr_cache_entries")]
+    if "parsed_json" not in columns:
+        return
+    # Only a catalog change on PostgreSQL, the table is not rewritten
+    op.drop_column("ocr_cache_entries", "parsed_json")
+
+
+def downgrade():
+    # Cached rows have no parsed payload to restore: start the older code with an empty cache
+    op.execute("DELETE FROM ocr_cache_entries")
+    op.add_column("ocr_cache_entries", sa.Column("parsed_json", sa.Text(), nullable=False, server_default=""))
@@ -0,0 +1,52 @@
+import os
+import uuid
+import tempfile
+import pytest
+
+# Tests run against a throwaway SQLite database, migrated the way a deployment is, or against
+# TEST_DATABASE_URL (a dedicated, disposable PostgreSQL database for the PostgreSQL-only tests).
+# Set before anything imports app.database, which builds the engines at import time.
+_DB_DIR = tempfile.mkdtemp(prefix="invoicely-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}")
+os.environ.setdefault("OCR_BACKEND", "fixture")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    from alembic import command
+    from alembic.config import Config
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(config, "head")
+
+
+@pytest.fixture
+def db(migrated_database):
+    from app.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client(migrated_database):
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def register_user(client):
+    """Registers a new user and returns (user id, auth headers)."""
+    def register():
+        email = f"user-{uuid.uuid4().hex}@example.com"
+        user_id = client.post("/api/auth/register", json={"email": email, "password": "secret"}).json()["id"]
+        token = client.post("/api/auth/login", data={"username": email, "password": "secret"}).json()["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+    return register
@@ -0,0 +1,58 @@
+import asyncio
+import io
+import zipfile
+from tempfile import SpooledTemporaryFile
+import pytest
+from starlette.datastructures import UploadFile
+from app.api.invoices import _expand_batch_files
+from app.services.upload_service import UploadBudgetExhaustedError, UploadMemoryBudget
+
+PNG = b"\x89PNG\r\n\x1a\n"
+JPEG = b"\xff\xd8\xff"
+
+
+def _upload(filename: str, contents: bytes) -> UploadFile:
+    spooled = SpooledTemporaryFile(max_size=1024)
+    spooled.write(contents)
+    spooled.seek(0)
+    return UploadFile(spooled, size=len(contents), filename=filename)
+
+
+def _archive(members: dict) -> bytes:
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, contents in members.items():
+            archive.writestr(name, contents)
+    return output.getvalue()
+
+
+def _expand(files, budget: UploadMemoryBudget):
+    async def run():
+        async with budget.lease(timeout=0.1) as lease:
+            named_files = await _expand_batch_files(files, lease)
+            return named_files, list(lease.sizes), budget.in_use
+    return asyncio.run(run())
+
+
+def test_each_image_is_reserved_as_it_is_read():
+    photo = PNG + b"a" * 3000
+    scan = JPEG + b"b" * 5000
+    archive = _archive({"r1.jpg": scan, "readme.txt": b"not an invoice", "fake.png": b"plain text"})
+    budget = UploadMemoryBudget(capacity=100_000)
+
+    named_files, reserved, in_use = _expand([_upload("a.png", photo), _upload("b.zip", archive)], budget)
+
+    assert named_files == [("a.png", photo), ("b.zip/r1.jpg", scan)]
+    # The expanded images are accounted for, not the compressed archive or skipped members
+    assert reserved == [len(photo), len(scan)]
+    assert in_use == len(photo) + len(scan)
+    assert budget.in_use == 0
+
+
+def test_expanded_archive_over_the_budget_is_rejected():
+    archive = _archive({f"r{i}.jpg": JPEG + bytes([i]) * 40_000 for i in range(3)})
+    budget = UploadMemoryBudget(capacity=100_000)
+
+    with pytest.raises(UploadBudgetExhaustedError):
+        _expand([_upload("b.zip", archive)], budget)
+    assert budget.in_use == 0
@@ -0,0 +1,54 @@
+import os
+from app.core.response_cache import expense_list_cache
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def _upload(client, headers) -> int:
+    image = PNG + os.urandom(64)  # A new image every time: no OCR cache hit, no duplicate
+    response = client.post("/api/invoice/upload", files={"file": ("invoice.png", image, "image/png")}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["expense_id"]
+
+
+def _expense_ids(response) -> list:
+    return [item["id"] for item in response.json()["items"]]
+
+
+def test_unchanged_list_is_not_modified_until_an_upload(client, register_user):
+    _, headers = register_user()
+    first_id = _upload(client, headers)
+
+    first = client.get("/api/expenses", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    unchanged = client.get("/api/expenses", headers={**headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    assert unchanged.content == b""
+
+    # The upload bumps users.data_version: the old ETag no longer matches and the new row is listed
+    second_id = _upload(client, headers)
+    changed = client.get("/api/expenses", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert sorted(_expense_ids(changed)) == sorted([first_id, second_id])
+
+
+def test_cached_lists_are_never_shared_between_users(client, register_user):
+    _, alice = register_user()
+    _, bob = register_user()
+    alice_id = _upload(client, alice)
+    bob_id = _upload(client, bob)  # Same data version and request parameters as Alice
+
+    alice_list = client.get("/api/expenses", headers=alice)
+    hits = expense_list_cache.stats()["hits"]
+    assert _expense_ids(client.get("/api/expenses", headers=alice)) == [alice_id]
+    assert expense_list_cache.stats()["hits"] == hits + 1  # Alice's page is now served from the cache
+
+    bob_list = client.get("/api/expenses", headers=bob)
+    assert _expense_ids(bob_list) == [bob_id]
+    assert bob_list.headers["ETag"] != alice_list.headers["ETag"]
+    # Alice's validator means nothing for Bob's list
+    assert client.get("/api/expenses", headers={**bob, "If-None-Match": alice_list.headers["ETag"]}).status_code == 200
@@ -0,0 +1,85 @@
+import uuid
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from app.models import Expense, Invoice, User
+from app.repositories.expense_repo import SORT_MAP, BaseExpenseRepository, ExpenseRepository
+from app.schemas.expense_schemas import ExpenseCategory, ExpenseFilter
+
+# Every sort column has NULLs and repeated values, so page boundaries fall inside runs of
+# equal values and between NULLs and non-NULLs
+NAMES = ["Beta", "Alpha", None, "Beta", "Gamma", None, "Alpha", "Beta", None, "Gamma", "Alpha", "Beta"]
+DATES = [date(2024, 1, 5), date(2024, 2, 1), None, date(2024, 1, 5), date(2024, 3, 9), None,
+         date(2024, 2, 1), date(2024, 1, 5), None, date(2024, 3, 9), date(2024, 1, 5), date(2024, 2, 1)]
+AMOUNTS = [100.0, 50.0, None, 100.0, 75.5, None, 50.0, 100.0, None, 20.0, 75.5, 100.0]
+CATEGORIES = [ExpenseCategory.FOOD, ExpenseCategory.IT, None, ExpenseCategory.FOOD, ExpenseCategory.OTHER, None,
+              ExpenseCategory.IT, ExpenseCategory.FOOD, None, ExpenseCategory.OTHER, ExpenseCategory.IT,
+              ExpenseCategory.FOOD]
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(email=f"pages-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    for name, day, amount, category in zip(NAMES, DATES, AMOUNTS, CATEGORIES):
+        invoice = Invoice(
+            user_id=user.id, business_name=name, transaction_date=day, amount_after_vat=amount,
+            amount_before_vat=round(amount / 1.17, 2) if amount is not None else None
+        )
+        db.add(invoice)
+        db.flush()
+        db.add(Expense(invoice_id=invoice.id, user_id=user.id, category=category.value if category else None))
+    db.flush()
+    return user.id
+
+
+def _expected_order(expenses, sort_by: str, direction: str) -> list:
+    """The ORDER BY of build_query in Python: NULLS FIRST when descending, LAST when ascending."""
+    tiebreak = (lambda e: e.id) if sort_by == "category" else (lambda e: e.invoice_id)
+    present = [e for e in expenses if getattr(e, sort_by) is not None]
+    nulls = [e for e in expenses if getattr(e, sort_by) is None]
+    descending = direction == "desc"
+    present.sort(key=lambda e: (getattr(e, sort_by), tiebreak(e)), reverse=descending)
+    nulls.sort(key=tiebreak, reverse=descending)
+    ordered = nulls + present if descending else present + nulls
+    return [e.id for e in ordered]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 5])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("sort_by", list(SORT_MAP))
+def test_pages_cover_every_row_once_in_order(db, user_id, sort_by, direction, page_size):
+    repo = ExpenseRepository(db)
+    everything = repo.get_user_expenses_with_filters(user_id, ExpenseFilter(), sort_by, direction)
+    assert [e.id for e in everything] == _expected_order(everything, sort_by, direction)
+
+    paged, cursor = [], None
+    for _ in range(len(NAMES) + 1):
+        page, cursor = repo.get_user_expenses_page(user_id, ExpenseFilter(), sort_by, direction, page_size, cursor)
+        assert len(page) <= page_size
+        paged.extend(e.id for e in page)
+        if cursor is None:
+            break
+    assert cursor is None
+    assert paged == [e.id for e in everything]
+
+
+def _cursor(sort_by: str, direction: str) -> str:
+    last = SimpleNamespace(id=1, invoice_id=1, transaction_date=date(2024, 1, 5), business_name="Beta")
+    return BaseExpenseRepository.encode_cursor(last, sort_by, direction)
+
+
+def test_cursor_for_another_sort_order_is_rejected(client, register_user):
+    _, headers = register_user()
+    cursor = _cursor("transaction_date", "desc")
+
+    matching = client.get("/api/expenses", params={"cursor": cursor}, headers=headers)
+    assert matching.status_code == 200
+
+    for params in ({"sort_by": "business_name"}, {"direction": "asc"}):
+        response = client.get("/api/expenses", params={"cursor": cursor, **params}, headers=headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Cursor does not match the requested sort order"
+
+    assert client.get("/api/expenses", params={"cursor": "not-a-cursor"}, headers=headers).status_code == 400
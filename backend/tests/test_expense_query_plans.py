@@ -0,0 +1,92 @@
+import random
+import uuid
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import text
+from app.database import engine
+from app.models import User
+from app.repositories.expense_repo import ExpenseRepository
+from app.repositories.invoice_repo import InvoiceRepository
+from app.schemas.expense_schemas import ExpenseCategory, ExpenseFilter
+from app.schemas.invoice_schemas import DocumentType, InvoiceOCRResponse
+
+pytestmark = pytest.mark.skipif(engine.dialect.name != "postgresql",
+                                reason="query plans are checked on PostgreSQL (set TEST_DATABASE_URL)")
+
+# sort key -> index that should drive the expense list query
+EXPECTED_INDEXES = {
+    "transaction_date": "ix_invoices_user_id_transaction_date_id",
+    "amount_after_vat": "ix_invoices_user_id_amount_after_vat_id",
+    "amount_before_vat": "ix_invoices_user_id_amount_before_vat_id",
+    "business_name": "ix_invoices_user_id_business_name_id",
+    "category": "ix_expenses_user_id_category_id",
+}
+VENDOR_SEARCH_INDEX = "ix_invoices_business_name_trgm"
+PAGE_SIZE = 50
+USERS = 20
+INVOICES_PER_USER = 500
+VENDORS = ["Cafe Noir", "Book Shop", "Fuel Station", "Office Depot", "Cloud Hosting", "Training Center"]
+# A handful of the first user's invoices, found by the vendor search
+RARE_VENDOR = "Zanzibar Spice Traders"
+
+
+def _plan_indexes(plan: dict) -> set:
+    """All index names referenced anywhere in a JSON plan tree."""
+    found = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        found |= _plan_indexes(child)
+    return found
+
+
+def _explain(db, query) -> set:
+    sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+    return _plan_indexes(db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()[0]["Plan"])
+
+
+@pytest.fixture(scope="module")
+def user_id(migrated_database):
+    """Seeds several users' invoices and refreshes the planner statistics; returns one of the users."""
+    from app.database import SessionLocal
+    rng = random.Random(7)
+    db = SessionLocal()
+    try:
+        user_ids = []
+        for _ in range(USERS):
+            user = User(email=f"plans-{uuid.uuid4().hex}@example.com", hashed_password="x")
+            db.add(user)
+            db.flush()
+            items = []
+            for index in range(INVOICES_PER_USER):
+                before_vat = round(rng.uniform(5, 5000), 2)
+                vendor = RARE_VENDOR if not user_ids and index < 3 else rng.choice(VENDORS)
+                items.append((InvoiceOCRResponse(
+                    document_type=DocumentType.INVOICE,
+                    business_name=f"{vendor} {rng.randint(1, 500)}",
+                    business_vat_number=str(rng.randint(100000000, 999999999)),
+                    amount_before_vat=before_vat,
+                    amount_after_vat=round(before_vat * 1.17, 2),
+                    transaction_date=date(2023, 1, 1) + timedelta(days=rng.randint(0, 700)),
+                ), rng.choice(list(ExpenseCategory)), None))
+            InvoiceRepository(db).bulk_create_with_expenses(user.id, items)
+            user_ids.append(user.id)
+        db.commit()
+        db.execute(text("ANALYZE invoices"))
+        db.execute(text("ANALYZE expenses"))
+        db.commit()
+    finally:
+        db.close()
+    return user_ids[0]
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("sort_by", list(EXPECTED_INDEXES))
+def test_expense_list_walks_the_sort_index(db, user_id, sort_by, direction):
+    query = ExpenseRepository(db).build_query(user_id, ExpenseFilter(), sort_by, direction, PAGE_SIZE + 1)
+    assert EXPECTED_INDEXES[sort_by] in _explain(db, query)
+
+
+def test_vendor_search_uses_the_trigram_index(db, user_id):
+    # Small tables are legitimately seq-scanned: take that option away so only the index choice is checked
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    query = ExpenseRepository(db).build_query(user_id, ExpenseFilter(business_name="zanzibar spice"), "transaction_date", "desc")
+    assert VENDOR_SEARCH_INDEX in _explain(db, query)
@@ -0,0 +1,72 @@
+import asyncio
+import io
+import os
+import signal
+import time
+import pytest
+from PIL import Image
+from app.services.image_preprocessor import ImagePreprocessor
+from app.services.ocr_backends import FixtureBackend
+from app.services.ocr_service import OCRQueueFullError, OCRService
+
+
+def _photo() -> bytes:
+    output = io.BytesIO()
+    Image.effect_noise((800, 600), 64).convert("RGB").save(output, format="PNG")
+    return output.getvalue()
+
+
+class RecordingPreprocessor:
+    def __init__(self):
+        self.calls = 0
+
+    async def prepare(self, content: bytes) -> bytes:
+        self.calls += 1
+        return content
+
+    async def prepare_many(self, files):
+        return [await self.prepare(content) for content in files]
+
+    def shutdown(self, wait: bool = True):
+        pass
+
+
+def test_preprocessor_falls_back_to_the_original_and_replaces_a_broken_pool():
+    preprocessor = ImagePreprocessor(workers=1, min_bytes=0)
+    photo = _photo()
+
+    async def scenario():
+        first = await preprocessor.prepare(photo)
+        os.kill(next(iter(preprocessor._executor._processes)), signal.SIGKILL)
+        time.sleep(0.5)  # Let the pool notice its worker is gone
+        during = await preprocessor.prepare(photo)
+        after = await preprocessor.prepare(photo)
+        return first, during, after
+
+    try:
+        first, during, after = asyncio.run(scenario())
+    finally:
+        preprocessor.shutdown()
+    assert first.startswith(b"\xff\xd8")
+    # The call that hit the broken pool still gets usable bytes, the next one a new pool
+    assert during in (photo, first)
+    assert after == first
+    assert preprocessor.stats()["failed"] <= 1
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_saturated_ocr_pool_rejects_before_preprocessing(batch):
+    preprocessor = RecordingPreprocessor()
+    service = OCRService(max_pending=0, cache=None, backend=FixtureBackend(latency_ms=0), preprocessor=preprocessor)
+    photo = _photo()
+
+    try:
+        if batch:
+            results = asyncio.run(service.process_batch([photo, photo + b"1"]))
+            assert all(isinstance(result, OCRQueueFullError) for result in results)
+        else:
+            with pytest.raises(OCRQueueFullError):
+                asyncio.run(service.process_invoice(photo))
+    finally:
+        service.shutdown()
+    assert preprocessor.calls == 0
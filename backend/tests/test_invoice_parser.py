@@ -0,0 +1,32 @@
+import json
+import os
+from datetime import date, datetime
+import pytest
+from app.schemas.invoice_schemas import DocumentType
+from app.services.invoice_parser import find_transaction_date, parse_invoice_text
+
+# OCR texts and the fields the parser must extract from them. A change to these values
+# changes what re-parsing writes over every stored invoice, so it has to be deliberate.
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "invoice_parser_corpus.json")
+with open(CORPUS_PATH, encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_parser_output_matches_the_corpus(case):
+    expected = case["expected"]
+    parsed = parse_invoice_text(case["text"])
+
+    assert parsed.document_type == DocumentType[expected["document_type"]]
+    assert parsed.business_name == expected["business_name"]
+    assert parsed.business_vat_number == expected["business_vat_number"]
+    assert parsed.amount_before_vat == expected["amount_before_vat"]
+    assert parsed.amount_after_vat == expected["amount_after_vat"]
+    assert parsed.invoice_number == expected["invoice_number"]
+
+    if expected["transaction_date"] is None:
+        # No date in the text: the parser falls back to today and says it found none
+        assert find_transaction_date(case["text"]) is None
+        assert parsed.transaction_date == datetime.now().date()
+    else:
+        assert parsed.transaction_date == date.fromisoformat(expected["transaction_date"])
@@ -0,0 +1,23 @@
+import asyncio
+import os
+import signal
+import time
+from app.core.password_hasher import PasswordHasher
+
+
+def test_pool_is_replaced_after_its_worker_is_killed():
+    hasher = PasswordHasher(workers=1)
+
+    async def scenario():
+        hashed = await hasher.hash("secret")
+        worker_pid = next(iter(hasher._executor._processes))
+        os.kill(worker_pid, signal.SIGKILL)
+        time.sleep(0.5)  # Let the pool notice its worker is gone
+        return await hasher.verify("secret", hashed), await hasher.verify("wrong", hashed)
+
+    try:
+        assert asyncio.run(scenario()) == (True, False)
+    finally:
+        hasher.shutdown()
+    assert hasher.stats()["completed"] == 3
+    assert hasher.stats()["failed"] == 0
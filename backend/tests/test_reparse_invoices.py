@@ -0,0 +1,80 @@
+import sys
+import uuid
+from datetime import date
+from sqlalchemy import delete, select, update
+from app.commands import reparse_invoices
+from app.models import ExpenseMonthlySummary, Invoice, InvoiceOCRText, User
+from app.repositories.invoice_repo import InvoiceRepository
+from app.schemas.expense_schemas import ExpenseCategory
+from app.services.invoice_parser import parse_invoice_text
+
+DATED_TEXT = "Cafe Noir\nTel Aviv\n12/03/2024\nTotal 117.00\n"
+UNDATED_TEXT = "Cafe Noir\nTotal 50.00\n"
+UNCHANGED_TEXT = "Book Shop\n01/02/2024\nTotal 80.00\n"
+
+
+def _create(db, user_id: int, text: str) -> int:
+    parsed = parse_invoice_text(text)
+    parsed.raw_text = text  # As OCRService does, so the text is stored for re-parsing
+    invoice, _ = InvoiceRepository(db).create_with_expense(user_id, parsed, ExpenseCategory.FOOD)
+    return invoice.id
+
+
+def _run(monkeypatch, capsys, user_id: int) -> str:
+    monkeypatch.setattr(sys, "argv", ["reparse_invoices", "--user-id", str(user_id), "--workers", "1"])
+    reparse_invoices.main()
+    return capsys.readouterr().out
+
+
+def _rollups(db, user_id: int) -> dict:
+    rows = db.execute(
+        select(ExpenseMonthlySummary.month, ExpenseMonthlySummary.count, ExpenseMonthlySummary.amount_after_vat)
+        .where(ExpenseMonthlySummary.user_id == user_id, ExpenseMonthlySummary.count > 0)
+    ).all()
+    return {month: (count, round(amount, 2)) for month, count, amount in rows}
+
+
+def test_reparse_updates_changed_fields_keeps_stored_dates_and_rebuilds_rollups(db, monkeypatch, capsys):
+    user = User(email=f"reparse-{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    dated_id = _create(db, user.id, DATED_TEXT)
+    undated_id = _create(db, user.id, UNDATED_TEXT)
+    unchanged_id = _create(db, user.id, UNCHANGED_TEXT)
+
+    # What an older parser stored: a wrong vendor, and a real date the text itself does not hold
+    db.execute(update(Invoice).where(Invoice.id == dated_id).values(business_name="Old Name"))
+    db.execute(update(Invoice).where(Invoice.id == undated_id).values(transaction_date=date(2026, 1, 15)))
+    # Rollups that no longer match the rows: the run must rebuild them
+    db.execute(delete(ExpenseMonthlySummary).where(ExpenseMonthlySummary.user_id == user.id))
+    db.commit()
+
+    output = _run(monkeypatch, capsys, user.id)
+    db.expire_all()
+
+    assert "changed 1," in output
+    dated, undated, unchanged = (db.get(Invoice, invoice_id) for invoice_id in (dated_id, undated_id, unchanged_id))
+    assert dated.business_name == "Cafe Noir"
+    assert dated.transaction_date == date(2024, 3, 12)
+    # No date in the text: the stored date is not replaced by the parser's fallback (today)
+    assert undated.transaction_date == date(2026, 1, 15)
+    assert unchanged.transaction_date == date(2024, 2, 1)
+
+    reparsed = dict(db.execute(
+        select(InvoiceOCRText.invoice_id, InvoiceOCRText.reparsed_at)
+        .where(InvoiceOCRText.invoice_id.in_([dated_id, undated_id, unchanged_id]))
+    ).all())
+    assert reparsed[dated_id] is not None
+    assert reparsed[undated_id] is None
+    assert reparsed[unchanged_id] is None
+
+    assert _rollups(db, user.id) == {
+        date(2024, 3, 1): (1, 117.0),
+        date(2024, 2, 1): (1, 80.0),
+        date(2026, 1, 1): (1, 50.0),
+    }
+
+    # A second run finds nothing left to change
+    assert "changed 0," in _run(monkeypatch, capsys, user.id)
+    db.expire_all()
+    assert db.get(Invoice, undated_id).transaction_date == date(2026, 1, 15)